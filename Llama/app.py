@@ -1,13 +1,35 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-from flask import Flask
+import math
+
+from flask import Flask, jsonify
 from flask_cors import CORS
+from image_preprocessing import IMAGE_MAX_UPLOAD_BYTES
+from llm_gateway import LLMUnavailable
 from router.route import load_routes
 
 app = Flask(__name__)
 CORS(app)
 
+# Image uploads are the largest bodies; this also bounds chunked requests
+# that carry no Content-Length
+app.config['MAX_CONTENT_LENGTH'] = IMAGE_MAX_UPLOAD_BYTES
+
+
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({"error": f"Upload exceeds the limit of {IMAGE_MAX_UPLOAD_BYTES // (1024 * 1024)} MB"}), 413
+
+
+# Open circuit or no free LLM slot (llm_gateway.py): fail fast, tell the client when to retry
+@app.errorhandler(LLMUnavailable)
+def llm_unavailable(e):
+    response = jsonify({"error": str(e), "status": "error"})
+    response.headers['Retry-After'] = str(max(math.ceil(e.retry_after), 1))
+    return response, 503
+
+
 load_routes(app)
 
 if __name__ == '__main__':
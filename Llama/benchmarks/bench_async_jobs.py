@@ -0,0 +1,121 @@
+"""
+Cheap-endpoint latency under mixed load, with LLM-backed requests either
+blocking request threads (sync) or queued on the job pool (?async=1).
+
+The app is served by a WSGI server with a fixed number of request threads
+(like a gunicorn gthread worker) and talks to a local fake Groq server.
+Run from the Llama directory:
+    python -m benchmarks.bench_async_jobs [server_threads] [slow_clients] [duration_seconds]
+"""
+import json
+import logging
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from groq import Groq
+from werkzeug.serving import BaseWSGIServer
+
+import blueprints.market_price_new as market_price_new
+from app import app
+from benchmarks.fake_groq import FakeGroqServer
+from jobs import get_job_manager
+from llm_cache import LLMCache
+
+SLOW_PATH = '/market_prices_new?commodity=Beras%20Medium&region=Nasional&period=30d'
+CHEAP_PATH = '/contextual_info?condition=drought'
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Serves each connection on a fixed-size thread pool."""
+
+    def __init__(self, host, port, wsgi_app, threads):
+        super().__init__(host, port, wsgi_app)
+        self.pool = ThreadPoolExecutor(threads)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def fetch(url):
+    with urllib.request.urlopen(url, timeout=60) as resp:
+        return json.loads(resp.read())
+
+
+def run(base_url, mode, slow_clients, duration):
+    stop = time.time() + duration
+    cheap_latencies = []
+    utilization = []
+
+    def slow_client():
+        while time.time() < stop:
+            if mode == 'async':
+                job = fetch(f"{base_url}{SLOW_PATH}&async=1")
+                while fetch(f"{base_url}/jobs/{job['job_id']}")['status'] in ('queued', 'running'):
+                    time.sleep(0.2)
+            else:
+                fetch(base_url + SLOW_PATH)
+
+    def cheap_client():
+        while time.time() < stop:
+            start = time.perf_counter()
+            fetch(base_url + CHEAP_PATH)
+            cheap_latencies.append(time.perf_counter() - start)
+            time.sleep(0.02)
+
+    def sampler():
+        manager = get_job_manager()
+        while time.time() < stop:
+            utilization.append(manager.stats()['busy'] / manager.workers)
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=slow_client) for _ in range(slow_clients)]
+    threads += [threading.Thread(target=cheap_client) for _ in range(2)]
+    threads.append(threading.Thread(target=sampler))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies = np.array(cheap_latencies) * 1000
+    print(f"{mode:<6} /contextual_info n={len(latencies):>5}  p50 {np.percentile(latencies, 50):8.1f} ms"
+          f"  p99 {np.percentile(latencies, 99):8.1f} ms  job pool utilization {np.mean(utilization):.0%}")
+
+
+def main():
+    server_threads = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    slow_clients = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    duration = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    groq_server = FakeGroqServer(latency=1.0).start()
+    # Plain client and no response cache so every slow request hits upstream
+    upstream = Groq(api_key="test", base_url=groq_server.base_url)
+    market_price_new.get_client = lambda: upstream
+    market_price_new.get_llm_cache = lambda: LLMCache(backend=None)
+
+    server = PooledWSGIServer('127.0.0.1', 0, app, server_threads)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        for mode in ('sync', 'async'):
+            run(base_url, mode, slow_clients, duration)
+    finally:
+        server.shutdown()
+        groq_server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Time-to-first-byte of /chat versus /chat/stream against a local fake LLM.
+
+The fake LLM waits FIRST_TOKEN_DELAY before the first token and
+TOKEN_DELAY between tokens. Run from the Llama directory:
+    python -m benchmarks.bench_chat_stream [first_token_delay] [token_delay] [n_tokens]
+"""
+import sys
+import time
+from types import SimpleNamespace
+
+import blueprints.chat as chat_module
+from app import app
+
+
+class FakeLLM:
+    def __init__(self, first_token_delay, token_delay, n_tokens):
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.n_tokens = n_tokens
+        self.closed = 0
+
+    def stream(self, messages):
+        try:
+            time.sleep(self.first_token_delay)
+            for i in range(self.n_tokens):
+                if i:
+                    time.sleep(self.token_delay)
+                yield SimpleNamespace(content=f"kata{i} ")
+        finally:
+            self.closed += 1
+
+    def invoke(self, messages):
+        return SimpleNamespace(content="".join(chunk.content for chunk in self.stream(messages)))
+
+
+def measure(client, path):
+    start = time.perf_counter()
+    response = client.post(path, json={'query': 'Pupuk untuk padi?', 'language': 'id'}, buffered=False)
+    body = iter(response.response)
+    next(body)
+    ttfb = time.perf_counter() - start
+    for _ in body:
+        pass
+    response.close()
+    return ttfb, time.perf_counter() - start
+
+
+def main():
+    first_token_delay, token_delay, n_tokens = 0.3, 0.02, 50
+    if len(sys.argv) > 1:
+        first_token_delay = float(sys.argv[1])
+    if len(sys.argv) > 2:
+        token_delay = float(sys.argv[2])
+    if len(sys.argv) > 3:
+        n_tokens = int(sys.argv[3])
+
+    fake = FakeLLM(first_token_delay, token_delay, n_tokens)
+    chat_module.get_llm = lambda: fake
+    client = app.test_client()
+
+    for path in ('/chat', '/chat/stream'):
+        ttfb, total = measure(client, path)
+        print(f"{path:<13} TTFB {ttfb * 1000:7.1f} ms  total {total * 1000:7.1f} ms")
+
+    # Client disconnect after the first event must close the upstream stream
+    closed_before = fake.closed
+    response = client.post('/chat/stream', json={'query': 'Pupuk untuk padi?'}, buffered=False)
+    next(iter(response.response))
+    response.close()
+    print(f"upstream closed on disconnect: {fake.closed > closed_before}")
+
+
+if __name__ == '__main__':
+    main()
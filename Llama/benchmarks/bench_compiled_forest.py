@@ -0,0 +1,77 @@
+"""
+Checks CompiledForest against sklearn and reports single-row p50/p99 latency.
+
+The fertilizer model is checked on a grid drawn from FEATURE_RANGES and every
+soil/crop type; the crop model on raw inputs drawn from the MinMaxScaler's
+training range. Run from the Llama directory:
+    python -m benchmarks.bench_compiled_forest
+"""
+import time
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from compiled_forest import CompiledForest
+from constant import FEATURE_RANGES, SOIL_TYPE_MAPPING, CROP_TYPE_MAPPING
+
+warnings.filterwarnings("ignore")
+
+N_VERIFY = 20000
+N_LATENCY = 2000
+
+
+def fertilizer_rows(rng, n):
+    return pd.DataFrame({
+        'Temparature': rng.integers(*FEATURE_RANGES['Temparature'], n, endpoint=True),
+        'Humidity': rng.integers(*FEATURE_RANGES['Humidity'], n, endpoint=True),
+        'Soil Moisture': rng.integers(*FEATURE_RANGES['Soil Moisture'], n, endpoint=True),
+        'Soil Type': rng.choice(list(SOIL_TYPE_MAPPING.values()), n),
+        'Crop Type': rng.choice(list(CROP_TYPE_MAPPING.values()), n),
+        'Nitrogen': rng.integers(*FEATURE_RANGES['Nitrogen'], n, endpoint=True),
+        'Potassium': rng.integers(*FEATURE_RANGES['Potassium'], n, endpoint=True),
+        'Phosphorous': rng.integers(*FEATURE_RANGES['Phosphorous'], n, endpoint=True),
+    })
+
+
+def crop_rows(rng, n):
+    ms = joblib.load("Models/minmaxscaler_croprecom.pkl")
+    sc = joblib.load("Models/standscaler_croprecom.pkl")
+    raw = rng.uniform(ms.data_min_, ms.data_max_, size=(n, ms.n_features_in_))
+    return sc.transform(ms.transform(raw))
+
+
+def latency(predict, rows):
+    timings = []
+    for i in range(len(rows)):
+        row = rows[i:i + 1]
+        start = time.perf_counter()
+        predict(row)
+        timings.append(time.perf_counter() - start)
+    timings = np.array(timings) * 1000
+    return np.percentile(timings, 50), np.percentile(timings, 99)
+
+
+def run(name, path, rows):
+    model = joblib.load(path)
+    compiled = CompiledForest(model)
+
+    assert np.array_equal(compiled.predict_proba(rows), model.predict_proba(rows)), f"{name}: probabilities differ"
+    assert np.array_equal(compiled.predict(rows), model.predict(rows)), f"{name}: predictions differ"
+    print(f"{name}: {len(rows)} rows identical to sklearn")
+
+    sample = rows[:N_LATENCY]
+    for engine, predict in (('sklearn', model.predict), ('compiled', compiled.predict)):
+        p50, p99 = latency(predict, sample)
+        print(f"  {engine:<9} single-row p50 {p50:.3f} ms  p99 {p99:.3f} ms")
+
+
+def main():
+    rng = np.random.default_rng(0)
+    run('fertilizer', "Models/rf_model_fertrecom.pkl", fertilizer_rows(rng, N_VERIFY))
+    run('crop', "Models/model_croprecom.pkl", crop_rows(rng, N_VERIFY))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,465 @@
+"""
+End-to-end load test of every blueprint in router/route.py against a local
+fake Groq server, so no Groq quota is spent.
+
+The app runs on a threaded WSGI server in this process, with GROQ_BASE_URL
+and GROQ_API_BASE pointing the real get_client()/get_llm() (gateway included)
+at the stub. Each endpoint gets a randomized but realistic payload mix and is
+reported with throughput, p50/p95/p99 latency, status counts and process RSS.
+Streamed endpoints also report time to first byte (ttfb), and async jobs the
+time to the 202 (submit); their latency runs until the stream ends or a
+/jobs poll finds the job done. Results are written as JSON so runs on
+different commits can be compared.
+
+Run from the Llama directory:
+    python -m benchmarks.bench_endpoints [--requests 200] [--concurrency 8]
+        [--latency lognormal:0.3,0.5] [--llm-cache none] [--only chat,crop_rec]
+    python -m benchmarks.bench_endpoints --compare old.json new.json
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import httpx
+import numpy as np
+
+from benchmarks.fake_groq import FakeGroqServer, latency_distribution
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+CHAT_QUERIES = [
+    "Bagaimana cara mengatasi hama wereng pada padi?",
+    "Kapan waktu tanam jagung yang tepat di musim hujan?",
+    "Pupuk apa yang cocok untuk cabai saat berbunga?",
+    "How do I improve soil drainage for shallots?",
+    "Berapa kebutuhan air harian tanaman tomat?",
+]
+
+
+# Seconds between /jobs/<id> polls of an async scenario
+JOB_POLL_INTERVAL = 0.02
+JOB_POLL_TIMEOUT = 120
+
+
+def plain_request(client, scenario, kwargs):
+    response = client.request(scenario.method, scenario.path, **kwargs)
+    return response.status_code, response.json, {}
+
+
+def stream_request(client, scenario, kwargs):
+    """
+    Reads the whole stream; also times the first body chunk. A stream that
+    ends in an SSE `error` event counts as StreamError despite its 200.
+    """
+    start = time.perf_counter()
+    ttfb = None
+    body = bytearray()
+    with client.stream(scenario.method, scenario.path, **kwargs) as response:
+        for chunk in response.iter_bytes():
+            if ttfb is None and chunk:
+                ttfb = time.perf_counter() - start
+            body += chunk
+    status = "StreamError" if b"event: error\n" in body else response.status_code
+    return status, None, {"ttfb": ttfb if ttfb is not None else time.perf_counter() - start}
+
+
+def job_request(client, scenario, kwargs):
+    """Submits with ?async=1 and polls /jobs/<id>; the status is the job's own."""
+    start = time.perf_counter()
+    params = dict(kwargs.pop("params", {}), **{"async": "1"})
+    response = client.request(scenario.method, scenario.path, params=params, **kwargs)
+    timings = {"submit": time.perf_counter() - start}
+    if response.status_code != 202:
+        return response.status_code, response.json, timings
+    status_url = response.json()["status_url"]
+    deadline = start + JOB_POLL_TIMEOUT
+    while time.perf_counter() < deadline:
+        job = client.get(status_url).json()
+        if job.get("status") not in ("queued", "running"):
+            return job.get("status_code") or 404, lambda: job["result"], timings
+        time.sleep(JOB_POLL_INTERVAL)
+    return "JobTimeout", None, timings
+
+
+class Scenario:
+    """
+    One endpoint: `request(rng)` returns the kwargs for httpx.Client.request.
+    `parsed` names response fields filled from the LLM reply; they must come
+    out non-empty and differ from the blueprint's fallback, or the fake
+    replies no longer exercise the real parser. `send` is plain_request,
+    stream_request or job_request.
+    """
+
+    def __init__(self, name, method, path, request=None, parsed=None, send=plain_request):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.request = request or (lambda rng: {})
+        self.parsed = parsed or []
+        self.send = send
+
+
+# Values the blueprints return when a section is missing from the reply
+PARSE_FALLBACKS = {"Tidak terdeteksi", "Tidak ada", "Tidak ada penjelasan spesifik."}
+
+
+def check_parsed(scenario, get_body):
+    """Fail the run if the LLM-derived fields of the response fell back to defaults."""
+    if not scenario.parsed:
+        return
+    body = get_body()
+    empty = [field for field in scenario.parsed
+             if not body.get(field) or (isinstance(body[field], str) and body[field] in PARSE_FALLBACKS)]
+    if empty:
+        raise AssertionError(f"{scenario.name}: parsed fields empty or defaulted: {', '.join(empty)}")
+
+
+def chat_body(rng):
+    history = []
+    for i in range(rng.randint(0, 12)):
+        history.append({"isBot": i % 2 == 1, "text": rng.choice(CHAT_QUERIES) * rng.randint(1, 4)})
+    return {
+        "query": rng.choice(CHAT_QUERIES),
+        "language": rng.choice(["id", "id", "en"]),
+        "history": history,
+        "conversation_id": f"bench-{rng.randint(0, 20)}",
+    }
+
+
+def fert_sample(rng):
+    from constant import CROP_TYPE_MAPPING, FEATURE_RANGES, SOIL_TYPE_MAPPING
+    return {
+        "SoilType": rng.choice(list(SOIL_TYPE_MAPPING)),
+        "CropType": rng.choice(list(CROP_TYPE_MAPPING)),
+        "Temperature": rng.randint(*FEATURE_RANGES['Temparature']),
+        "Humidity": rng.randint(*FEATURE_RANGES['Humidity']),
+        "SoilMoisture": rng.randint(*FEATURE_RANGES['Soil Moisture']),
+        "Nitrogen": rng.randint(*FEATURE_RANGES['Nitrogen']),
+        "Potassium": rng.randint(*FEATURE_RANGES['Potassium']),
+        "Phosphorous": rng.randint(*FEATURE_RANGES['Phosphorous']),
+    }
+
+
+def crop_rec_body(rng):
+    return {
+        "n": rng.randint(0, 140), "p": rng.randint(5, 145), "k": rng.randint(5, 205),
+        "temperature": round(rng.uniform(8, 44), 1), "humidity": round(rng.uniform(14, 100), 1),
+        "ph": round(rng.uniform(3.5, 9.9), 2), "rainfall": round(rng.uniform(20, 300), 1),
+    }
+
+
+def crop_yield_body(rng):
+    from blueprints.crop_yield import CROP_NAME_MAP, SEASON_DATA
+    from constant import PROVINCES
+    return {
+        "Area": round(rng.uniform(0.5, 50), 1),
+        "District": rng.choice(list(PROVINCES)),
+        "Crop": rng.choice(list(CROP_NAME_MAP)),
+        "Season": rng.choice(list(SEASON_DATA)),
+    }
+
+
+def price_keys(getter, fallback):
+    """Commodity (and region) keys from a price store, or `fallback` if its CSV is missing."""
+    try:
+        return getter().keys() or fallback
+    except Exception:
+        return fallback
+
+
+def make_photos(rng, count=4):
+    """Phone-camera-sized JPEGs with some texture, so the encoder has real work to do."""
+    from PIL import Image, ImageFilter
+    photos = []
+    for size in [(1600, 1200), (3024, 4032), (2048, 1536), (4000, 3000)][:count]:
+        noise = Image.effect_noise((size[0] // 8, size[1] // 8), rng.randint(20, 80)).resize(size)
+        leaf = Image.merge('RGB', (noise.point(lambda v: v // 3), noise, noise.point(lambda v: v // 2)))
+        out = io.BytesIO()
+        leaf.filter(ImageFilter.SMOOTH).save(out, format='JPEG', quality=90)
+        photos.append(out.getvalue())
+    return photos
+
+
+def build_scenarios(rng):
+    from constant import BASE_PRICES, COMMODITIES, REGIONAL_FACTORS
+    from price_store import get_kotkab_price_store, get_national_price_store
+
+    national = price_keys(get_national_price_store, ["Beras Medium"])
+    kotkab = price_keys(get_kotkab_price_store, [("Beras Medium", "Kota Bandung")])
+    photos = make_photos(rng)
+    commodity_arg = lambda rng: {"params": {"commodity": rng.choice([*COMMODITIES, None])}}
+
+    return [
+        Scenario('contextual_info', 'GET', '/contextual_info',
+                 lambda rng: {"params": {"condition": rng.choice(["drought", "pest_outbreak", "flood"])}}),
+        Scenario('pest_outbreaks', 'GET', '/pest_outbreaks'),
+        Scenario('land_monitoring', 'GET', '/land_monitoring', commodity_arg),
+        Scenario('harvest_prediction', 'GET', '/harvest_prediction', commodity_arg),
+        Scenario('weather_data', 'GET', '/weather_data', commodity_arg),
+        Scenario('soil_data', 'GET', '/soil_data', commodity_arg),
+        Scenario('market_prices', 'GET', '/market_prices', lambda rng: {"params": {
+            "commodity": rng.choice(list(BASE_PRICES)),
+            "region": rng.choice(list(REGIONAL_FACTORS)),
+            "period": rng.choice(["30d", "90d"]),
+        }}),
+        Scenario('fert_predict', 'POST', '/fert_predict', lambda rng: {"json": fert_sample(rng)}),
+        Scenario('fert_predict_batch', 'POST', '/fert_predict/batch',
+                 lambda rng: {"json": {"samples": [fert_sample(rng) for _ in range(rng.randint(10, 500))]}}),
+        Scenario('crop_rec', 'POST', '/crop_rec', lambda rng: {"json": crop_rec_body(rng)},
+                 parsed=['Description', 'recomendation']),
+        Scenario('crop_yield', 'POST', '/crop_yield', lambda rng: {"json": crop_yield_body(rng)},
+                 parsed=['Description', 'recomendation']),
+        Scenario('market_prices_new', 'GET', '/market_prices_new', lambda rng: {"params": {
+            "commodity": rng.choice(national),
+            "region": "Nasional",
+            "period": rng.choice(["30d", "90d"]),
+        }}, parsed=['trend_analysis']),
+        Scenario('market_prices_region_new', 'GET', '/market_prices_region_new', lambda rng: {"params": dict(
+            zip(["commodity", "region"], rng.choice(kotkab)),
+            period=rng.choice(["30d", "90d"]),
+        )}, parsed=['trend_analysis']),
+        Scenario('classify_plant_disease', 'POST', '/classify_plant_disease', lambda rng: {
+            "files": {"image": ("leaf.jpg", rng.choice(photos), "image/jpeg")},
+            "data": {"language": rng.choice(["id", "en"])},
+        }, parsed=['diagnosis', 'tingkat_risiko', 'dampak_panen', 'penjelasan', 'rekomendasi']),
+        Scenario('chat', 'POST', '/chat', lambda rng: {"json": chat_body(rng)}),
+        Scenario('chat_stream', 'POST', '/chat/stream', lambda rng: {"json": chat_body(rng)}, send=stream_request),
+        Scenario('crop_rec_async', 'POST', '/crop_rec', lambda rng: {"json": crop_rec_body(rng)},
+                 parsed=['Description', 'recomendation'], send=job_request),
+        Scenario('crop_yield_async', 'POST', '/crop_yield', lambda rng: {"json": crop_yield_body(rng)},
+                 parsed=['Description', 'recomendation'], send=job_request),
+        Scenario('chat_metrics', 'GET', '/chat/metrics'),
+        Scenario('llm_cache_stats', 'GET', '/llm_cache/stats'),
+        Scenario('llm_gateway_stats', 'GET', '/llm_gateway/stats'),
+        Scenario('jobs_stats', 'GET', '/jobs/stats'),
+        Scenario('models', 'GET', '/models'),
+        Scenario('metrics', 'GET', '/metrics'),
+    ]
+
+
+def rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        # Peak rather than current RSS where /proc is unavailable
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class RSSSampler:
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, rss_mb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_mb())
+
+
+def run_scenario(client, scenario, requests, concurrency, seed):
+    rngs = [random.Random(seed * 100003 + i) for i in range(requests)]
+    payloads = [scenario.request(rng) for rng in rngs]
+
+    def send(kwargs, check=False):
+        start = time.perf_counter()
+        timings = {}
+        try:
+            status, get_body, timings = scenario.send(client, scenario, dict(kwargs))
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        elapsed = time.perf_counter() - start
+        if check and status == 200:
+            check_parsed(scenario, get_body)
+        return elapsed, status, timings
+
+    # First request separately: lazy model/data loading shows up as cold latency
+    cold, _, _ = send(payloads[0], check=True)
+    rss_start = rss_mb()
+    with RSSSampler() as sampler:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = list(pool.map(send, payloads))
+        elapsed = time.perf_counter() - start
+
+    latencies = np.array([latency for latency, _, _ in results]) * 1000
+    statuses = {}
+    for _, status, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    # ttfb / submit, over the requests that got that far
+    timings = {}
+    for name in sorted({name for _, _, t in results for name in t}):
+        values = np.array([t[name] for _, _, t in results if name in t]) * 1000
+        timings[name] = {q: float(np.percentile(values, int(q[1:]))) for q in ('p50', 'p95', 'p99')}
+    errors = sum(count for status, count in statuses.items() if not (status.isdigit() and int(status) < 400))
+    return {
+        "path": scenario.path,
+        "requests": requests,
+        "concurrency": concurrency,
+        "throughput_rps": requests / elapsed,
+        "latency_ms": {
+            "cold": cold * 1000,
+            "mean": float(latencies.mean()),
+            "p50": float(np.percentile(latencies, 50)),
+            "p95": float(np.percentile(latencies, 95)),
+            "p99": float(np.percentile(latencies, 99)),
+            "max": float(latencies.max()),
+        },
+        "timings_ms": timings,
+        "statuses": statuses,
+        "errors": errors,
+        "rss_mb": {"start": rss_start, "peak": sampler.peak, "end": rss_mb()},
+    }
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                    capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def print_result(name, result):
+    lat = result["latency_ms"]
+    print(f"{name:<26} {result['throughput_rps']:8.1f} req/s  p50 {lat['p50']:8.1f}  p95 {lat['p95']:8.1f}"
+          f"  p99 {lat['p99']:8.1f} ms  errors {result['errors']:>4}  rss peak {result['rss_mb']['peak']:7.1f} MB")
+    for timing, quantiles in result.get("timings_ms", {}).items():
+        print(f"{'  ' + timing:<26} {'':>14}  p50 {quantiles['p50']:8.1f}  p95 {quantiles['p95']:8.1f}"
+              f"  p99 {quantiles['p99']:8.1f} ms")
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{old['meta']['commit'] or old_path} -> {new['meta']['commit'] or new_path}")
+
+    def change(a, b):
+        return f"{(b - a) / a * 100:+7.1f}%" if a else "    n/a"
+
+    for name, result in new["endpoints"].items():
+        before = old["endpoints"].get(name)
+        if before is None:
+            print(f"{name:<26} (new)")
+            continue
+        print(f"{name:<26} req/s {change(before['throughput_rps'], result['throughput_rps'])}"
+              + "".join(f"  {q} {change(before['latency_ms'][q], result['latency_ms'][q])}" for q in ('p50', 'p95', 'p99'))
+              + f"  rss peak {change(before['rss_mb']['peak'], result['rss_mb']['peak'])}"
+              + f"  errors {before['errors']} -> {result['errors']}")
+        for timing, quantiles in result.get("timings_ms", {}).items():
+            old_quantiles = before.get("timings_ms", {}).get(timing)
+            if old_quantiles is None:
+                print(f"{'  ' + timing:<26} (new)")
+                continue
+            print(f"{'  ' + timing:<26} {'':>13}"
+                  + "".join(f"  {q} {change(old_quantiles[q], quantiles[q])}" for q in ('p50', 'p95', 'p99')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200, help="measured requests per endpoint")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', default='lognormal:0.3,0.5', help="fake LLM latency distribution")
+    parser.add_argument('--llm-cache', default='none', choices=['none', 'memory'],
+                        help="LLM response cache backend; 'none' makes every LLM-backed request hit the stub")
+    parser.add_argument('--image-cache', action='store_true', help="keep the perceptual image cache enabled")
+    parser.add_argument('--server-threads', type=int, default=16)
+    parser.add_argument('--only', help="comma-separated scenario names")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="results JSON path (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="compare two results files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    groq_server = FakeGroqServer(latency=latency_distribution(args.latency)).start()
+    # Must be set before the app (and its clients) are imported
+    os.environ.update({
+        'GROQ_API_KEY': 'bench',
+        'GROQ_BASE_URL': groq_server.base_url,
+        'GROQ_API_BASE': groq_server.base_url,
+        'LLM_CACHE_BACKEND': args.llm_cache,
+        'IMAGE_CACHE_ENABLED': '1' if args.image_cache else '0',
+    })
+    from werkzeug.serving import make_server
+    from app import app
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    # Failing endpoints are counted in the results; their tracebacks would drown the report
+    app.logger.disabled = True
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    rng = random.Random(args.seed)
+    scenarios = build_scenarios(rng)
+    if args.only:
+        wanted = set(args.only.split(','))
+        scenarios = [s for s in scenarios if s.name in wanted]
+
+    commit, dirty = git_revision()
+    results = {
+        "meta": {
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "config": {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+        },
+        "endpoints": {},
+    }
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        with httpx.Client(base_url=base_url, timeout=120, limits=limits) as client:
+            for i, scenario in enumerate(scenarios):
+                calls_before = groq_server.calls
+                result = run_scenario(client, scenario, args.requests, args.concurrency, args.seed + i)
+                result["llm_calls"] = groq_server.calls - calls_before
+                results["endpoints"][scenario.name] = result
+                print_result(scenario.name, result)
+    finally:
+        server.shutdown()
+        groq_server.stop()
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{(commit or 'nogit')[:8]}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Rows/second of /fert_predict/batch versus the single-row /fert_predict path.
+
+Run from the Llama directory:
+    python -m benchmarks.bench_fert_batch
+"""
+import random
+import time
+import warnings
+
+from app import app
+from constant import SOIL_TYPE_MAPPING, CROP_TYPE_MAPPING, FEATURE_RANGES
+
+warnings.filterwarnings("ignore")
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000]
+SINGLE_ROW_SAMPLES = 200
+
+
+def random_sample(rng):
+    return {
+        'SoilType': rng.choice(list(SOIL_TYPE_MAPPING)),
+        'CropType': rng.choice(list(CROP_TYPE_MAPPING)),
+        'Temperature': rng.randint(*FEATURE_RANGES['Temparature']),
+        'Humidity': rng.randint(*FEATURE_RANGES['Humidity']),
+        'SoilMoisture': rng.randint(*FEATURE_RANGES['Soil Moisture']),
+        'Nitrogen': rng.randint(*FEATURE_RANGES['Nitrogen']),
+        'Potassium': rng.randint(*FEATURE_RANGES['Potassium']),
+        'Phosphorous': rng.randint(*FEATURE_RANGES['Phosphorous'])
+    }
+
+
+def main():
+    rng = random.Random(0)
+    client = app.test_client()
+    samples = [random_sample(rng) for _ in range(max(BATCH_SIZES))]
+
+    # Warm up model loading
+    client.post('/fert_predict', json=samples[0])
+
+    start = time.perf_counter()
+    single_results = [client.post('/fert_predict', json=s).get_json() for s in samples[:SINGLE_ROW_SAMPLES]]
+    elapsed = time.perf_counter() - start
+    print(f"single-row  n={SINGLE_ROW_SAMPLES:>6}  {SINGLE_ROW_SAMPLES / elapsed:>10.0f} rows/s")
+
+    batch_results = client.post('/fert_predict/batch', json={'samples': samples[:SINGLE_ROW_SAMPLES]}).get_json()['results']
+    assert batch_results == single_results, "batch results differ from single-row results"
+
+    for size in BATCH_SIZES:
+        payload = {'samples': samples[:size]}
+        start = time.perf_counter()
+        response = client.post('/fert_predict/batch', json=payload)
+        elapsed = time.perf_counter() - start
+        assert response.status_code == 200, response.get_json()
+        print(f"batch       n={size:>6}  {size / elapsed:>10.0f} rows/s  ({elapsed * 1000:.1f} ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Bytes sent upstream, peak RSS and end-to-end latency of /classify_plant_disease
+with IMAGE_PREPROCESSING off (raw upload) and on (downscaled JPEG).
+
+Each mode runs in its own process so peak RSS is not shared. Latency excludes
+the upload to Groq, which is where the raw data URL costs most. Run from the
+Llama directory:
+    python -m benchmarks.bench_image_preprocessing [megapixels]
+"""
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+from PIL import Image
+
+RUNS = 5
+
+
+def make_photo(megapixels):
+    """Noisy JPEG at camera resolution with an EXIF rotation, similar in size to a phone photo."""
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    rng = np.random.default_rng(0)
+    base = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    pixels = np.clip(base + rng.normal(0, 40, (height, width, 3)), 0, 255).astype(np.uint8)
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90 CW
+    output = io.BytesIO()
+    Image.fromarray(pixels).save(output, format='JPEG', quality=95, exif=exif)
+    return output.getvalue()
+
+
+def child(photo_path):
+    import blueprints.classify_plant_disease as classify
+    from app import app
+
+    sent = []
+
+    class RecordingClient:
+        class chat:
+            class completions:
+                @staticmethod
+                def create(**kwargs):
+                    sent.append(len(kwargs["messages"][0]["content"][1]["image_url"]["url"]))
+                    reply = SimpleNamespace(content="---AWAL DIAGNOSIS---\nDiagnosis: Tidak terdeteksi\n---AKHIR DIAGNOSIS---")
+                    return SimpleNamespace(choices=[SimpleNamespace(message=reply)])
+
+    classify.get_client = lambda: RecordingClient
+    client = app.test_client()
+    with open(photo_path, 'rb') as f:
+        photo = f.read()
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    latencies = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        response = client.post('/classify_plant_disease', data={
+            'image': (io.BytesIO(photo), 'leaf.jpg'), 'language': 'id'
+        }, content_type='multipart/form-data')
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.get_json()
+
+    print(json.dumps({
+        'upload_bytes': len(photo),
+        'upstream_bytes': sent[-1],
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'request_rss_mb': (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024,
+        'latency_ms': float(np.median(latencies) * 1000),
+    }))
+
+
+def main():
+    megapixels = float(sys.argv[1]) if len(sys.argv) > 1 else 12
+    photo_path = os.path.join('/tmp', f'bench_leaf_{megapixels:g}mp.jpg')
+    # Generated in a separate process too: ru_maxrss survives fork/exec
+    subprocess.run([sys.executable, '-m', 'benchmarks.bench_image_preprocessing', '--make-photo', photo_path, str(megapixels)],
+                   check=True)
+
+    for name, flag in (('raw', '0'), ('preprocessed', '1')):
+        # Image cache off: repeated runs on one photo would be cache hits
+        env = dict(os.environ, IMAGE_PREPROCESSING=flag, IMAGE_CACHE_ENABLED='0', PYTHONWARNINGS='ignore')
+        out = subprocess.run([sys.executable, '-m', 'benchmarks.bench_image_preprocessing', '--child', photo_path],
+                             env=env, capture_output=True, text=True, check=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        print(f"{name:<13} upload {result['upload_bytes'] / 1e6:6.2f} MB  upstream {result['upstream_bytes'] / 1e6:6.2f} MB"
+              f"  peak RSS {result['peak_rss_mb']:7.1f} MB (+{result['request_rss_mb']:.1f} MB in requests)  latency p50 {result['latency_ms']:7.1f} ms")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == '--child':
+        child(sys.argv[2])
+    elif len(sys.argv) > 3 and sys.argv[1] == '--make-photo':
+        with open(sys.argv[2], 'wb') as f:
+            f.write(make_photo(float(sys.argv[3])))
+    else:
+        main()
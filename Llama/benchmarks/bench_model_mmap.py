@@ -0,0 +1,114 @@
+"""
+Per-worker memory and load time of the random-forest models (fertilizer +
+crop) with each engine: 'sklearn' (joblib.load of the pickles), 'compiled'
+(pickles flattened in memory) and 'mmap' (export_models.py output opened
+with mmap_mode='r').
+
+N worker processes are started per engine. Each imports the app's
+dependencies, loads both models through models.py and runs one prediction.
+While all N are alive, the script reads their memory from
+/proc/<pid>/smaps_rollup. RSS/USS deltas are measured around the load
+itself, so interpreter and import costs are excluded. PSS splits shared
+pages between the processes that map them, which is where the mmap engine
+saves memory.
+
+Linux only. Run `python export_models.py` first, then from the Llama directory:
+    python -m benchmarks.bench_model_mmap [workers] [--drop-caches]
+--drop-caches (root only) empties the page cache before each engine so the
+load times are cold-disk times.
+"""
+import json
+import os
+import subprocess
+import sys
+
+LLAMA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENGINES = ('sklearn', 'compiled', 'mmap')
+
+WORKER = r"""
+import json, sys, time, warnings
+warnings.filterwarnings('ignore')
+import numpy as np
+import sklearn.ensemble  # import cost is not part of the model load
+
+def memory():
+    fields = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return fields['Rss'], fields['Private_Clean'] + fields['Private_Dirty']
+
+from models import get_crop_model, get_fertilizer_model
+
+rss_before, uss_before = memory()
+start = time.perf_counter()
+fertilizer, crop = get_fertilizer_model(), get_crop_model()
+load = time.perf_counter() - start
+fertilizer.predict(np.zeros((1, 8), dtype=np.float32))
+crop.predict(np.zeros((1, 7)))
+rss_after, uss_after = memory()
+print(json.dumps({'load_ms': load * 1000, 'rss_delta': rss_after - rss_before, 'uss_delta': uss_after - uss_before}), flush=True)
+sys.stdin.read()
+"""
+
+
+def pss_mb(pid):
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            if line.startswith('Pss:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def drop_caches():
+    subprocess.run(['sync'], check=True)
+    with open('/proc/sys/vm/drop_caches', 'w') as f:
+        f.write('3\n')
+
+
+def run_engine(engine, workers, cold):
+    if cold:
+        drop_caches()
+    env = dict(os.environ, FERTILIZER_MODEL_ENGINE=engine, CROP_MODEL_ENGINE=engine, PYTHONWARNINGS='ignore')
+    procs = [
+        subprocess.Popen([sys.executable, '-c', WORKER], cwd=LLAMA_DIR, env=env,
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        for _ in range(workers)
+    ]
+    try:
+        results = [json.loads(proc.stdout.readline()) for proc in procs]
+        pss = [pss_mb(proc.pid) for proc in procs]
+    finally:
+        for proc in procs:
+            proc.stdin.close()
+            proc.wait()
+
+    def mean(values):
+        return sum(values) / len(values)
+
+    return {
+        'engine': engine,
+        'workers': workers,
+        'load_ms': {'mean': mean([r['load_ms'] for r in results]), 'max': max(r['load_ms'] for r in results)},
+        'rss_delta_mb': mean([r['rss_delta'] for r in results]),
+        'uss_delta_mb': mean([r['uss_delta'] for r in results]),
+        'pss_mb': mean(pss),
+    }
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    workers = int(args[0]) if args else 4
+    cold = '--drop-caches' in sys.argv
+
+    print(f"{'engine':<9} {'load mean':>10} {'load max':>9} {'RSS +':>8} {'USS +':>8} {'PSS/worker':>11}")
+    for engine in ENGINES:
+        r = run_engine(engine, workers, cold)
+        print(f"{engine:<9} {r['load_ms']['mean']:8.1f}ms {r['load_ms']['max']:7.1f}ms "
+              f"{r['rss_delta_mb']:6.1f}MB {r['uss_delta_mb']:6.1f}MB {r['pss_mb']:9.1f}MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Prompt size of the market analysis prompts in 'full' (raw price list) versus
+'compact' (series descriptor) mode, per commodity and period.
+
+Run from the Llama directory:
+    python -m benchmarks.bench_price_prompt [--show]
+
+Set GROQ_API_KEY and compare both modes on the live endpoint with
+    /market_prices_new?commodity=...&region=...&period=90d&prompt_mode=full|compact
+to judge analysis quality.
+"""
+import sys
+from types import SimpleNamespace
+
+import blueprints.market_price_new as market_price_new
+from app import app
+from chat_history import estimate_tokens
+from llm_cache import LLMCache
+from price_store import get_national_price_store
+
+prompts = []
+
+
+class RecordingClient:
+    class chat:
+        class completions:
+            @staticmethod
+            def create(**kwargs):
+                prompts.append(kwargs["messages"][0]["content"][0]["text"])
+                reply = SimpleNamespace(content="---ANALISIS DATA---\nstabil")
+                return SimpleNamespace(choices=[SimpleNamespace(message=reply)])
+
+
+def main():
+    show = '--show' in sys.argv
+    market_price_new.get_client = lambda: RecordingClient
+    market_price_new.get_llm_cache = lambda: LLMCache(backend=None)
+    client = app.test_client()
+
+    commodities = sorted(get_national_price_store().keys())
+
+    print(f"{'commodity':<38}{'period':>7}{'full':>8}{'compact':>9}{'saved':>8}")
+    for period in ('30d', '90d'):
+        totals = [0, 0]
+        for commodity in commodities:
+            sizes = []
+            for mode in ('full', 'compact'):
+                prompts.clear()
+                client.get('/market_prices_new', query_string={
+                    'commodity': commodity, 'region': 'Nasional', 'period': period, 'prompt_mode': mode
+                })
+                sizes.append(estimate_tokens(prompts[-1]))
+                if show:
+                    print(prompts[-1])
+            totals[0] += sizes[0]
+            totals[1] += sizes[1]
+            print(f"{commodity:<38}{period:>7}{sizes[0]:>8}{sizes[1]:>9}{1 - sizes[1] / sizes[0]:>8.0%}")
+        print(f"{'mean':<38}{period:>7}{totals[0] // len(commodities):>8}{totals[1] // len(commodities):>9}{1 - totals[1] / totals[0]:>8.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""
+Startup time, first-request latency and per-worker memory of the gunicorn
+profile (gunicorn.conf.py) for each worker class, with and without preload.
+
+Each configuration is started as a real gunicorn process against a local
+fake Groq server. Reported per configuration:
+  - startup: seconds from launch until all workers answer /contextual_info
+  - first fert/crop: slowest first /fert_predict and /crop_rec per worker
+    (a cold worker unpickles the model inside that request)
+  - memory per worker from /proc/<pid>/smaps_rollup: RSS, PSS (RSS with
+    shared pages split between the processes sharing them) and USS (private
+    pages); with preload the model pages stay shared, so PSS/USS drop
+
+Linux only. Run from the Llama directory:
+    python -m benchmarks.bench_serving [workers] [configs]
+e.g. python -m benchmarks.bench_serving 4 sync:1,sync:0,gthread:1,gevent:1
+"""
+import importlib.util
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.fake_groq import FakeGroqServer
+
+DEFAULT_CONFIGS = 'sync:0,sync:1,gthread:0,gthread:1,gevent:1'
+LLAMA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FERT_BODY = {"SoilType": "Lempung", "CropType": "Padi", "Temperature": 30, "Humidity": 60,
+             "SoilMoisture": 40, "Nitrogen": 20, "Potassium": 5, "Phosphorous": 10}
+CROP_BODY = {"n": 90, "p": 42, "k": 43, "temperature": 20.9, "humidity": 82.0, "ph": 6.5, "rainfall": 202.9}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def request(url, body=None, timeout=60):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        resp.read()
+    return time.perf_counter() - start
+
+
+def worker_pids(master_pid):
+    try:
+        with open(f'/proc/{master_pid}/task/{master_pid}/children') as f:
+            return [int(pid) for pid in f.read().split()]
+    except OSError:
+        return []
+
+
+def memory_mb(pid):
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return {
+        'rss': fields.get('Rss', 0.0),
+        'pss': fields.get('Pss', 0.0),
+        'uss': fields.get('Private_Clean', 0.0) + fields.get('Private_Dirty', 0.0),
+    }
+
+
+def wait_ready(base_url, proc, workers, deadline, log):
+    """Block until every worker has booted and the app answers."""
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            log.seek(0)
+            raise RuntimeError(f"gunicorn exited with {proc.returncode}:\n{log.read().decode()[-2000:]}")
+        if len(worker_pids(proc.pid)) >= workers:
+            try:
+                request(base_url + '/contextual_info?condition=drought', timeout=5)
+                return
+            except (urllib.error.URLError, ConnectionError, TimeoutError):
+                pass
+        time.sleep(0.05)
+    raise TimeoutError("gunicorn did not become ready")
+
+
+def run_config(worker_class, preload, workers, groq_url):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(
+        os.environ,
+        GUNICORN_BIND=f"127.0.0.1:{port}",
+        GUNICORN_WORKERS=str(workers),
+        GUNICORN_WORKER_CLASS=worker_class,
+        GUNICORN_PRELOAD='1' if preload else '0',
+        GUNICORN_ACCESS_LOG='/dev/null',
+        GUNICORN_LOG_LEVEL='warning',
+        GROQ_API_KEY='bench',
+        GROQ_BASE_URL=groq_url,
+        GROQ_API_BASE=groq_url,
+        LLM_CACHE_BACKEND='none',
+        PYTHONWARNINGS='ignore',
+    )
+    log = tempfile.TemporaryFile()
+    start = time.time()
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+        cwd=LLAMA_DIR, env=env, stdout=subprocess.DEVNULL, stderr=log,
+    )
+    try:
+        wait_ready(base_url, proc, workers, start + 120, log)
+        startup = time.time() - start
+        # Enough sequential requests to reach every worker at least once
+        fert = max(request(base_url + '/fert_predict', FERT_BODY) for _ in range(workers * 3))
+        crop = max(request(base_url + '/crop_rec', CROP_BODY) for _ in range(workers * 3))
+        master = memory_mb(proc.pid)
+        per_worker = [memory_mb(pid) for pid in worker_pids(proc.pid)]
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        log.close()
+
+    def mean(key):
+        return sum(m[key] for m in per_worker) / len(per_worker)
+
+    return {
+        'worker_class': worker_class,
+        'preload': preload,
+        'workers': workers,
+        'startup_seconds': startup,
+        'first_fert_predict_ms': fert * 1000,
+        'first_crop_rec_ms': crop * 1000,
+        'master_mb': master,
+        'worker_mb': {key: mean(key) for key in ('rss', 'pss', 'uss')},
+        'total_pss_mb': master['pss'] + sum(m['pss'] for m in per_worker),
+    }
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    configs = (sys.argv[2] if len(sys.argv) > 2 else DEFAULT_CONFIGS).split(',')
+
+    groq_server = FakeGroqServer(latency=0.05).start()
+    print(f"{'config':<14} {'startup':>8} {'1st fert':>9} {'1st crop':>9} "
+          f"{'worker rss':>11} {'pss':>8} {'uss':>8} {'total pss':>10}")
+    try:
+        for config in configs:
+            worker_class, _, preload = config.partition(':')
+            name = f"{worker_class}{' preload' if preload != '0' else ''}"
+            if worker_class == 'gevent' and importlib.util.find_spec('gevent') is None:
+                print(f"{name:<14} skipped (gevent not installed)")
+                continue
+            r = run_config(worker_class, preload != '0', workers, groq_server.base_url)
+            w = r['worker_mb']
+            print(f"{name:<14} {r['startup_seconds']:7.2f}s {r['first_fert_predict_ms']:7.1f}ms "
+                  f"{r['first_crop_rec_ms']:7.1f}ms {w['rss']:9.1f}MB {w['pss']:6.1f}MB "
+                  f"{w['uss']:6.1f}MB {r['total_pss_mb']:8.1f}MB")
+    finally:
+        groq_server.stop()
+
+
+if __name__ == '__main__':
+    main()
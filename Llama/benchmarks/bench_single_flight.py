@@ -0,0 +1,52 @@
+"""
+Upstream call counts for a burst of identical /market_prices_new requests,
+with and without single-flight, against a local fake Groq server.
+
+Run from the Llama directory:
+    python -m benchmarks.bench_single_flight [concurrency] [latency_seconds]
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from groq import Groq
+
+import blueprints.market_price_new as market_price_new
+from app import app
+from benchmarks.fake_groq import FakeGroqServer
+from llm_cache import LLMCache
+from single_flight import SingleFlightClient
+
+URL = '/market_prices_new?commodity=Beras Medium&region=Nasional&period=30d'
+
+
+def burst(client, concurrency):
+    market_price_new.get_client = lambda: client
+    test_client = app.test_client()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        statuses = list(pool.map(lambda _: test_client.get(URL).status_code, range(concurrency)))
+    assert all(status == 200 for status in statuses), statuses
+    return time.perf_counter() - start
+
+
+def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+
+    # Measure coalescing alone, without the response cache
+    market_price_new.get_llm_cache = lambda: LLMCache(backend=None)
+
+    server = FakeGroqServer(latency=latency).start()
+    try:
+        raw = Groq(api_key="test", base_url=server.base_url)
+        for name, client in (('direct', raw), ('single-flight', SingleFlightClient(raw))):
+            calls_before = server.calls
+            elapsed = burst(client, concurrency)
+            print(f"{name:<14} {concurrency} requests -> {server.calls - calls_before:>3} upstream calls  ({elapsed:.2f} s)")
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Checks the fused crop preprocessor against the two-step sklearn pipeline
+(MinMaxScaler then StandardScaler) and times both on single rows.
+
+Run from the Llama directory:
+    python -m benchmarks.check_fused_scaler
+"""
+import time
+import warnings
+
+import numpy as np
+
+from models import get_crop_model, get_crop_preprocessor, get_crop_scaler_minmax, get_crop_scaler_standard
+
+warnings.filterwarnings("ignore")
+
+N_ROWS = 20000
+N_TIMING = 5000
+
+
+def main():
+    ms = get_crop_scaler_minmax()
+    sc = get_crop_scaler_standard()
+    fused = get_crop_preprocessor()
+    model = get_crop_model()
+
+    rng = np.random.default_rng(0)
+    span = ms.data_max_ - ms.data_min_
+    raw = rng.uniform(ms.data_min_ - 0.1 * span, ms.data_max_ + 0.1 * span, size=(N_ROWS, ms.n_features_in_))
+
+    expected = sc.transform(ms.transform(raw))
+    actual = fused.transform(raw)
+    np.testing.assert_allclose(actual, expected, rtol=1e-12, atol=1e-12)
+    assert np.array_equal(model.predict(actual), model.predict(expected)), "crop predictions differ"
+    np.testing.assert_allclose(fused.transform(raw[0]), expected[0], rtol=1e-12, atol=1e-12)
+    print(f"{N_ROWS} rows: fused transform matches sklearn (max abs diff {np.abs(actual - expected).max():.2e})")
+
+    for name, transform in (('sklearn', lambda row: sc.transform(ms.transform(row))), ('fused', fused.transform)):
+        start = time.perf_counter()
+        for i in range(N_TIMING):
+            transform(raw[i:i + 1])
+        elapsed = time.perf_counter() - start
+        print(f"  {name:<8} {elapsed / N_TIMING * 1e6:.1f} us/row")
+
+
+if __name__ == '__main__':
+    main()
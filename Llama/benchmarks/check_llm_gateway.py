@@ -0,0 +1,168 @@
+"""
+Behaviour checks for the LLM gateway against a local fake Groq server:
+retries on 5xx/429, read timeouts, the circuit breaker (including a
+half-open trial that finds the gateway busy), the concurrency cap and the
+app's 503 + Retry-After answer when the gateway refuses a call.
+
+Run from the Llama directory:
+    python -m benchmarks.check_llm_gateway
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import groq
+from groq import Groq
+
+from benchmarks.fake_groq import FakeGroqServer
+from llm_gateway import CircuitBreaker, CircuitOpen, GatewayBusy, GatewayClient, LLMGateway, make_http_client
+
+MESSAGES = [{"role": "user", "content": "Halo"}]
+
+
+def make_client(server, **gateway_kwargs):
+    gateway_kwargs.setdefault('sleep', lambda seconds: None)
+    gateway = LLMGateway(**gateway_kwargs)
+    raw = Groq(api_key="test", base_url=server.base_url, http_client=make_http_client(), max_retries=0)
+    return GatewayClient(raw, gateway), gateway
+
+
+def complete(client):
+    return client.chat.completions.create(model="llama3-70b-8192", messages=MESSAGES)
+
+
+def check_retries():
+    server = FakeGroqServer(latency=0, fail_statuses=[503, 429]).start()
+    try:
+        client, gateway = make_client(server, max_retries=2)
+        complete(client)
+        metrics = gateway.stats()['blueprints']['default']
+        assert server.calls == 3, server.calls
+        assert metrics['retries'] == 2 and metrics['calls'] == 1, metrics
+        assert metrics['prompt_tokens'] > 0, metrics
+    finally:
+        server.stop()
+    print("retries       503, 429 then 200 -> 3 upstream calls, 1 success")
+
+
+def check_timeout():
+    server = FakeGroqServer(latency=1.0).start()
+    try:
+        client, gateway = make_client(server, max_retries=1, timeouts={'default': 0.2})
+        start = time.perf_counter()
+        try:
+            complete(client)
+        except groq.APITimeoutError:
+            pass
+        else:
+            raise AssertionError("expected a timeout")
+        elapsed = time.perf_counter() - start
+        assert elapsed < 1.0, elapsed
+        assert gateway.stats()['blueprints']['default']['errors'] == 1
+    finally:
+        server.stop()
+    print(f"timeout       2 attempts at 0.2 s against a 1 s upstream -> gave up after {elapsed:.2f} s")
+
+
+def check_breaker():
+    server = FakeGroqServer(latency=0, fail_statuses=[500] * 10).start()
+    try:
+        client, gateway = make_client(server, max_retries=0, breaker=CircuitBreaker(threshold=3, reset_timeout=0.3))
+        for _ in range(3):
+            try:
+                complete(client)
+            except groq.InternalServerError:
+                pass
+        assert gateway.stats()['circuit'] == 'open'
+        calls = server.calls
+        try:
+            complete(client)
+        except CircuitOpen:
+            pass
+        else:
+            raise AssertionError("expected the circuit to be open")
+        assert server.calls == calls, "open circuit must not reach upstream"
+
+        server.fail_statuses.clear()
+        time.sleep(0.35)
+        complete(client)
+        assert gateway.stats()['circuit'] == 'closed'
+    finally:
+        server.stop()
+    print("breaker       3 failures open the circuit, trial call after reset closes it")
+
+
+def check_breaker_busy():
+    server = FakeGroqServer(latency=0, fail_statuses=[500]).start()
+    try:
+        client, gateway = make_client(server, max_retries=0, max_concurrency=1, acquire_timeout=0.05,
+                                      breaker=CircuitBreaker(threshold=1, reset_timeout=0.2))
+        try:
+            complete(client)
+        except groq.InternalServerError:
+            pass
+        assert gateway.stats()['circuit'] == 'open'
+
+        time.sleep(0.25)
+        # Every slot taken: the half-open trial times out waiting for one
+        gateway._semaphore.acquire()
+        try:
+            complete(client)
+        except GatewayBusy:
+            pass
+        else:
+            raise AssertionError("expected the gateway to be busy")
+        finally:
+            gateway._semaphore.release()
+
+        # The trial was given back, so the next call may try upstream and close the circuit
+        complete(client)
+        assert gateway.stats()['circuit'] == 'closed'
+    finally:
+        server.stop()
+    print("breaker busy  half-open trial rejected as busy -> next call still closes the circuit")
+
+
+def check_concurrency():
+    server = FakeGroqServer(latency=0.2).start()
+    try:
+        client, gateway = make_client(server, max_concurrency=2)
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(lambda _: complete(client), range(8)))
+        assert server.peak_concurrency <= 2, server.peak_concurrency
+        assert gateway.stats()['in_flight'] == 0
+    finally:
+        server.stop()
+    print(f"concurrency   8 callers, cap 2 -> peak {server.peak_concurrency} concurrent upstream requests")
+
+
+def check_error_responses():
+    from app import app
+
+    breaker = CircuitBreaker(threshold=1, reset_timeout=20)
+    breaker.record(False)
+    open_gateway = LLMGateway(breaker=breaker)
+    busy_gateway = LLMGateway(max_concurrency=1, acquire_timeout=0)
+    busy_gateway._semaphore.acquire()
+    app.add_url_rule('/_check/open', 'check_open', lambda: open_gateway.call(lambda timeout: 'unreachable'))
+    app.add_url_rule('/_check/busy', 'check_busy', lambda: busy_gateway.call(lambda timeout: 'unreachable'))
+
+    client = app.test_client()
+    for path, retry_after in (('/_check/open', '20'), ('/_check/busy', '1')):
+        response = client.get(path)
+        assert response.status_code == 503, response.status_code
+        assert response.get_json()['status'] == 'error', response.get_data(as_text=True)
+        assert response.headers['Retry-After'] == retry_after, response.headers.get('Retry-After')
+    print("responses     open circuit -> 503 Retry-After 20, gateway busy -> 503 Retry-After 1")
+
+
+def main():
+    check_retries()
+    check_timeout()
+    check_breaker()
+    check_breaker_busy()
+    check_concurrency()
+    check_error_responses()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Behaviour checks for the sampling profiler through its admin routes:
+start, sampled requests, stop and the merged stacks, plus a stop reaching
+a worker that gets no further requests.
+
+Run from the Llama directory:
+    python -m benchmarks.check_profiler
+"""
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+TOKEN = 'check'
+# Must be set before the app (and profiler.py) are imported
+os.environ.update({'PROFILER_TOKEN': TOKEN, 'PROFILER_DIR': tempfile.mkdtemp(prefix='profiler-check-')})
+
+from app import app  # noqa: E402
+from profiler import CONTROL_CHECK_INTERVAL, PROFILER_DIR, SamplingProfiler, get_profiler  # noqa: E402
+
+HEADERS = {'X-Admin-Token': TOKEN}
+
+
+def busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def check_busy():
+    busy_wait(0.03)
+    return 'ok'
+
+
+app.add_url_rule('/_check/busy', 'check_busy', check_busy)
+
+
+def stack_total(text):
+    return sum(int(line.rpartition(' ')[2]) for line in text.splitlines() if line)
+
+
+def check_start_stop(client):
+    response = client.post('/admin/profiler/start', json={'duration': 5, 'fraction': 1.0}, headers=HEADERS)
+    session = response.get_json()
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(lambda _: client.get('/_check/busy'), range(40)))
+
+    client.post('/admin/profiler/stop', headers=HEADERS)
+    time.sleep(0.2)
+    sampler = get_profiler()._sampler
+    assert sampler is not None and not sampler.is_alive(), "sampler still running after stop"
+
+    status = client.get('/admin/profiler', headers=HEADERS).get_json()
+    assert not status['active']
+    sampled = sum(status['worker']['stack_samples'].values())
+    stacks = client.get(f"/admin/profiler/stacks?session={session['id']}", headers=HEADERS).get_data(as_text=True)
+    assert sampled > 0 and stack_total(stacks) == sampled, (stack_total(stacks), sampled)
+    assert 'check_busy' in stacks
+
+    # Requests after the stop are not profiled
+    for _ in range(5):
+        client.get('/_check/busy')
+    stacks_after = client.get(f"/admin/profiler/stacks?session={session['id']}", headers=HEADERS).get_data(as_text=True)
+    assert stack_total(stacks_after) == sampled
+    print(f"start/stop    {sampled} samples, all in /stacks 0.2 s after stop, sampler stopped")
+
+
+def check_idle_worker(client):
+    # A second profiler on the same directory stands in for another worker
+    other = SamplingProfiler(directory=PROFILER_DIR)
+    session = other.start(duration=60, fraction=1.0)
+
+    def request_on_other_worker():
+        other.begin_request('other')
+        busy_wait(0.3)
+        other.end_request()
+
+    thread = threading.Thread(target=request_on_other_worker)
+    thread.start()
+    thread.join()
+    assert other._sampler.is_alive()
+
+    # Stopped through this worker; the other one gets no request afterwards
+    client.post('/admin/profiler/stop', headers=HEADERS)
+    stopped_at = time.time()
+    while other._sampler.is_alive() and time.time() < stopped_at + CONTROL_CHECK_INTERVAL + 0.5:
+        time.sleep(0.05)
+    elapsed = time.time() - stopped_at
+    assert not other._sampler.is_alive(), "idle worker kept sampling after stop"
+    stacks = client.get(f"/admin/profiler/stacks?session={session['id']}", headers=HEADERS).get_data(as_text=True)
+    assert stack_total(stacks) == other._samples > 0, (stack_total(stacks), other._samples)
+    print(f"idle worker   sampler stopped {elapsed:.2f} s after stop, {other._samples} samples flushed")
+
+
+def main():
+    client = app.test_client()
+    check_start_stop(client)
+    check_idle_worker(client)
+
+
+if __name__ == '__main__':
+    main()
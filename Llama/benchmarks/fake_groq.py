@@ -0,0 +1,234 @@
+"""
+Local stand-in for the Groq OpenAI-compatible chat completions API.
+
+    server = FakeGroqServer(latency=0.5).start()
+    client = Groq(api_key="test", base_url=server.base_url)
+
+Replies follow the exact format the prompts ask for (---AWAL DIAGNOSIS---
+with Diagnosis/Tingkat Risiko/Perkiraan Dampak Panen lines,
+---AWAL PENJELASAN---/---AWAL REKOMENDASI--- with "- " bullets,
+---ANALISIS DATA---), so the blueprints' parsers do their real work;
+bench_endpoints checks the parsed fields. `stream=True` requests are answered
+as SSE chunks. `latency` is a number of seconds or a callable returning one
+(see latency_distribution).
+
+`fail_statuses` is a list of HTTP status codes returned (in order) by the
+first calls before the server starts answering normally; `peak_concurrency`
+records the most requests it handled at once.
+
+Run standalone (e.g. to point a dev server at it with GROQ_BASE_URL and
+GROQ_API_BASE) from the Llama directory:
+    python -m benchmarks.fake_groq [port] [latency_spec]
+"""
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MARKET_REPLY = "---ANALISIS DATA---\nHarga cenderung stabil dalam periode ini."
+
+DIAGNOSIS_REPLY = """---AWAL DIAGNOSIS---
+Diagnosis: Bercak Daun Cercospora
+Tingkat Risiko: Sedang
+Perkiraan Dampak Panen: Penurunan 20-30%
+---AKHIR DIAGNOSIS---
+
+---AWAL PENJELASAN---
+Penjelasan: Daun menunjukkan bercak bulat kecokelatan dengan tepi kekuningan, ciri khas infeksi jamur Cercospora yang menyebar pada kelembapan tinggi.
+---AKHIR PENJELASAN---
+
+---AWAL REKOMENDASI---
+Rekomendasi:
+- Pangkas dan musnahkan daun yang terinfeksi.
+- Semprotkan fungisida berbahan aktif mankozeb sesuai dosis anjuran.
+- Atur jarak tanam agar sirkulasi udara lebih baik.
+---AKHIR REKOMENDASI---"""
+
+ADVICE_REPLY = """---AWAL PENJELASAN---
+Penjelasan: Kondisi tanah dan iklim yang diberikan sesuai dengan kebutuhan tanaman ini, terutama kadar unsur hara dan curah hujannya.
+---AKHIR PENJELASAN---
+
+---AWAL REKOMENDASI---
+Rekomendasi:
+- Lakukan pengolahan tanah sebelum tanam.
+- Berikan pupuk dasar sesuai hasil uji tanah.
+- Pantau kelembapan tanah secara berkala.
+---AKHIR REKOMENDASI---"""
+
+CHAT_REPLY = (
+    "Untuk meningkatkan hasil panen, pastikan pemupukan berimbang, pengairan yang cukup "
+    "dan pengendalian hama terpadu sesuai fase pertumbuhan tanaman."
+)
+
+
+def templated_reply(messages):
+    """Pick the reply template matching the section markers in the prompt."""
+    prompt = json.dumps(messages, ensure_ascii=False)
+    if '---AWAL DIAGNOSIS---' in prompt:
+        return DIAGNOSIS_REPLY
+    if '---AWAL PENJELASAN---' in prompt:
+        return ADVICE_REPLY
+    if '---ANALISIS DATA---' in prompt:
+        return MARKET_REPLY
+    return CHAT_REPLY
+
+
+def latency_distribution(spec):
+    """
+    Latency callable from a spec string:
+    'fixed:S', 'uniform:LOW,HIGH' or 'lognormal:MEDIAN,SIGMA' (seconds).
+    A bare number is treated as fixed.
+    """
+    kind, _, args = spec.partition(':')
+    if not args:
+        kind, args = 'fixed', kind
+    params = [float(a) for a in args.split(',')]
+    if kind == 'fixed':
+        return lambda: params[0]
+    if kind == 'uniform':
+        return lambda: random.uniform(params[0], params[1])
+    if kind == 'lognormal':
+        median, sigma = params
+        return lambda: median * random.lognormvariate(0, sigma)
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class FakeGroqServer:
+    def __init__(self, latency=0.5, reply=None, fail_statuses=None, host='127.0.0.1', port=0):
+        self.latency = latency
+        self.reply = reply
+        self.fail_statuses = list(fail_statuses or [])
+        self.calls = 0
+        self.active = 0
+        self.peak_concurrency = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def next_latency(self):
+        return self.latency() if callable(self.latency) else self.latency
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                with server._lock:
+                    server.calls += 1
+                    server.active += 1
+                    server.peak_concurrency = max(server.peak_concurrency, server.active)
+                    status = server.fail_statuses.pop(0) if server.fail_statuses else 200
+                try:
+                    time.sleep(server.next_latency())
+                    if status != 200:
+                        self._send(status, {"error": {"message": f"simulated {status}", "type": "server_error"}})
+                    elif body.get('stream'):
+                        self._stream(server.chunks(body))
+                    else:
+                        self._send(200, server.completion(body))
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client gave up (e.g. read timeout)
+                    pass
+                finally:
+                    with server._lock:
+                        server.active -= 1
+
+            def _send(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _stream(self, chunks):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                for chunk in chunks:
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def reply_for(self, body):
+        return self.reply if self.reply is not None else templated_reply(body.get("messages", []))
+
+    def usage(self, body, reply):
+        prompt_tokens = len(json.dumps(body.get("messages", []))) // 4
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(reply) // 4,
+            "total_tokens": prompt_tokens + len(reply) // 4
+        }
+
+    def completion(self, body):
+        reply = self.reply_for(body)
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": reply},
+                "finish_reason": "stop"
+            }],
+            "usage": self.usage(body, reply)
+        }
+
+    def chunks(self, body):
+        reply = self.reply_for(body)
+        words = reply.split(' ')
+        for i, word in enumerate(words):
+            yield {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": word if i == 0 else " " + word},
+                    "finish_reason": None
+                }]
+            }
+        yield {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "x_groq": {"usage": self.usage(body, reply)}
+        }
+
+    def start(self):
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8787
+    latency = latency_distribution(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    server = FakeGroqServer(latency=latency, port=port)
+    print(f"Fake Groq API on {server.base_url}")
+    server._httpd.serve_forever()
@@ -1,20 +1,26 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from constant import LANGUAGES
 from models import get_llm
+from chat_history import get_history_manager
+from metrics import stage
+from llm_gateway import LLMUnavailable
+import json
 
 chat_bp = Blueprint("chat_bp", __name__)
 
-@chat_bp.route('/chat', methods=['POST'])
-def chat():
-    data = request.json
+def build_messages(data):
+    """
+    Returns (messages, lang, usage, error_response) for a /chat request body.
+    History is compacted to the configured token budget (see chat_history.py).
+    """
     user_query = data.get('query')
     lang = data.get('language', 'id')
     history = data.get('history', [])
     if not user_query:
-        return jsonify({"error": "Query is required"}), 400
+        return None, lang, None, (jsonify({"error": "Query is required"}), 400)
 
     if lang not in LANGUAGES:
-        return jsonify({"error": f"Unsupported language code"}), 400
+        return None, lang, None, (jsonify({"error": f"Unsupported language code"}), 400)
 
     messages = [{"role": "system", "content": get_system_prompt(lang)}]
     
@@ -25,22 +31,81 @@ def chat():
             messages.append({"role": role, "content": content})
 
     messages.append({"role": "user", "content": user_query})
+    messages, usage = get_history_manager().compact(messages, data.get('conversation_id'))
+    return messages, lang, usage, None
+
+@chat_bp.route('/chat', methods=['POST'])
+def chat():
+    if request.args.get('stream') == '1':
+        return chat_stream()
+
+    data = request.json
+    messages, lang, usage, error = build_messages(data)
+    if error:
+        return error
     
     llm = get_llm()
     
     try:
-        response = llm.invoke(messages)
+        with stage('llm'):
+            response = llm.invoke(messages)
         return jsonify({
             "response": response.content,
             "language": LANGUAGES[lang],
+            "usage": usage,
             "status": "success"
         })
+    except LLMUnavailable:
+        # Answered as 503 with Retry-After by the app's error handler
+        raise
     except Exception as e:
         return jsonify({
             "error": str(e),
             "status": "error"
         }), 500
 
+def sse_event(data, event=None):
+    payload = f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+    return f"event: {event}\n{payload}" if event else payload
+
+@chat_bp.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Same request body as /chat, answered as Server-Sent Events: one
+    `data: {"token": ...}` event per chunk, then a final `done` event with the
+    language/status metadata (or an `error` event).
+    """
+    data = request.json
+    messages, lang, usage, error = build_messages(data)
+    if error:
+        return error
+
+    llm = get_llm()
+
+    def generate():
+        chunks = llm.stream(messages)
+        try:
+            for chunk in chunks:
+                if chunk.content:
+                    yield sse_event({"token": chunk.content})
+            yield sse_event({"language": LANGUAGES[lang], "usage": usage, "status": "success"}, event="done")
+        except Exception as e:
+            yield sse_event({"error": str(e), "status": "error"}, event="error")
+        finally:
+            # Runs on client disconnect too (GeneratorExit): closing the
+            # upstream iterator aborts the streaming HTTP call
+            chunks.close()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@chat_bp.route('/chat/metrics', methods=['GET'])
+def chat_metrics():
+    return jsonify(get_history_manager().metrics())
+
 def get_system_prompt(lang='id'):
     base_prompt = """Anda adalah AgriBot, seorang ahli di bidang pertanian Indonesia dengan pengetahuan mendalam tentang:
     - Praktik pertanian tradisional dan modern di berbagai wilayah Indonesia
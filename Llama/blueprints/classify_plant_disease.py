@@ -1,13 +1,25 @@
 from flask import Blueprint, request, jsonify
 from constant import LANGUAGES
+from jobs import async_job
 from models import get_client
+from image_preprocessing import (
+    prepare_image, to_data_url, dhash_bytes, InvalidImage, IMAGE_PREPROCESSING, IMAGE_MAX_UPLOAD_BYTES
+)
+from image_cache import get_image_cache, IMAGE_CACHE_ENABLED
+from metrics import stage
 import base64
 import re
 
 classify_plant_disease_bp = Blueprint("classify_plant_disease_bp", __name__)
 
 @classify_plant_disease_bp.route('/classify_plant_disease', methods=['POST'])
+@async_job
 def classify_plant_disease():
+    # Reject oversized uploads before the multipart body is parsed; bodies
+    # without a Content-Length are cut off by MAX_CONTENT_LENGTH (see app.py)
+    if request.content_length is not None and request.content_length > IMAGE_MAX_UPLOAD_BYTES:
+        return jsonify({"error": f"Upload exceeds the limit of {IMAGE_MAX_UPLOAD_BYTES // (1024 * 1024)} MB"}), 413
+
     if 'image' not in request.files:
         return jsonify({"error": "No image file provided"}), 400
 
@@ -21,10 +33,33 @@ def classify_plant_disease():
         ), 400
 
     image_file = request.files['image']
-    try:
-        image_data_url = f"data:image/jpeg;base64,{base64.b64encode(image_file.read()).decode()}"
-    except Exception as e:
-        return jsonify({"error": f"Failed to read image file: {str(e)}"}), 500
+    if IMAGE_PREPROCESSING:
+        # Downscale and re-encode before base64 so the vision request stays small
+        try:
+            with stage('feature_prep'):
+                image_bytes, image_stats = prepare_image(image_file.stream)
+        except InvalidImage as e:
+            return jsonify({"error": str(e)}), 400
+        image_hash = image_stats['dhash']
+        image_data_url = to_data_url(image_bytes)
+    else:
+        try:
+            image_bytes = image_file.read()
+            image_data_url = f"data:image/jpeg;base64,{base64.b64encode(image_bytes).decode()}"
+        except Exception as e:
+            return jsonify({"error": f"Failed to read image file: {str(e)}"}), 500
+        image_hash = None
+
+    # Re-uploads and near-duplicate photos reuse the stored diagnosis (see image_cache.py)
+    if IMAGE_CACHE_ENABLED:
+        if image_hash is None:
+            try:
+                image_hash = dhash_bytes(image_bytes)
+            except InvalidImage as e:
+                return jsonify({"error": str(e)}), 400
+        cached_result, distance = get_image_cache().get(image_hash, lang)
+        if cached_result is not None:
+            return jsonify(dict(cached_result, cached=True, hash_distance=distance)), 200
 
     prompt = f"""Anda adalah seorang ahli pertanian yang menganalisis penyakit tanaman.
     Sajikan informasi dalam format berikut (gunakan Bahasa {LANGUAGES[lang]}):
@@ -54,51 +89,55 @@ def classify_plant_disease():
 
     client = get_client()
 
-    completion = client.chat.completions.create(
-        model="meta-llama/llama-4-scout-17b-16e-instruct", 
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": prompt},
-                    {"type": "image_url", "image_url": {"url": image_data_url}}
-                ]
-            }
-        ],
-        temperature=0.7,
-        max_tokens=1024,
-    )
-
-    raw_llm_output = completion.choices[0].message.content
+    with stage('llm'):
+        completion = client.chat.completions.create(
+            model="meta-llama/llama-4-scout-17b-16e-instruct", 
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": prompt},
+                        {"type": "image_url", "image_url": {"url": image_data_url}}
+                    ]
+                }
+            ],
+            temperature=0.7,
+            max_tokens=1024,
+        )
+
+        raw_llm_output = completion.choices[0].message.content
     # reasoning_content = completion.choices[0].message.reasoning_content
 
 
-    parsed_diagnosis = "Tidak terdeteksi"
-    parsed_tingkat_risiko = "Tidak ada"
-    parsed_dampak_panen = "Tidak ada"
-    parsed_penjelasan = "Tidak ada penjelasan spesifik."
-    parsed_rekomendasi = []
-
-    diagnosis_match = re.search(r'---AWAL DIAGNOSIS---(.*?)---AKHIR DIAGNOSIS---', raw_llm_output, re.DOTALL)
-    if diagnosis_match:
-        content = diagnosis_match.group(1)
-        diag_line = re.search(r'Diagnosis: (.*)', content)
-        if diag_line: parsed_diagnosis = diag_line.group(1).strip()
-        risiko_line = re.search(r'Tingkat Risiko: (.*)', content)
-        if risiko_line: parsed_tingkat_risiko = risiko_line.group(1).strip()
-        dampak_line = re.search(r'Perkiraan Dampak Panen: (.*)', content)
-        if dampak_line: parsed_dampak_panen = dampak_line.group(1).strip()
-
-    penjelasan_match = re.search(r'---AWAL PENJELASAN---(.*?)---AKHIR PENJELASAN---', raw_llm_output, re.DOTALL)
-    if penjelasan_match:
-        parsed_penjelasan = penjelasan_match.group(1).strip().replace("Penjelasan:", "").strip()
-
-    rekomendasi_match = re.search(r'---AWAL REKOMENDASI---(.*?)---AKHIR REKOMENDASI---', raw_llm_output, re.DOTALL)
-    if rekomendasi_match:
-        content = rekomendasi_match.group(1)
-        parsed_rekomendasi = [line.strip().lstrip('- ').strip() for line in content.split('\n') if line.strip() and line.strip().startswith('-')]
-
-    return jsonify({
+    with stage('parse'):
+        parsed_diagnosis = "Tidak terdeteksi"
+        parsed_tingkat_risiko = "Tidak ada"
+        parsed_dampak_panen = "Tidak ada"
+        parsed_penjelasan = "Tidak ada penjelasan spesifik."
+        parsed_rekomendasi = []
+        diagnosis_parsed = False
+
+        diagnosis_match = re.search(r'---AWAL DIAGNOSIS---(.*?)---AKHIR DIAGNOSIS---', raw_llm_output, re.DOTALL)
+        if diagnosis_match:
+            content = diagnosis_match.group(1)
+            diag_line = re.search(r'Diagnosis: (.*)', content)
+            if diag_line: parsed_diagnosis = diag_line.group(1).strip()
+            diagnosis_parsed = diag_line is not None
+            risiko_line = re.search(r'Tingkat Risiko: (.*)', content)
+            if risiko_line: parsed_tingkat_risiko = risiko_line.group(1).strip()
+            dampak_line = re.search(r'Perkiraan Dampak Panen: (.*)', content)
+            if dampak_line: parsed_dampak_panen = dampak_line.group(1).strip()
+
+        penjelasan_match = re.search(r'---AWAL PENJELASAN---(.*?)---AKHIR PENJELASAN---', raw_llm_output, re.DOTALL)
+        if penjelasan_match:
+            parsed_penjelasan = penjelasan_match.group(1).strip().replace("Penjelasan:", "").strip()
+
+        rekomendasi_match = re.search(r'---AWAL REKOMENDASI---(.*?)---AKHIR REKOMENDASI---', raw_llm_output, re.DOTALL)
+        if rekomendasi_match:
+            content = rekomendasi_match.group(1)
+            parsed_rekomendasi = [line.strip().lstrip('- ').strip() for line in content.split('\n') if line.strip() and line.strip().startswith('-')]
+
+    result = {
         "diagnosis": parsed_diagnosis,
         "tingkat_risiko": parsed_tingkat_risiko,
         "dampak_panen": parsed_dampak_panen,
@@ -107,4 +146,10 @@ def classify_plant_disease():
         "language": LANGUAGES[lang],
         "status": "success",
         "raw_llm": raw_llm_output
-    }), 200
+    }
+    # Near-duplicates would get the fallback fields too, so only a parsed diagnosis is stored
+    if IMAGE_CACHE_ENABLED and diagnosis_parsed:
+        get_image_cache().set(image_hash, lang, result)
+
+    with stage('serialize'):
+        return jsonify(dict(result, cached=False)), 200
@@ -1,12 +1,16 @@
 from flask import Blueprint, request, jsonify
 from constant import LANGUAGES
-from models import get_crop_model, get_crop_scaler_minmax, get_crop_scaler_standard, get_client
+from jobs import async_job
+from models import get_crop_model, get_crop_preprocessor, get_client
+from llm_cache import get_llm_cache, cache_key, bin_value
+from metrics import stage
 import re
 import numpy as np
 
 crop_rec_bp = Blueprint("crop_rec_bp", __name__)
 
 @crop_rec_bp.route("/crop_rec",methods=['POST'])
+@async_job
 def crop_recom():
     data = request.get_json()
 
@@ -19,16 +23,18 @@ def crop_recom():
     ph = data.get('ph')
     rainfall = data.get('rainfall')
 
-    feature_list = [N, P, K, temperature, humidity, ph, rainfall]
-    single_pred = np.array(feature_list).reshape(1, -1)
+    with stage('model_load'):
+        model = get_crop_model()
+        preprocessor = get_crop_preprocessor()
 
-    model = get_crop_model()
-    ms = get_crop_scaler_minmax()
-    sc = get_crop_scaler_standard()
-    
-    scaled_features = ms.transform(single_pred)
-    final_features = sc.transform(scaled_features)
-    prediction = model.predict(final_features)
+    with stage('feature_prep'):
+        feature_list = [N, P, K, temperature, humidity, ph, rainfall]
+        single_pred = np.array(feature_list).reshape(1, -1)
+        # MinMaxScaler + StandardScaler fused into one affine transform
+        final_features = preprocessor.transform(single_pred)
+
+    with stage('predict'):
+        prediction = model.predict(final_features)
 
     crop_dict = {1: "Beras", 2: "Jagung", 3: "Bayam Molucca", 4: "Kapas", 5: "Kelapa", 6: "Pepaya", 7: "Jeruk",
                 8: "Apel", 9: "Melon", 10: "Semangka", 11: "Anggur", 12: "Mangga", 13: "Pisang",
@@ -80,46 +86,62 @@ def crop_recom():
     """
 
 
-    client = get_client()
-
-    completion = client.chat.completions.create(
-        model="meta-llama/llama-4-scout-17b-16e-instruct", 
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": prompt},
-                ]
-            }
-        ],
-        temperature=0.3,
-        max_tokens=1024,
+    def generate_explanation():
+        client = get_client()
+        completion = client.chat.completions.create(
+            model="meta-llama/llama-4-scout-17b-16e-instruct", 
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": prompt},
+                    ]
+                }
+            ],
+            temperature=0.3,
+            max_tokens=1024,
+        )
+        return completion.choices[0].message.content
+
+    # Explanations for near-identical inputs are reused (see llm_cache.py)
+    explanation_key = cache_key(
+        'crop_rec', crop=crop, lang=lang,
+        n=bin_value(N, 10), p=bin_value(P, 10), k=bin_value(K, 10),
+        temperature=bin_value(temperature, 2), humidity=bin_value(humidity, 5),
+        ph=bin_value(ph, 0.5), rainfall=bin_value(rainfall, 25)
     )
-
-    raw_llm_output = completion.choices[0].message.content
+    with stage('llm'):
+        raw_llm_output, cached = get_llm_cache().get_or_create(
+            explanation_key, generate_explanation,
+            # Only completions whose explanation parses are reused
+            valid=lambda text: re.search(r'---AWAL PENJELASAN---(.*?)---AKHIR PENJELASAN---', text, re.DOTALL) is not None
+        )
     # reasoning_content = completion.choices[0].message.reasoning_content
 
-    penjelasan_match = re.search(r'---AWAL PENJELASAN---(.*?)---AKHIR PENJELASAN---', raw_llm_output, re.DOTALL)
-    if penjelasan_match:
-        parsed_penjelasan = penjelasan_match.group(1).strip().replace("Penjelasan:", "").strip()
+    with stage('parse'):
+        penjelasan_match = re.search(r'---AWAL PENJELASAN---(.*?)---AKHIR PENJELASAN---', raw_llm_output, re.DOTALL)
+        if penjelasan_match:
+            parsed_penjelasan = penjelasan_match.group(1).strip().replace("Penjelasan:", "").strip()
 
-    rekomendasi_match = re.search(r'---AWAL REKOMENDASI---(.*?)---AKHIR REKOMENDASI---', raw_llm_output, re.DOTALL)
-    if rekomendasi_match:
-        content = rekomendasi_match.group(1)
-        parsed_rekomendasi = [line.strip().lstrip('- ').strip() for line in content.split('\n') if line.strip() and line.strip().startswith('-')]
+        rekomendasi_match = re.search(r'---AWAL REKOMENDASI---(.*?)---AKHIR REKOMENDASI---', raw_llm_output, re.DOTALL)
+        if rekomendasi_match:
+            content = rekomendasi_match.group(1)
+            parsed_rekomendasi = [line.strip().lstrip('- ').strip() for line in content.split('\n') if line.strip() and line.strip().startswith('-')]
     
     #================================================================
-    return jsonify({
-        'Nitrogen': N,
-        'Phosporus': P,
-        'Potassium': K,
-        'Temperature': temperature,
-        'Humidity': humidity,
-        'Ph': ph,
-        'Rainfall': rainfall,
-        'Description': parsed_penjelasan,
-        'recomendation':parsed_rekomendasi,
-        'PredictedCrop': crop,
-        'raw_llm_out':raw_llm_output
-    })
+    with stage('serialize'):
+        return jsonify({
+            'Nitrogen': N,
+            'Phosporus': P,
+            'Potassium': K,
+            'Temperature': temperature,
+            'Humidity': humidity,
+            'Ph': ph,
+            'Rainfall': rainfall,
+            'Description': parsed_penjelasan,
+            'recomendation':parsed_rekomendasi,
+            'PredictedCrop': crop,
+            'raw_llm_out':raw_llm_output,
+            'cached': cached
+        })
     
\ No newline at end of file
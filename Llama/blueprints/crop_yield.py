@@ -1,11 +1,42 @@
 from flask import Blueprint, request, jsonify
 import pandas as pd
+from jobs import async_job
 from models import get_crop_yield_model_indonesia, get_client
+from llm_cache import get_llm_cache, cache_key, bin_value
+from metrics import stage
 from constant import LANGUAGES
 import re
 
 crop_yield_bp = Blueprint('crop_yield_bp', __name__)
 
+CROP_NAME_MAP = {
+    "Padi": "Rice, paddy",
+    "Jagung": "Maize",
+    "Kedelai": "Soybeans",
+    "Ubi Jalar": "Sweet potatoes",
+    "Singkong": "Cassava",
+    "Kentang": "Potatoes"
+}
+
+SEASON_DATA = {
+    "Kemarau": {'average_rain_fall_mm_per_year': 200, 'avg_temp': 30, 'pesticides_tonnes': 3},
+    "Hujan": {'average_rain_fall_mm_per_year': 300, 'avg_temp': 26, 'pesticides_tonnes': 2},
+    "Pancaroba": {'average_rain_fall_mm_per_year': 250, 'avg_temp': 28, 'pesticides_tonnes': 2}
+}
+
+CROP_COLUMNS = [
+    'Item_Cassava',
+    'Item_Maize',
+    'Item_Potatoes',
+    'Item_Rice, paddy',
+    'Item_Soybeans',
+    'Item_Sweet potatoes'
+]
+
+# (season, mapped crop) -> predicted yield in hg/ha, built from the loaded model
+_yield_table = None
+_yield_table_source = None
+
 def normalize_input(input_dict, min_vals, max_vals):
     norm_input = {}
     for key in input_dict:
@@ -20,40 +51,12 @@ def normalize_input(input_dict, min_vals, max_vals):
     return pd.DataFrame([norm_input])
 
 
-@crop_yield_bp.route('/crop_yield', methods=['POST'])
-def crop_yield():
-    data = request.get_json()
-
-    # Get inputs
-    area = float(data.get('Area', 1))
-    district = data.get('District', '')
-    crop = data.get('Crop', '')
-    season = data.get('Season', '')
-    lang = request.form.get('language', 'id')
-
-    crop_name_map = {
-        "Padi": "Rice, paddy",
-        "Jagung": "Maize",
-        "Kedelai": "Soybeans",
-        "Ubi Jalar": "Sweet potatoes",
-        "Singkong": "Cassava",
-        "Kentang": "Potatoes"
-    }
-    mapped_crop = crop_name_map.get(crop, "")
-
-    crop_data = {
-        "Kemarau": {'average_rain_fall_mm_per_year': 200, 'avg_temp': 30, 'pesticides_tonnes': 3},
-        "Hujan": {'average_rain_fall_mm_per_year': 300, 'avg_temp': 26, 'pesticides_tonnes': 2},
-        "Pancaroba": {'average_rain_fall_mm_per_year': 250, 'avg_temp': 28, 'pesticides_tonnes': 2}
-    }
-
-    model, data_max, data_min = get_crop_yield_model_indonesia()
-
+def build_yield_features(season, mapped_crop, data_min, data_max):
     # Build raw input dict
     raw_input = {
-        'average_rain_fall_mm_per_year': crop_data[season]['average_rain_fall_mm_per_year'],
-        'avg_temp': crop_data[season]['avg_temp'],
-        'pesticides_tonnes': crop_data[season]['pesticides_tonnes'],
+        'average_rain_fall_mm_per_year': SEASON_DATA[season]['average_rain_fall_mm_per_year'],
+        'avg_temp': SEASON_DATA[season]['avg_temp'],
+        'pesticides_tonnes': SEASON_DATA[season]['pesticides_tonnes'],
     }
 
     # Normalize numeric input
@@ -61,22 +64,46 @@ def crop_yield():
 
     # Add categorical (boolean) features
     normalized['Country_Indonesia'] = True
-    crop_columns = [
-        'Item_Cassava',
-        'Item_Maize',
-        'Item_Potatoes',
-        'Item_Rice, paddy',
-        'Item_Soybeans',
-        'Item_Sweet potatoes'
-    ]
-    for col in crop_columns:
+    for col in CROP_COLUMNS:
         normalized[col] = (col == f"Item_{mapped_crop}")
+    return normalized
 
-    # Make into DataFrame
-    final_input = pd.DataFrame([normalized])
 
-    # Predict yield per hectare
-    predicted_yield_hg_per_ha = model.predict(final_input)[0]
+def get_yield_table():
+    """
+    The model inputs depend only on season and crop, so every combination is
+    predicted once per loaded model and requests are answered by lookup.
+    Unknown crops map to "" (no Item_ column set), as in the original route.
+    """
+    global _yield_table, _yield_table_source
+
+    model, data_max, data_min = get_crop_yield_model_indonesia()
+    source = (model, data_max, data_min)
+    if _yield_table is None or any(a is not b for a, b in zip(source, _yield_table_source)):
+        keys = [(season, mapped_crop) for season in SEASON_DATA for mapped_crop in [*CROP_NAME_MAP.values(), ""]]
+        final_input = pd.DataFrame([build_yield_features(season, mapped_crop, data_min, data_max) for season, mapped_crop in keys])
+        predictions = model.predict(final_input)
+        _yield_table, _yield_table_source = dict(zip(keys, predictions)), source
+    return _yield_table
+
+
+@crop_yield_bp.route('/crop_yield', methods=['POST'])
+@async_job
+def crop_yield():
+    data = request.get_json()
+
+    # Get inputs
+    area = float(data.get('Area', 1))
+    district = data.get('District', '')
+    crop = data.get('Crop', '')
+    season = data.get('Season', '')
+    lang = request.form.get('language', 'id')
+
+    mapped_crop = CROP_NAME_MAP.get(crop, "")
+
+    # Predicted yield per hectare (precomputed per season x crop)
+    with stage('predict'):
+        predicted_yield_hg_per_ha = get_yield_table()[(season, mapped_crop)]
 
     # Total yield
     # Convert to tons/ha
@@ -111,46 +138,62 @@ def crop_yield():
     Template ini digunakan untuk memprediksi hasil panen berdasarkan jenis tanaman, musim tanam, dan luas lahan.
     """
     
-    client = get_client()
-
-    completion = client.chat.completions.create(
-        model="meta-llama/llama-4-scout-17b-16e-instruct", 
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": prompt},
-                ]
-            }
-        ],
-        temperature=0.7,
-        max_tokens=1024,
+    def generate_explanation():
+        client = get_client()
+        completion = client.chat.completions.create(
+            model="meta-llama/llama-4-scout-17b-16e-instruct", 
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": prompt},
+                    ]
+                }
+            ],
+            temperature=0.7,
+            max_tokens=1024,
+        )
+        return completion.choices[0].message.content
+
+    # Explanations for near-identical inputs are reused (see llm_cache.py).
+    # The prompt quotes the prediction, so it is part of the key: a reloaded
+    # model or another input in the same area bin gets its own text.
+    explanation_key = cache_key(
+        'crop_yield', season=season, crop=crop, district=district, lang=lang,
+        area=bin_value(area, 0.1), yield_per_ha=round(predicted_yield_per_ha, 2)
     )
-
-    raw_llm_output = completion.choices[0].message.content
+    with stage('llm'):
+        raw_llm_output, cached = get_llm_cache().get_or_create(
+            explanation_key, generate_explanation,
+            # Only completions whose explanation parses are reused
+            valid=lambda text: re.search(r'---AWAL PENJELASAN---(.*?)---AKHIR PENJELASAN---', text, re.DOTALL) is not None
+        )
     # reasoning_content = completion.choices[0].message.reasoning_content
 
-    parsed_penjelasan = "Tidak ada penjelasan spesifik."
-    parsed_rekomendasi = []
+    with stage('parse'):
+        parsed_penjelasan = "Tidak ada penjelasan spesifik."
+        parsed_rekomendasi = []
 
-    penjelasan_match = re.search(r'---AWAL PENJELASAN---(.*?)---AKHIR PENJELASAN---', raw_llm_output, re.DOTALL)
-    if penjelasan_match:
-        parsed_penjelasan = penjelasan_match.group(1).strip().replace("Penjelasan:", "").strip()
+        penjelasan_match = re.search(r'---AWAL PENJELASAN---(.*?)---AKHIR PENJELASAN---', raw_llm_output, re.DOTALL)
+        if penjelasan_match:
+            parsed_penjelasan = penjelasan_match.group(1).strip().replace("Penjelasan:", "").strip()
 
-    rekomendasi_match = re.search(r'---AWAL REKOMENDASI---(.*?)---AKHIR REKOMENDASI---', raw_llm_output, re.DOTALL)
-    if rekomendasi_match:
-        content = rekomendasi_match.group(1)
-        parsed_rekomendasi = [line.strip().lstrip('- ').strip() for line in content.split('\n') if line.strip() and line.strip().startswith('-')]
+        rekomendasi_match = re.search(r'---AWAL REKOMENDASI---(.*?)---AKHIR REKOMENDASI---', raw_llm_output, re.DOTALL)
+        if rekomendasi_match:
+            content = rekomendasi_match.group(1)
+            parsed_rekomendasi = [line.strip().lstrip('- ').strip() for line in content.split('\n') if line.strip() and line.strip().startswith('-')]
     
-    return jsonify({
-        'Predicted Crop Yield': round(total_yield, 2),
-        'Yield per Hectare': round(predicted_yield_per_ha, 2),
-        'Area': area,
-        'District': district,
-        'Crop': crop,
-        'Season': season,
-        'Year': 2025,
-        'Description': parsed_penjelasan,
-        'recomendation': parsed_rekomendasi,
-        'raw_llm_out':raw_llm_output
-    })
+    with stage('serialize'):
+        return jsonify({
+            'Predicted Crop Yield': round(total_yield, 2),
+            'Yield per Hectare': round(predicted_yield_per_ha, 2),
+            'Area': area,
+            'District': district,
+            'Crop': crop,
+            'Season': season,
+            'Year': 2025,
+            'Description': parsed_penjelasan,
+            'recomendation': parsed_rekomendasi,
+            'raw_llm_out':raw_llm_output,
+            'cached': cached
+        })
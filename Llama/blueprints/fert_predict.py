@@ -1,15 +1,32 @@
 from flask import Blueprint, request, jsonify
 from constant import SOIL_TYPE_MAPPING, CROP_TYPE_MAPPING, FERTILIZER_NAME_MAPPING, FERTILIZER_DESCRIPTIONS
 from models import get_fertilizer_model
+from metrics import stage
+import numpy as np
 import pandas as pd
 
 fert_predict_bp = Blueprint("fert_predict_bp", __name__)
 
+soil_type_inverse_mapping = {v: k for k, v in SOIL_TYPE_MAPPING.items()}
+crop_type_inverse_mapping = {v: k for k, v in CROP_TYPE_MAPPING.items()}
+
+# Model column -> request key, in the column order the model was trained with
+FERT_FEATURE_FIELDS = {
+    'Temparature': 'Temperature',
+    'Humidity': 'Humidity',
+    'Soil Moisture': 'SoilMoisture',
+    'Soil Type': 'SoilType',
+    'Crop Type': 'CropType',
+    'Nitrogen': 'Nitrogen',
+    'Potassium': 'Potassium',
+    'Phosphorous': 'Phosphorous'
+}
+
+MAX_BATCH_SIZE = 10000
+
 @fert_predict_bp.route('/fert_predict', methods=['POST'])
 def fert_predict():
     data = request.get_json()
-    soil_type_inverse_mapping = {v: k for k, v in SOIL_TYPE_MAPPING.items()}
-    crop_type_inverse_mapping = {v: k for k, v in CROP_TYPE_MAPPING.items()}
 
     # Randomly choose a soil type and crop type if not provided
     # soil_type = SOIL_TYPE_MAPPING.get(data.get('Soil Type', random.choice(list(SOIL_TYPE_MAPPING.keys()))))
@@ -31,21 +48,24 @@ def fert_predict():
     phosphorous = data.get('Phosphorous')
 
     # Create the input DataFrame for the model
-    df_input = pd.DataFrame([{
-        'Temparature': temperature,
-        'Humidity': humidity,
-        'Soil Moisture': soil_moisture,
-        'Soil Type': soil_type,
-        'Crop Type': crop_type,
-        'Nitrogen': nitrogen,
-        'Potassium': potassium,
-        'Phosphorous': phosphorous
-    }])
+    with stage('feature_prep'):
+        df_input = pd.DataFrame([{
+            'Temparature': temperature,
+            'Humidity': humidity,
+            'Soil Moisture': soil_moisture,
+            'Soil Type': soil_type,
+            'Crop Type': crop_type,
+            'Nitrogen': nitrogen,
+            'Potassium': potassium,
+            'Phosphorous': phosphorous
+        }])
 
-    model_fert = get_fertilizer_model()
+    with stage('model_load'):
+        model_fert = get_fertilizer_model()
     
     # Make prediction
-    prediction = model_fert.predict(df_input)[0]
+    with stage('predict'):
+        prediction = model_fert.predict(df_input)[0]
 
     # Decode the prediction back to the fertilizer name
     fertilizer_name = FERTILIZER_NAME_MAPPING.get(prediction, 'Unknown')
@@ -54,15 +74,96 @@ def fert_predict():
     fertilizer_description = FERTILIZER_DESCRIPTIONS.get(fertilizer_name, 'No description available')
 
     # Return the result as JSON
-    return jsonify({
-        'Fertilizer Name': fertilizer_name,
-        'Description': fertilizer_description,
-        'Soil Type': soil_type_inverse_mapping[soil_type],
-        'Crop Type': crop_type_inverse_mapping[crop_type],
-        'Temparature': temperature,
-        'Humidity': humidity,
-        'Soil Moisture': soil_moisture,
-        'Nitrogen': nitrogen,
-        'Potassium': potassium,
-        'Phosphorous': phosphorous
-    })
+    with stage('serialize'):
+        return jsonify({
+            'Fertilizer Name': fertilizer_name,
+            'Description': fertilizer_description,
+            'Soil Type': soil_type_inverse_mapping[soil_type],
+            'Crop Type': crop_type_inverse_mapping[crop_type],
+            'Temparature': temperature,
+            'Humidity': humidity,
+            'Soil Moisture': soil_moisture,
+            'Nitrogen': nitrogen,
+            'Potassium': potassium,
+            'Phosphorous': phosphorous
+        })
+
+
+@fert_predict_bp.route('/fert_predict/batch', methods=['POST'])
+def fert_predict_batch():
+    data = request.get_json(silent=True)
+    samples = data.get('samples') if isinstance(data, dict) else data
+
+    if not isinstance(samples, list) or not samples:
+        return jsonify({"error": "'samples' must be a non-empty list"}), 400
+    if len(samples) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"Batch size exceeds the limit of {MAX_BATCH_SIZE} samples"}), 400
+    if not all(isinstance(sample, dict) for sample in samples):
+        return jsonify({"error": "Every sample must be a JSON object"}), 400
+
+    with stage('feature_prep'):
+        features, invalid_rows = build_fert_feature_matrix(samples)
+    if invalid_rows:
+        return jsonify({
+            "error": "Invalid or missing fields in samples",
+            "invalid_rows": invalid_rows
+        }), 400
+
+    with stage('predict'):
+        predictions = predict_fertilizer_batch(features)
+
+    with stage('serialize'):
+        results = []
+        for sample, prediction in zip(samples, predictions):
+            fertilizer_name = FERTILIZER_NAME_MAPPING.get(prediction, 'Unknown')
+            results.append({
+                'Fertilizer Name': fertilizer_name,
+                'Description': FERTILIZER_DESCRIPTIONS.get(fertilizer_name, 'No description available'),
+                'Soil Type': sample.get('SoilType'),
+                'Crop Type': sample.get('CropType'),
+                'Temparature': sample.get('Temperature'),
+                'Humidity': sample.get('Humidity'),
+                'Soil Moisture': sample.get('SoilMoisture'),
+                'Nitrogen': sample.get('Nitrogen'),
+                'Potassium': sample.get('Potassium'),
+                'Phosphorous': sample.get('Phosphorous')
+            })
+
+        return jsonify({"results": results, "count": len(results)})
+
+
+def build_fert_feature_matrix(samples):
+    """
+    Build a float32 matrix (rows x model columns) from request samples.
+    Returns the matrix and the indices of rows with unknown or non-numeric values.
+    """
+    df = pd.DataFrame.from_records(samples, columns=list(FERT_FEATURE_FIELDS.values()))
+
+    columns = {}
+    for column, field in FERT_FEATURE_FIELDS.items():
+        if field == 'SoilType':
+            columns[column] = df[field].map(SOIL_TYPE_MAPPING)
+        elif field == 'CropType':
+            columns[column] = df[field].map(CROP_TYPE_MAPPING)
+        else:
+            values = df[field].where(df[field].map(type) != bool)
+            columns[column] = pd.to_numeric(values, errors='coerce')
+
+    model_fert = get_fertilizer_model()
+    feature_order = list(getattr(model_fert, 'feature_names_in_', FERT_FEATURE_FIELDS.keys()))
+    features = np.empty((len(df), len(feature_order)), dtype=np.float32)
+    for i, column in enumerate(feature_order):
+        features[:, i] = columns[column].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    invalid_rows = np.flatnonzero(~np.isfinite(features).all(axis=1)).tolist()
+    return features, invalid_rows
+
+
+def predict_fertilizer_batch(features):
+    """Run a single predict call over a float32 feature matrix."""
+    model_fert = get_fertilizer_model()
+    feature_order = getattr(model_fert, 'feature_names_in_', None)
+    if feature_order is not None:
+        # Wrap once per batch so sklearn sees the names it was fitted with
+        features = pd.DataFrame(features, columns=feature_order, copy=False)
+    return model_fert.predict(features).tolist()
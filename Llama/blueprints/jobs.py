@@ -0,0 +1,15 @@
+from flask import Blueprint, jsonify
+from jobs import get_job_manager
+
+jobs_bp = Blueprint("jobs_bp", __name__)
+
+@jobs_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = get_job_manager().backend.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+@jobs_bp.route('/jobs/stats', methods=['GET'])
+def get_job_stats():
+    return jsonify(get_job_manager().stats())
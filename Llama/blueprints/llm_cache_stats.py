@@ -0,0 +1,8 @@
+from flask import Blueprint, jsonify
+from llm_cache import get_llm_cache
+
+llm_cache_stats_bp = Blueprint("llm_cache_stats_bp", __name__)
+
+@llm_cache_stats_bp.route('/llm_cache/stats', methods=['GET'])
+def get_llm_cache_stats():
+    return jsonify(get_llm_cache().stats())
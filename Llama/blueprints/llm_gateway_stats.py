@@ -0,0 +1,8 @@
+from flask import Blueprint, jsonify
+from llm_gateway import get_gateway
+
+llm_gateway_stats_bp = Blueprint("llm_gateway_stats_bp", __name__)
+
+@llm_gateway_stats_bp.route('/llm_gateway/stats', methods=['GET'])
+def get_llm_gateway_stats():
+    return jsonify(get_gateway().stats())
@@ -1,49 +1,44 @@
 from flask import Blueprint, request, jsonify, g
 from constant import LANGUAGES
+from jobs import async_job
 from models import get_client
+from llm_cache import get_llm_cache, cache_key
+from price_series import price_prompt_context, PRICE_PROMPT_MODE, PRICE_PROMPT_MODES
+from metrics import stage
+from price_store import get_national_price_store
 import re
-import pandas as pd
 from datetime import datetime, timedelta
 # import random
 # import math
-import os
 
 market_prices_new_bp = Blueprint("market_prices_new_bp", __name__)
 
 @market_prices_new_bp.route('/market_prices_new', methods=['GET'])
+@async_job
 def get_market_price_new():
     g.request_time = datetime(2025, 7, 27) 
     commodity = request.args.get('commodity')
     region = request.args.get('region')
     period = request.args.get('period', '30d') # Default 30 hari
-
-    csv_path = os.path.join(os.path.dirname(__file__), '..', 'dataset', 'sp2kp_90days_1Agustus2025_national_history.csv')
-    df_sp2kp_90_4agustus = pd.read_csv(csv_path)
-    # df_sp2kp_90_4agustus = pd.read_csv('../dataset/sp2kp_90days_1Agustus2025_national_history.csv')
+    prompt_mode = request.args.get('prompt_mode', PRICE_PROMPT_MODE)
 
     if not commodity or not region:
         return jsonify({"error": "Parameter 'commodity', 'region', and 'period' are required"}), 400
+    if prompt_mode not in PRICE_PROMPT_MODES:
+        return jsonify({"error": f"Unsupported prompt_mode. Supported modes are: {', '.join(PRICE_PROMPT_MODES)}"}), 400
 
     # period_map = {'30d': 30, '90d': 90, '365d': 365}
     period_map = {'30d': 30, '90d': 90}
     period_days = period_map.get(period, 30)
 
-    summary = get_commodity_summary(df_sp2kp_90_4agustus, commodity, period_days)
+    with stage('feature_prep'):
+        df_filtered = get_national_price_store().window(commodity, period_days)
+    summary = get_commodity_summary(df_filtered, commodity, period_days, prompt_mode)
 
     return(summary)
 
-def get_commodity_summary(df, komoditas, days=30):
-    # Ensure tanggal_data is datetime
-    df['tanggal_data'] = pd.to_datetime(df['tanggal_data'])
-    # Filter by commodity
-    df_filtered = df[df['variant_nama'] == komoditas].copy()
-    # Sort by date
-    df_filtered = df_filtered.sort_values('tanggal_data')
-    # Filter last N days
-    if days is not None:
-        max_date = df_filtered['tanggal_data'].max()
-        min_date = max_date - pd.Timedelta(days=days)
-        df_filtered = df_filtered[df_filtered['tanggal_data'] >= min_date]
+def get_commodity_summary(df_filtered, komoditas, days=30, prompt_mode=PRICE_PROMPT_MODE):
+    # df_filtered: rows of one commodity within the last N days, sorted by date (see PriceStore.window)
     # Prepare JSON
     historical_prices = [
         {"date": d.strftime("%Y-%m-%d"), "price": float(p)}
@@ -53,6 +48,11 @@ def get_commodity_summary(df, komoditas, days=30):
     # satuan display
     satuan_display = "Liter" if "minyak" in komoditas.lower() else "Kg"
 
+    # Compact series descriptor instead of the raw list (see price_series.py)
+    price_history, price_trend_ref = price_prompt_context(
+        historical_prices, df_filtered['tanggal_data'], df_filtered['harga_rata_rata'], prompt_mode
+    )
+
     #-------------------- Response LLM -----------------------------
     lang = request.form.get('language', 'id')
     if lang not in LANGUAGES:
@@ -65,12 +65,12 @@ def get_commodity_summary(df, komoditas, days=30):
     ### Data Masukan:
     - **Komoditas:** {komoditas}
     - **Periode harga dalam:** {days} hari terakhir
-    - **Historis harga:** {historical_prices}
+    - **Historis harga:** {price_history}
     
     Dalam format berikut (Gunakan Bahasa **{LANGUAGES[lang]}**):
     ---ANALISIS DATA--- 
     Sampaikan analisis singkat apakah tren harga dalam periode ini cenderung **stabil**, **meningkat**, **menurun**, **fluktuatif**, dan/atau **perlu perhatian** atau tidak, berikat rekomendasi secara ringkas jika diperlukan
-    *Catatan: Jangan mempertanyakan kelengkapan data! & perhatikan tren {historical_prices} secara menyeluruh, jangan sebutkan harga tertentu!*
+    *Catatan: Jangan mempertanyakan kelengkapan data! & perhatikan tren {price_trend_ref} secara menyeluruh, jangan sebutkan harga tertentu!*
     
     ---
     **Instruksi Penting:**  
@@ -78,34 +78,47 @@ def get_commodity_summary(df, komoditas, days=30):
     - Hindari kalimat panjang atau teknis yang sulit dipahami.
     """
 
-    client = get_client()
-    completion = client.chat.completions.create(
-        model="meta-llama/llama-4-scout-17b-16e-instruct", 
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": prompt},
-                ]
-            }
-        ],
-        temperature=0.3,
-        max_tokens=1024,
-    )
+    def generate_explanation():
+        client = get_client()
+        completion = client.chat.completions.create(
+            model="meta-llama/llama-4-scout-17b-16e-instruct", 
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": prompt},
+                    ]
+                }
+            ],
+            temperature=0.3,
+            max_tokens=1024,
+        )
+        return completion.choices[0].message.content
 
-    raw_llm_output = completion.choices[0].message.content
+    # Explanations for near-identical inputs are reused (see llm_cache.py)
+    explanation_key = cache_key(
+        'market_prices_new', commodity=komoditas, days=days, lang=lang, prompt_mode=prompt_mode,
+        data_day=historical_prices[-1]["date"] if historical_prices else None
+    )
+    with stage('llm'):
+        raw_llm_output, cached = get_llm_cache().get_or_create(
+            explanation_key, generate_explanation,
+            # Only completions whose explanation parses are reused
+            valid=lambda text: re.search(r'---ANALISIS DATA---\s*(.*?)\s*(?:---|\Z)', text, re.DOTALL) is not None
+        )
     # reasoning_content = completion.choices[0].message.reasoning_content
 
-    # Ambil 'Analisis Data Masukkan'
-    if raw_llm_output:
-        # penjelasan_match = re.search(r'---ANALISIS DATA---', raw_llm_output, re.DOTALL)
-        penjelasan_match = re.search(r'---ANALISIS DATA---\s*(.*?)\s*(?:---|\Z)', raw_llm_output, re.DOTALL)
-        if penjelasan_match:
-            trend_analysis = penjelasan_match.group(1).strip()
+    with stage('parse'):
+        # Ambil 'Analisis Data Masukkan'
+        if raw_llm_output:
+            # penjelasan_match = re.search(r'---ANALISIS DATA---', raw_llm_output, re.DOTALL)
+            penjelasan_match = re.search(r'---ANALISIS DATA---\s*(.*?)\s*(?:---|\Z)', raw_llm_output, re.DOTALL)
+            if penjelasan_match:
+                trend_analysis = penjelasan_match.group(1).strip()
+            else:
+                trend_analysis = raw_llm_output
         else:
             trend_analysis = raw_llm_output
-    else:
-        trend_analysis = raw_llm_output
     #================================================================
 
     result = {
@@ -118,6 +131,7 @@ def get_commodity_summary(df, komoditas, days=30):
         "historical_prices": historical_prices,
         # "region": "Nanti Ditambah",
         "trend_analysis": trend_analysis,
-        'raw_llm_out':raw_llm_output
+        'raw_llm_out':raw_llm_output,
+        'cached': cached
     }
     return result
\ No newline at end of file
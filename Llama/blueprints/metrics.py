@@ -0,0 +1,8 @@
+from flask import Blueprint, Response
+from metrics import get_metrics
+
+metrics_bp = Blueprint("metrics_bp", __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics_text():
+    return Response(get_metrics().render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,8 @@
+from flask import Blueprint, jsonify
+from models import get_model_registry
+
+model_registry_bp = Blueprint("model_registry_bp", __name__)
+
+@model_registry_bp.route('/models', methods=['GET'])
+def get_models():
+    return jsonify(get_model_registry().stats())
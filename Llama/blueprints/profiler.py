@@ -0,0 +1,39 @@
+from flask import Blueprint, Response, abort, jsonify, request
+from profiler import check_token, get_profiler
+
+profiler_bp = Blueprint("profiler_bp", __name__)
+
+@profiler_bp.before_request
+def require_token():
+    # Without PROFILER_TOKEN the routes don't exist as far as clients can tell
+    if not check_token(request.headers.get('X-Admin-Token')):
+        abort(404)
+
+@profiler_bp.route('/admin/profiler', methods=['GET'])
+def profiler_status():
+    return jsonify(get_profiler().stats())
+
+@profiler_bp.route('/admin/profiler/start', methods=['POST'])
+def profiler_start():
+    data = request.get_json(silent=True) or {}
+    try:
+        session = get_profiler().start(
+            fraction=data.get('fraction', 1.0),
+            duration=data.get('duration', 60),
+            interval=data.get('interval'),
+        )
+    except (TypeError, ValueError):
+        return jsonify({"error": "'fraction', 'duration' and 'interval' must be numbers"}), 400
+    return jsonify(session)
+
+@profiler_bp.route('/admin/profiler/stop', methods=['POST'])
+def profiler_stop():
+    return jsonify({"session": get_profiler().stop()})
+
+@profiler_bp.route('/admin/profiler/stacks', methods=['GET'])
+def profiler_stacks():
+    """Collapsed stacks for flamegraph.pl / speedscope; ?session= and ?endpoint= filter."""
+    stacks = get_profiler().collapsed(request.args.get('session'), request.args.get('endpoint'))
+    return Response(stacks, mimetype='text/plain', headers={
+        'Content-Disposition': 'attachment; filename="profile.collapsed"'
+    })
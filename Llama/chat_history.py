@@ -0,0 +1,171 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from models import get_llm
+
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv('CHAT_HISTORY_TOKEN_BUDGET', '3000'))
+CHAT_HISTORY_MIN_RECENT = int(os.getenv('CHAT_HISTORY_MIN_RECENT', '4'))
+CHAT_SUMMARY_CACHE_SIZE = 1024
+
+SUMMARY_PROMPT = """Ringkas percakapan berikut antara petani dan AgriBot dalam maksimal 5 poin singkat.
+Pertahankan fakta penting seperti lokasi, komoditas, luas lahan, masalah yang dihadapi, dan saran yang sudah diberikan.
+
+{transcript}
+"""
+
+
+def estimate_tokens(text):
+    # Roughly 4 characters per token for Llama tokenizers on Indonesian/English text
+    return (len(text) + 3) // 4
+
+
+def _hash_turns(turns):
+    digest = hashlib.sha1()
+    for message in turns:
+        digest.update(message["role"].encode())
+        digest.update(b"\0")
+        digest.update(message["content"].encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def summarize_turns(turns, previous_summary=None):
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in turns)
+    if previous_summary:
+        transcript = f"Ringkasan sebelumnya:\n{previous_summary}\n\nLanjutan percakapan:\n{transcript}"
+    response = get_llm().invoke([{"role": "user", "content": SUMMARY_PROMPT.format(transcript=transcript)}])
+    return response.content.strip()
+
+
+class HistoryManager:
+    """
+    Keeps a chat prompt within a token budget. The system prompt, the current
+    query and the latest `min_recent` history messages are always kept; older
+    turns are replaced by a summary. Summaries are cached per conversation:
+    by its `conversation_id`, or by the hash of its first turn when the
+    client sends none, a key that stays the same as the chat grows. When
+    more turns fall out of the budget, only those are summarized on top of
+    the cached summary. If summarizing fails they are dropped.
+    """
+
+    def __init__(self, token_budget=CHAT_HISTORY_TOKEN_BUDGET, min_recent=CHAT_HISTORY_MIN_RECENT,
+                 summarizer=summarize_turns, cache_size=CHAT_SUMMARY_CACHE_SIZE):
+        self.token_budget = token_budget
+        self.min_recent = min_recent
+        self.summarizer = summarizer
+        self.cache_size = cache_size
+        self._summaries = OrderedDict()  # conversation id -> (n_turns, turns_hash, summary)
+        self._lock = threading.Lock()
+        self._metrics = {
+            "requests": 0,
+            "compacted_requests": 0,
+            "input_tokens": 0,
+            "prompt_tokens": 0,
+            "dropped_messages": 0,
+            "summaries_generated": 0,
+            "summary_cache_hits": 0,
+            "summary_failures": 0,
+        }
+
+    def compact(self, messages, conversation_id=None):
+        """
+        `messages` is [system, *history, query]. Returns the messages to send
+        and the token counts for this request.
+        """
+        system, history, query = messages[0], messages[1:-1], messages[-1]
+        history_tokens = [estimate_tokens(m["content"]) for m in history]
+        fixed_tokens = estimate_tokens(system["content"]) + estimate_tokens(query["content"])
+        input_tokens = fixed_tokens + sum(history_tokens)
+
+        # Keep the newest turns that fit, and always the latest `min_recent`
+        kept_tokens = 0
+        start = len(history)
+        while start > 0:
+            cost = history_tokens[start - 1]
+            if len(history) - start >= self.min_recent and fixed_tokens + kept_tokens + cost > self.token_budget:
+                break
+            kept_tokens += cost
+            start -= 1
+
+        older, recent = history[:start], history[start:]
+        compacted = [system]
+        summary_source = None
+        if older:
+            summary, summary_source = self._summary_for(older, conversation_id)
+            if summary:
+                compacted.append({"role": "system", "content": f"Ringkasan percakapan sebelumnya:\n{summary}"})
+        compacted.extend(recent)
+        compacted.append(query)
+
+        usage = {
+            "input_tokens": input_tokens,
+            "prompt_tokens": sum(estimate_tokens(m["content"]) for m in compacted),
+            "token_budget": self.token_budget,
+            "dropped_messages": len(older),
+            "summary": summary_source,
+        }
+        self._record(usage)
+        return compacted, usage
+
+    def _summary_for(self, turns, conversation_id):
+        turns_hash = _hash_turns(turns)
+        # The older turns grow every request; their first turn stays put
+        key = conversation_id or _hash_turns(turns[:1])
+        with self._lock:
+            cached = self._summaries.get(key)
+            if cached:
+                self._summaries.move_to_end(key)
+
+        previous_summary, new_turns = None, turns
+        if cached:
+            n_turns, cached_hash, summary = cached
+            if n_turns == len(turns) and cached_hash == turns_hash:
+                self._count("summary_cache_hits")
+                return summary, "cache"
+            # Only the turns that fell out since the cached summary need summarizing
+            if n_turns < len(turns) and _hash_turns(turns[:n_turns]) == cached_hash:
+                previous_summary, new_turns = summary, turns[n_turns:]
+
+        try:
+            summary = self.summarizer(new_turns, previous_summary)
+        except Exception:
+            self._count("summary_failures")
+            return None, "dropped"
+
+        with self._lock:
+            self._summaries[key] = (len(turns), turns_hash, summary)
+            self._summaries.move_to_end(key)
+            while len(self._summaries) > self.cache_size:
+                self._summaries.popitem(last=False)
+        self._count("summaries_generated")
+        return summary, "generated"
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self._metrics[name] += value
+
+    def _record(self, usage):
+        with self._lock:
+            self._metrics["requests"] += 1
+            self._metrics["input_tokens"] += usage["input_tokens"]
+            self._metrics["prompt_tokens"] += usage["prompt_tokens"]
+            if usage["dropped_messages"]:
+                self._metrics["compacted_requests"] += 1
+                self._metrics["dropped_messages"] += usage["dropped_messages"]
+
+    def metrics(self):
+        with self._lock:
+            return dict(self._metrics, token_budget=self.token_budget, cached_summaries=len(self._summaries))
+
+
+# Internal cache
+_history_manager = None
+
+
+def get_history_manager():
+    global _history_manager
+    if _history_manager is None:
+        _history_manager = HistoryManager()
+    return _history_manager
@@ -0,0 +1,109 @@
+import joblib
+import numpy as np
+
+
+class CompiledForest:
+    """
+    Array-based evaluator for a fitted sklearn RandomForestClassifier.
+
+    Every tree's feature, threshold, child and leaf-value arrays are flattened
+    into contiguous buffers once, and all trees are walked together with
+    NumPy indexing. This skips sklearn's per-call validation and per-estimator
+    Python loop, which dominates for single-row requests.
+    """
+
+    def __init__(self, forest):
+        estimators = forest.estimators_
+        if forest.n_outputs_ != 1:
+            raise ValueError("CompiledForest only supports single-output classifiers")
+
+        self.classes_ = forest.classes_
+        self.n_features_in_ = forest.n_features_in_
+        if hasattr(forest, 'feature_names_in_'):
+            self.feature_names_in_ = forest.feature_names_in_
+        self.n_estimators = len(estimators)
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(n_nodes, dtype=np.intp)
+            is_leaf = tree.children_left == -1
+
+            # Leaves point at themselves so extra iterations are no-ops
+            left = np.where(is_leaf, node_ids, tree.children_left) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right) + offset
+            feature = np.where(is_leaf, 0, tree.feature)
+
+            # Same normalisation as DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :].astype(np.float64)
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+
+            features.append(feature)
+            thresholds.append(tree.threshold)
+            lefts.append(left)
+            rights.append(right)
+            values.append(value / normalizer)
+            roots.append(offset)
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        self.feature = np.ascontiguousarray(np.concatenate(features), dtype=np.intp)
+        self.threshold = np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64)
+        self.left = np.ascontiguousarray(np.concatenate(lefts), dtype=np.intp)
+        self.right = np.ascontiguousarray(np.concatenate(rights), dtype=np.intp)
+        self.value = np.ascontiguousarray(np.concatenate(values), dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = max_depth
+
+    def save(self, path, source_sha256=None):
+        """
+        Write the flat buffers with joblib, uncompressed so `load` can
+        memory-map them. `source_sha256` records which pickle they came from.
+        """
+        state = dict(self.__dict__, source_sha256=source_sha256)
+        joblib.dump(state, path)
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """
+        Open buffers written by `save`. With mmap_mode='r' the arrays are
+        read-only views of the file, so processes loading the same file share
+        its pages through the page cache instead of each holding a copy.
+        """
+        forest = cls.__new__(cls)
+        forest.__dict__.update(joblib.load(path, mmap_mode=mmap_mode))
+        return forest
+
+    def _as_matrix(self, X):
+        if hasattr(X, 'columns') and hasattr(self, 'feature_names_in_'):
+            X = X[list(self.feature_names_in_)]
+        # sklearn evaluates trees on float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, but the model expects {self.n_features_in_}")
+        return X
+
+    def apply(self, X):
+        """Leaf index (into the flat buffers) of every row in every tree."""
+        X = self._as_matrix(X)
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.n_estimators))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def predict_proba(self, X):
+        leaf_values = self.value[self.apply(X)]
+        # Sequential sum over trees, matching sklearn's accumulation order
+        proba = np.cumsum(leaf_values, axis=1)[:, -1, :]
+        return proba / self.n_estimators
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
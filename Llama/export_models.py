@@ -0,0 +1,49 @@
+"""
+Export the random-forest pickles as flat CompiledForest buffers that can be
+memory-mapped (see compiled_forest.py). Workers running with
+FERTILIZER_MODEL_ENGINE / CROP_MODEL_ENGINE set to 'mmap' open these instead
+of unpickling, and share the pages through the page cache.
+
+Re-run after replacing a pickle. Each export is written to a temporary file
+and renamed into place, so running workers hot-reload it atomically (old
+mappings stay valid until they are dropped).
+
+    python export_models.py [fertilizer crop]
+"""
+import os
+import sys
+
+import joblib
+import numpy as np
+
+from compiled_forest import CompiledForest
+from model_registry import file_digest
+from models import FOREST_FILES
+
+
+def export_forest(name, check_rows=2000):
+    pickle_path, export_path = FOREST_FILES[name]
+    forest = joblib.load(pickle_path)
+    compiled = CompiledForest(forest)
+
+    # The export must predict exactly what the pickle does
+    rng = np.random.default_rng(0)
+    X = rng.uniform(-3, 150, size=(check_rows, forest.n_features_in_)).astype(np.float32)
+    if not np.array_equal(compiled.predict_proba(X), forest.predict_proba(X)):
+        raise ValueError(f"Compiled {name} model does not match {pickle_path}")
+
+    tmp_path = f"{export_path}.tmp"
+    compiled.save(tmp_path, source_sha256=file_digest([pickle_path]))
+    os.replace(tmp_path, export_path)
+    return export_path, os.path.getsize(export_path)
+
+
+def main():
+    names = sys.argv[1:] or list(FOREST_FILES)
+    for name in names:
+        path, size = export_forest(name)
+        print(f"{name:<11} -> {path} ({size / 2 ** 20:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
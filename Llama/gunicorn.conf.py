@@ -0,0 +1,84 @@
+"""
+Production serving profile:
+
+    gunicorn -c gunicorn.conf.py app:app
+
+With GUNICORN_PRELOAD=1 (default) the app is imported and every model is
+loaded and warmed in the master before forking (see warmup.py), so workers
+start warm and share the model pages copy-on-write. gc.freeze() moves those
+objects out of the collector's reach so its bookkeeping writes don't
+un-share them. With preload off, each worker loads and warms its own copy
+right after it boots.
+
+GUNICORN_WORKER_CLASS selects the worker: 'sync', 'gthread' (alias
+'threads', default) or 'gevent' (needs `pip install gevent`).
+
+Workers write their request metrics to METRICS_DIR (.metrics next to this
+file unless set) so /metrics reports the whole server, not whichever
+worker answered the scrape (see metrics.py). Async job records go to
+JOB_DIR (.jobs next to this file unless set), so /jobs/<id> answers from
+any worker, not only the one that accepted the job (see jobs.py).
+"""
+import gc
+import glob
+import multiprocessing
+import os
+
+WORKER_CLASSES = {'sync': 'sync', 'gthread': 'gthread', 'threads': 'gthread', 'gevent': 'gevent'}
+
+worker_class = WORKER_CLASSES[os.getenv('GUNICORN_WORKER_CLASS', 'gthread')]
+if worker_class == 'gevent':
+    # Patch before the preloaded app creates its locks, sockets and thread pools
+    from gevent import monkey
+    monkey.patch_all()
+
+_here = os.path.dirname(os.path.abspath(__file__))
+
+# Set before the app is imported (preload) or forked into workers. Fixed
+# paths, so restarts reuse the same directories instead of leaving new ones.
+_metrics_dir = os.environ['METRICS_DIR'] = os.getenv('METRICS_DIR') or os.path.join(_here, '.metrics')
+os.makedirs(_metrics_dir, exist_ok=True)
+# Counts from a previous server would be added to this one's
+for _stale in glob.glob(os.path.join(_metrics_dir, 'metrics-*.json*')):
+    os.remove(_stale)
+
+_job_dir = os.environ['JOB_DIR'] = os.getenv('JOB_DIR') or os.path.join(_here, '.jobs')
+os.makedirs(_job_dir, exist_ok=True)
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', str(multiprocessing.cpu_count())))
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '256'))
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') == '1'
+warmup = os.getenv('MODEL_WARMUP', '1') == '1'
+
+# LLM calls may take up to their gateway timeout plus retries (see llm_gateway.py)
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def _warm(log):
+    from warmup import warm_models
+    for name, result in warm_models().items():
+        if 'error' in result:
+            log.warning("warmup %s failed: %s", name, result['error'])
+        else:
+            log.info("warmup %s: %.3f s", name, result['seconds'])
+
+
+def when_ready(server):
+    # Runs in the master after the preloaded app is imported, before any fork
+    if preload_app and warmup:
+        _warm(server.log)
+    if preload_app:
+        gc.freeze()
+
+
+def post_worker_init(worker):
+    if not preload_app and warmup:
+        _warm(worker.log)
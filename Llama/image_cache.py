@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+IMAGE_CACHE_ENABLED = os.getenv('IMAGE_CACHE_ENABLED', '1') == '1'
+IMAGE_CACHE_MAX_DISTANCE = int(os.getenv('IMAGE_CACHE_MAX_DISTANCE', '6'))
+IMAGE_CACHE_TTL = float(os.getenv('IMAGE_CACHE_TTL', '86400'))
+IMAGE_CACHE_MAX_ENTRIES = int(os.getenv('IMAGE_CACHE_MAX_ENTRIES', '5000'))
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over 64-bit hashes under Hamming distance. Lookups
+    within a small radius only visit children whose edge distance is within
+    the radius of the query's distance to the node. Removal marks nodes dead;
+    the owner rebuilds the tree once too many are dead.
+    """
+
+    def __init__(self):
+        self.root = None  # [hash, alive, {distance: child}]
+        self.size = 0
+        self.dead = 0
+
+    def add(self, value):
+        if self.root is None:
+            self.root = [value, True, {}]
+            self.size = 1
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                if not node[1]:
+                    node[1] = True
+                    self.dead -= 1
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, True, {}]
+                self.size += 1
+                return
+            node = child
+
+    def remove(self, value):
+        node = self.root
+        while node is not None:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                if node[1]:
+                    node[1] = False
+                    self.dead += 1
+                return
+            node = node[2].get(distance)
+
+    def nearest(self, value, radius):
+        """Closest live hash within `radius`, as (distance, hash), or None."""
+        best = None
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if node[1] and distance <= radius and (best is None or distance < best[0]):
+                best = (distance, node[0])
+                if distance == 0:
+                    break
+            limit = radius if best is None else min(radius, best[0])
+            for edge, child in node[2].items():
+                if distance - limit <= edge <= distance + limit:
+                    stack.append(child)
+        return best
+
+
+class PerceptualImageCache:
+    """
+    Diagnoses keyed by (language, image hash). A lookup returns the entry
+    whose hash is nearest within `max_distance`, so re-uploads and near
+    duplicates of the same photo skip the vision model. Entries expire after
+    `ttl` and the least recently used are evicted past `max_entries`.
+    """
+
+    def __init__(self, max_distance=IMAGE_CACHE_MAX_DISTANCE, ttl=IMAGE_CACHE_TTL, max_entries=IMAGE_CACHE_MAX_ENTRIES):
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (lang, hash) -> (expires_at, value)
+        self._trees = {}  # lang -> BKTree
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get(self, image_hash, lang):
+        with self._lock:
+            tree = self._trees.get(lang)
+            match = tree.nearest(image_hash, self.max_distance) if tree is not None else None
+            if match is not None:
+                key = (lang, match[1])
+                expires_at, value = self._entries[key]
+                if expires_at >= time.time():
+                    self._entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return value, match[0]
+                self._remove(key)
+            self.stats['misses'] += 1
+            return None, None
+
+    def set(self, image_hash, lang, value):
+        with self._lock:
+            key = (lang, image_hash)
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            self._trees.setdefault(lang, BKTree()).add(image_hash)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        lang, image_hash = key
+        del self._entries[key]
+        tree = self._trees[lang]
+        tree.remove(image_hash)
+        if tree.dead > tree.size // 2:
+            rebuilt = BKTree()
+            for entry_lang, entry_hash in self._entries:
+                if entry_lang == lang:
+                    rebuilt.add(entry_hash)
+            self._trees[lang] = rebuilt
+
+
+# Internal cache
+_image_cache = None
+
+
+def get_image_cache():
+    global _image_cache
+    if _image_cache is None:
+        _image_cache = PerceptualImageCache()
+    return _image_cache
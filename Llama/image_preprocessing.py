@@ -0,0 +1,81 @@
+import base64
+import io
+import os
+
+import numpy as np
+from PIL import Image, ImageOps
+
+IMAGE_PREPROCESSING = os.getenv('IMAGE_PREPROCESSING', '1') == '1'
+IMAGE_MAX_UPLOAD_BYTES = int(os.getenv('IMAGE_MAX_UPLOAD_BYTES', str(16 * 1024 * 1024)))
+IMAGE_MAX_EDGE = int(os.getenv('IMAGE_MAX_EDGE', '1280'))
+IMAGE_JPEG_QUALITY = int(os.getenv('IMAGE_JPEG_QUALITY', '85'))
+# Decompression-bomb guard: refuse images above this many pixels
+IMAGE_MAX_PIXELS = int(os.getenv('IMAGE_MAX_PIXELS', str(64 * 1000 * 1000)))
+
+Image.MAX_IMAGE_PIXELS = IMAGE_MAX_PIXELS
+
+
+class InvalidImage(Exception):
+    pass
+
+
+def prepare_image(stream, max_edge=IMAGE_MAX_EDGE, quality=IMAGE_JPEG_QUALITY):
+    """
+    Decode an uploaded image from its stream, apply EXIF orientation, downscale
+    so the longest edge is at most `max_edge`, and re-encode as JPEG.
+
+    JPEGs are decoded with `draft`, which lets libjpeg scale by 1/2, 1/4 or 1/8
+    while decoding, so a 12 MP photo never exists in memory at full size.
+    Returns (jpeg_bytes, stats); stats includes the dHash of the result.
+    """
+    try:
+        image = Image.open(stream)
+        original_size = image.size
+        original_format = image.format
+        if image.width * image.height > IMAGE_MAX_PIXELS:
+            raise InvalidImage(f"Image is too large ({image.width}x{image.height})")
+
+        # EXIF orientation may swap the axes; the draft target only needs the longest edge
+        image.draft('RGB', (max_edge, max_edge))
+        image = ImageOps.exif_transpose(image)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        image.thumbnail((max_edge, max_edge))
+    except InvalidImage:
+        raise
+    except Exception as e:
+        raise InvalidImage(f"Unsupported or corrupt image: {e}") from e
+
+    output = io.BytesIO()
+    image.save(output, format='JPEG', quality=quality)
+    data = output.getvalue()
+    stats = {
+        'original_format': original_format,
+        'original_size': original_size,
+        'size': image.size,
+        'bytes': len(data),
+        'dhash': dhash(image),
+    }
+    return data, stats
+
+
+def dhash(image, size=8):
+    """64-bit difference hash: sign of horizontal gradients on a 9x8 grayscale thumbnail."""
+    small = image.convert('L').resize((size + 1, size), Image.Resampling.BILINEAR)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def dhash_bytes(data):
+    """dHash of an encoded image, decoding only a small draft of it."""
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.draft('L', (64, 64))
+        return dhash(ImageOps.exif_transpose(image))
+    except Exception as e:
+        raise InvalidImage(f"Unsupported or corrupt image: {e}") from e
+
+
+def to_data_url(jpeg_bytes):
+    return f"data:image/jpeg;base64,{base64.b64encode(jpeg_bytes).decode()}"
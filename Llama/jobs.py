@@ -0,0 +1,332 @@
+import glob
+import ipaddress
+import json
+import os
+import socket
+import threading
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from urllib.parse import urlparse
+
+from flask import abort, current_app, jsonify, request, url_for
+
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '4'))
+JOB_QUEUE_SIZE = int(os.getenv('JOB_QUEUE_SIZE', '64'))
+JOB_TTL = float(os.getenv('JOB_TTL', '3600'))
+JOB_MAX_ENTRIES = int(os.getenv('JOB_MAX_ENTRIES', '10000'))
+JOB_CALLBACK_TIMEOUT = float(os.getenv('JOB_CALLBACK_TIMEOUT', '10'))
+# Comma-separated host allowlist for callback URLs. When empty, any http(s)
+# host is accepted unless it resolves to a private, loopback, link-local or
+# otherwise non-public address.
+JOB_CALLBACK_ALLOWED_HOSTS = [h for h in os.getenv('JOB_CALLBACK_ALLOWED_HOSTS', '').split(',') if h]
+# Shared by all workers of one server (gunicorn.conf.py sets it); unset, job
+# records live in the process that accepted the job
+JOB_DIR = os.getenv('JOB_DIR')
+# Seconds between sweeps of expired records in JOB_DIR
+JOB_EXPIRE_INTERVAL = 60.0
+
+
+class MemoryJobBackend:
+    """In-process job records; finished jobs expire after `ttl` seconds."""
+
+    def __init__(self, ttl=JOB_TTL, max_entries=JOB_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def put(self, job):
+        with self._lock:
+            self._jobs[job['id']] = dict(job)
+            if len(self._jobs) > self.max_entries:
+                self._expire()
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+                return dict(job)
+
+    def get(self, job_id):
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def _expire(self):
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.get('finished_at') and now - job['finished_at'] > self.ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+class FileJobBackend:
+    """
+    One JSON file per job under `directory`, so whichever worker a poll
+    reaches can answer /jobs/<id>. Records are written to a temporary file
+    and renamed into place, so readers never see half a record; only the
+    worker running a job updates it. A record expires `ttl` seconds after
+    its last update, which also clears jobs orphaned by a killed worker.
+    """
+
+    def __init__(self, directory, ttl=JOB_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._expired_at = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, job_id):
+        return os.path.join(self.directory, f"job-{job_id}.json")
+
+    def _write(self, job):
+        path = self._path(job['id'])
+        tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(job, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+
+    def _read(self, job_id):
+        # Ids are uuid4 hex; anything else is not a path to open
+        if not job_id.isalnum():
+            return None
+        try:
+            with open(self._path(job_id)) as f:
+                if time.time() - os.fstat(f.fileno()).st_mtime > self.ttl:
+                    return None
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, job):
+        self._write(job)
+        self._expire()
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            job = self._read(job_id)
+            if job is not None:
+                job.update(fields)
+                self._write(job)
+            return job
+
+    def get(self, job_id):
+        return self._read(job_id)
+
+    def _expire(self):
+        now = time.time()
+        if now - self._expired_at < JOB_EXPIRE_INTERVAL:
+            return
+        self._expired_at = now
+        for path in glob.glob(os.path.join(self.directory, 'job-*.json')):
+            try:
+                if now - os.stat(path).st_mtime > self.ttl:
+                    os.remove(path)
+            except OSError:
+                continue
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobManager:
+    """
+    Runs view functions on a bounded worker pool and records their responses.
+    At most `queue_size` jobs may be queued or running at once, per process.
+    Records go to JOB_DIR when it is set (under gunicorn, so a poll may
+    reach any worker) and stay in memory otherwise.
+    """
+
+    def __init__(self, backend=None, workers=JOB_WORKERS, queue_size=JOB_QUEUE_SIZE):
+        if backend is None:
+            backend = FileJobBackend(JOB_DIR) if JOB_DIR else MemoryJobBackend()
+        self.backend = backend
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._lock = threading.Lock()
+        self._busy = 0
+        self._pending = 0
+
+    def submit(self, app, view, view_args, environ, callback_url=None):
+        if not self._slots.acquire(blocking=False):
+            raise JobQueueFull()
+
+        job = {
+            'id': uuid.uuid4().hex,
+            'status': 'queued',
+            'endpoint': environ['path'],
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'status_code': None,
+            'result': None,
+            'error': None,
+            'callback_url': callback_url,
+            'callback_status': None,
+        }
+        self.backend.put(job)
+        with self._lock:
+            self._pending += 1
+        try:
+            self._executor.submit(self._run, app, view, view_args, environ, job['id'], callback_url)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+            raise
+        return job
+
+    def _run(self, app, view, view_args, environ, job_id, callback_url):
+        with self._lock:
+            self._pending -= 1
+            self._busy += 1
+        self.backend.update(job_id, status='running', started_at=time.time())
+        try:
+            with app.test_request_context(
+                environ['path'],
+                method=environ['method'],
+                query_string=environ['query_string'],
+                headers=environ['headers'],
+                data=environ['body'],
+            ):
+                try:
+                    rv = view(**view_args)
+                except Exception as e:
+                    # HTTPExceptions (abort) and the app's error handlers keep their status
+                    rv = app.handle_user_exception(e)
+                response = app.make_response(rv)
+                result = response.get_json(silent=True)
+                if result is None:
+                    result = response.get_data(as_text=True)
+                job = self.backend.update(
+                    job_id,
+                    status='succeeded' if response.status_code < 400 else 'failed',
+                    status_code=response.status_code,
+                    result=result,
+                    finished_at=time.time(),
+                )
+        except Exception as e:
+            job = self.backend.update(job_id, status='failed', status_code=500, error=str(e), finished_at=time.time())
+        finally:
+            with self._lock:
+                self._busy -= 1
+            self._slots.release()
+
+        if callback_url and job is not None:
+            self.backend.update(job_id, callback_status=deliver_callback(callback_url, job))
+
+    def stats(self):
+        with self._lock:
+            return {'workers': self.workers, 'busy': self._busy, 'queued': self._pending, 'queue_size': self.queue_size}
+
+
+def is_public_host(hostname):
+    """True if every address `hostname` resolves to is a public unicast address."""
+    try:
+        infos = socket.getaddrinfo(hostname, None, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError):
+        return False
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split('%')[0])
+        if getattr(address, 'ipv4_mapped', None):
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            return False
+    return bool(infos)
+
+
+def callback_allowed(callback_url):
+    parsed = urlparse(callback_url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        return False
+    if JOB_CALLBACK_ALLOWED_HOSTS:
+        return parsed.hostname in JOB_CALLBACK_ALLOWED_HOSTS
+    return is_public_host(parsed.hostname)
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # A redirect could point the callback at an address callback_allowed refused
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_callback_opener = urllib.request.build_opener(_NoRedirect)
+
+
+def deliver_callback(callback_url, job):
+    """POST the finished job record as JSON; returns the HTTP status or an error string."""
+    # Checked again: the host may resolve differently by the time the job finishes
+    if not callback_allowed(callback_url):
+        return "error: callback_url is not allowed"
+    body = json.dumps(job, ensure_ascii=False, default=str).encode()
+    req = urllib.request.Request(callback_url, data=body, method='POST', headers={'Content-Type': 'application/json'})
+    try:
+        with _callback_opener.open(req, timeout=JOB_CALLBACK_TIMEOUT) as resp:
+            return resp.status
+    except Exception as e:
+        return f"error: {e}"
+
+
+def async_job(view):
+    """
+    Opt-in async mode for a view: with `?async=1` the request is queued and a
+    job id is returned right away (202). Fetch the result from /jobs/<id>, or
+    pass `callback_url` to have the finished job POSTed there.
+    """
+    @wraps(view)
+    def wrapper(**view_args):
+        if request.args.get('async') != '1':
+            return view(**view_args)
+
+        callback_url = request.args.get('callback_url')
+        if callback_url and not callback_allowed(callback_url):
+            return jsonify({"error": "callback_url must be an allowed http(s) URL"}), 400
+
+        body = request.get_data()
+        # get_data stops quietly at MAX_CONTENT_LENGTH when there is no Content-Length
+        limit = request.max_content_length
+        if request.content_length is None and limit is not None and len(body) >= limit:
+            abort(413)
+
+        query = [(k, v) for k, v in request.args.items(multi=True) if k not in ('async', 'callback_url')]
+        environ = {
+            'path': request.path,
+            'method': request.method,
+            'query_string': query,
+            'headers': [(k, v) for k, v in request.headers if k.lower() != 'content-length'],
+            'body': body,
+        }
+        try:
+            job = get_job_manager().submit(current_app._get_current_object(), view, view_args, environ, callback_url)
+        except JobQueueFull:
+            return jsonify({"error": "Job queue is full, retry later"}), 503
+
+        return jsonify({
+            "job_id": job['id'],
+            "status": job['status'],
+            "status_url": url_for('jobs_bp.get_job', job_id=job['id'])
+        }), 202
+
+    return wrapper
+
+
+# Internal cache
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    global _job_manager
+    if _job_manager is None:
+        with _job_manager_lock:
+            if _job_manager is None:
+                _job_manager = JobManager()
+    return _job_manager
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+LLM_CACHE_BACKEND = os.getenv('LLM_CACHE_BACKEND', 'memory')  # 'memory', 'disk' or 'none'
+LLM_CACHE_TTL = float(os.getenv('LLM_CACHE_TTL', '86400'))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '2048'))
+LLM_CACHE_DIR = os.getenv('LLM_CACHE_DIR', os.path.join(os.path.dirname(__file__), '.llm_cache'))
+
+
+def bin_value(value, step):
+    """Snap a numeric input to a bin so near-identical inputs share a cache entry."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return value
+    return round(round(value / step) * step, 6)
+
+
+def cache_key(namespace, **fields):
+    """Stable key from a namespace and already-binned prompt inputs."""
+    canonical = json.dumps(fields, sort_keys=True, ensure_ascii=False, default=str)
+    return f"{namespace}:{hashlib.sha256(canonical.encode()).hexdigest()}"
+
+
+class MemoryBackend:
+    """In-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskBackend:
+    """
+    One JSON file per entry, shared by every worker on the host. File mtime
+    tracks last use, so eviction removes the least recently used files.
+    """
+
+    def __init__(self, directory=LLM_CACHE_DIR, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + '.json')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry['expires_at'] < time.time():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        os.utime(path)
+        return entry['value']
+
+    def set(self, key, value, ttl):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'expires_at': time.time() + ttl, 'value': value}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        entries = [e for e in os.scandir(self.directory) if e.name.endswith('.json')]
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def __len__(self):
+        return sum(1 for e in os.scandir(self.directory) if e.name.endswith('.json'))
+
+
+class LLMCache:
+    """TTL cache for LLM completions with per-namespace hit/miss counters."""
+
+    def __init__(self, backend=None, ttl=LLM_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key, create, valid=None):
+        """
+        Returns (value, cache_hit). `create` is only called on a miss. With
+        `valid`, a new value is stored only if `valid(value)` is true, so a
+        completion that didn't follow the format is not served again.
+        """
+        namespace = key.split(':', 1)[0]
+        if self.backend is not None:
+            value = self.backend.get(key)
+            if value is not None:
+                self._count(namespace, 'hits')
+                return value, True
+
+        value = create()
+        self._count(namespace, 'misses')
+        if self.backend is not None and value and (valid is None or valid(value)):
+            self.backend.set(key, value, self.ttl)
+        return value, False
+
+    def _count(self, namespace, name):
+        with self._lock:
+            stats = self._stats.setdefault(namespace, {'hits': 0, 'misses': 0})
+            stats[name] += 1
+
+    def stats(self):
+        with self._lock:
+            namespaces = {
+                name: dict(counts, hit_rate=counts['hits'] / max(counts['hits'] + counts['misses'], 1))
+                for name, counts in self._stats.items()
+            }
+        return {
+            'backend': type(self.backend).__name__ if self.backend is not None else None,
+            'ttl': self.ttl,
+            'entries': len(self.backend) if self.backend is not None else 0,
+            'namespaces': namespaces,
+        }
+
+
+# Internal cache
+_llm_cache = None
+
+
+def get_llm_cache():
+    global _llm_cache
+    if _llm_cache is None:
+        if LLM_CACHE_BACKEND == 'disk':
+            backend = DiskBackend()
+        elif LLM_CACHE_BACKEND == 'memory':
+            backend = MemoryBackend()
+        else:
+            backend = None
+        _llm_cache = LLMCache(backend)
+    return _llm_cache
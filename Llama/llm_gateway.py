@@ -0,0 +1,364 @@
+import os
+import random
+import threading
+import time
+
+import groq
+import httpx
+from flask import has_request_context, request
+
+LLM_MAX_CONNECTIONS = int(os.getenv('LLM_MAX_CONNECTIONS', '32'))
+LLM_MAX_KEEPALIVE = int(os.getenv('LLM_MAX_KEEPALIVE', '16'))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv('LLM_KEEPALIVE_EXPIRY', '60'))
+LLM_CONNECT_TIMEOUT = float(os.getenv('LLM_CONNECT_TIMEOUT', '5'))
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '16'))
+LLM_ACQUIRE_TIMEOUT = float(os.getenv('LLM_ACQUIRE_TIMEOUT', '30'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '2'))
+LLM_BACKOFF_BASE = float(os.getenv('LLM_BACKOFF_BASE', '0.5'))
+LLM_BACKOFF_MAX = float(os.getenv('LLM_BACKOFF_MAX', '8'))
+LLM_BREAKER_THRESHOLD = int(os.getenv('LLM_BREAKER_THRESHOLD', '5'))
+LLM_BREAKER_RESET = float(os.getenv('LLM_BREAKER_RESET', '30'))
+# Retry-After (seconds) suggested to clients when every concurrency slot is taken
+LLM_BUSY_RETRY_AFTER = float(os.getenv('LLM_BUSY_RETRY_AFTER', '1'))
+
+# Read timeout per blueprint; vision and chat completions run longest
+LLM_TIMEOUTS = {
+    'default': float(os.getenv('LLM_TIMEOUT', '30')),
+    'classify_plant_disease_bp': 60.0,
+    'chat_bp': 60.0,
+}
+
+
+class LLMUnavailable(Exception):
+    """The gateway refused a call; `retry_after` is when trying again makes sense."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpen(LLMUnavailable):
+    pass
+
+
+class GatewayBusy(LLMUnavailable):
+    pass
+
+
+def is_retryable(error):
+    if isinstance(error, (groq.APIConnectionError, groq.APITimeoutError, groq.RateLimitError)):
+        return True
+    return isinstance(error, groq.APIStatusError) and error.status_code >= 500
+
+
+def retry_after(error):
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+def token_usage(result):
+    """(prompt, completion) tokens from a Groq completion or a LangChain message."""
+    usage = getattr(result, 'usage', None)
+    if usage is not None:
+        return getattr(usage, 'prompt_tokens', 0) or 0, getattr(usage, 'completion_tokens', 0) or 0
+    usage = getattr(result, 'usage_metadata', None) or {}
+    return usage.get('input_tokens', 0), usage.get('output_tokens', 0)
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive upstream failures and rejects calls
+    for `reset_timeout` seconds, then lets a single trial call through.
+    """
+
+    def __init__(self, threshold=LLM_BREAKER_THRESHOLD, reset_timeout=LLM_BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half-open' if time.monotonic() - self.opened_at >= self.reset_timeout else 'open'
+
+    def remaining(self):
+        """Seconds until an open circuit lets its trial call through (0 otherwise)."""
+        if self.opened_at is None:
+            return 0.0
+        return max(self.reset_timeout - (time.monotonic() - self.opened_at), 0.0)
+
+    def before_call(self):
+        """Raises CircuitOpen, or returns True if this call is the half-open trial."""
+        with self._lock:
+            state = self.state
+            if state == 'open' or (state == 'half-open' and self._trial):
+                # While a trial is out its outcome decides; check back shortly
+                raise CircuitOpen("LLM upstream circuit is open", self.remaining() or LLM_BUSY_RETRY_AFTER)
+            if state == 'half-open':
+                self._trial = True
+                return True
+            return False
+
+    def release_trial(self):
+        """Give back a trial that never reached upstream, so another call can take it."""
+        with self._lock:
+            self._trial = False
+
+    def record(self, success):
+        with self._lock:
+            self._trial = False
+            if success:
+                self.failures = 0
+                self.opened_at = None
+            else:
+                self.failures += 1
+                if self.failures >= self.threshold or self.opened_at is not None:
+                    self.opened_at = time.monotonic()
+
+
+class LLMGateway:
+    """
+    Single path for every LLM call: bounded concurrency, circuit breaker,
+    retries with jittered exponential backoff on 429/5xx/connection errors,
+    per-blueprint timeouts and per-blueprint latency/token/error metrics.
+    """
+
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY, max_retries=LLM_MAX_RETRIES,
+                 breaker=None, timeouts=None, sleep=time.sleep, acquire_timeout=LLM_ACQUIRE_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.acquire_timeout = acquire_timeout
+        self.max_retries = max_retries
+        self.breaker = breaker or CircuitBreaker()
+        self.timeouts = timeouts or LLM_TIMEOUTS
+        self.sleep = sleep
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self.in_flight = 0
+
+    @staticmethod
+    def caller():
+        if has_request_context() and request.blueprint:
+            return request.blueprint
+        return 'default'
+
+    def timeout_for(self, caller):
+        return self.timeouts.get(caller, self.timeouts['default'])
+
+    def backoff(self, attempt, error):
+        delay = retry_after(error)
+        if delay is None:
+            delay = random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
+        return min(delay, LLM_BACKOFF_MAX)
+
+    def call(self, fn, caller=None):
+        """Run `fn(timeout)` under the gateway's limits; returns its result."""
+        caller = caller or self.caller()
+        timeout = self.timeout_for(caller)
+        try:
+            trial = self.breaker.before_call()
+        except CircuitOpen:
+            self._record(caller, 'rejected')
+            raise
+
+        if not self._semaphore.acquire(timeout=self.acquire_timeout):
+            if trial:
+                self.breaker.release_trial()
+            self._record(caller, 'rejected')
+            raise GatewayBusy("Too many concurrent LLM calls", LLM_BUSY_RETRY_AFTER)
+        with self._lock:
+            self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            attempt = 0
+            while True:
+                try:
+                    result = fn(timeout)
+                except Exception as e:
+                    if not is_retryable(e):
+                        # Client errors (4xx other than 429) mean upstream is answering
+                        self.breaker.record(True)
+                        self._record(caller, 'errors', latency=time.perf_counter() - start)
+                        raise
+                    if attempt >= self.max_retries:
+                        self.breaker.record(False)
+                        self._record(caller, 'errors', latency=time.perf_counter() - start)
+                        raise
+                    self._record(caller, 'retries')
+                    self.sleep(self.backoff(attempt, e))
+                    attempt += 1
+                    continue
+                self.breaker.record(True)
+                self._record(caller, 'calls', latency=time.perf_counter() - start, usage=token_usage(result))
+                return result
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._semaphore.release()
+
+    def stream(self, fn, caller=None):
+        """
+        Like `call` for a streaming `fn(timeout)`, without retries since chunks
+        may already have been forwarded. The concurrency slot is held until the
+        stream is exhausted or closed.
+        """
+        caller = caller or self.caller()
+        try:
+            trial = self.breaker.before_call()
+        except CircuitOpen:
+            self._record(caller, 'rejected')
+            raise
+        if not self._semaphore.acquire(timeout=self.acquire_timeout):
+            if trial:
+                self.breaker.release_trial()
+            self._record(caller, 'rejected')
+            raise GatewayBusy("Too many concurrent LLM calls", LLM_BUSY_RETRY_AFTER)
+        with self._lock:
+            self.in_flight += 1
+        start = time.perf_counter()
+        iterator = None
+        try:
+            iterator = fn(self.timeout_for(caller))
+            yield from iterator
+        except GeneratorExit:
+            # Client went away mid-stream; upstream was answering
+            self.breaker.record(True)
+            raise
+        except Exception as e:
+            self.breaker.record(not is_retryable(e))
+            self._record(caller, 'errors', latency=time.perf_counter() - start)
+            raise
+        else:
+            self.breaker.record(True)
+            self._record(caller, 'calls', latency=time.perf_counter() - start)
+        finally:
+            if iterator is not None and hasattr(iterator, 'close'):
+                iterator.close()
+            with self._lock:
+                self.in_flight -= 1
+            self._semaphore.release()
+
+    def _record(self, caller, name, latency=None, usage=None):
+        with self._lock:
+            metrics = self._metrics.setdefault(caller, {
+                'calls': 0, 'errors': 0, 'retries': 0, 'rejected': 0,
+                'latency_sum': 0.0, 'latency_max': 0.0,
+                'prompt_tokens': 0, 'completion_tokens': 0,
+            })
+            metrics[name] += 1
+            if latency is not None:
+                metrics['latency_sum'] += latency
+                metrics['latency_max'] = max(metrics['latency_max'], latency)
+            if usage is not None:
+                metrics['prompt_tokens'] += usage[0]
+                metrics['completion_tokens'] += usage[1]
+
+    def stats(self):
+        with self._lock:
+            blueprints = {}
+            for caller, metrics in self._metrics.items():
+                finished = metrics['calls'] + metrics['errors']
+                blueprints[caller] = dict(metrics, latency_avg=metrics['latency_sum'] / finished if finished else 0.0)
+            return {
+                'circuit': self.breaker.state,
+                'in_flight': self.in_flight,
+                'max_concurrency': self.max_concurrency,
+                'blueprints': blueprints,
+            }
+
+
+class _Completions:
+    def __init__(self, completions, gateway):
+        self._completions = completions
+        self._gateway = gateway
+
+    def create(self, **kwargs):
+        if kwargs.get('stream'):
+            return self._completions.create(**kwargs)
+        return self._gateway.call(lambda timeout: self._completions.create(timeout=timeout, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._completions, name)
+
+
+class _Chat:
+    def __init__(self, chat, gateway):
+        self._chat = chat
+        self.completions = _Completions(chat.completions, gateway)
+
+    def __getattr__(self, name):
+        return getattr(self._chat, name)
+
+
+class GatewayClient:
+    """Groq client whose chat completions go through an LLMGateway."""
+
+    def __init__(self, client, gateway):
+        self._client = client
+        self.gateway = gateway
+        self.chat = _Chat(client.chat, gateway)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+class GatewayChatModel:
+    """LangChain chat model proxy: invoke and stream go through the gateway."""
+
+    def __init__(self, llm, gateway):
+        self._llm = llm
+        self.gateway = gateway
+
+    def invoke(self, messages, **kwargs):
+        return self.gateway.call(lambda timeout: self._llm.invoke(messages, timeout=timeout, **kwargs))
+
+    def stream(self, messages, **kwargs):
+        return self.gateway.stream(lambda timeout: self._llm.stream(messages, timeout=timeout, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._llm, name)
+
+
+def make_http_client():
+    """Shared, bounded keep-alive pool used by both the Groq and LangChain clients."""
+    return httpx.Client(
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(LLM_TIMEOUTS['default'], connect=LLM_CONNECT_TIMEOUT),
+    )
+
+
+# Internal cache
+_gateway = None
+_http_client = None
+_init_lock = threading.Lock()
+
+
+def get_gateway():
+    global _gateway
+    if _gateway is None:
+        with _init_lock:
+            if _gateway is None:
+                _gateway = LLMGateway()
+    return _gateway
+
+
+def get_http_client():
+    global _http_client
+    if _http_client is None:
+        with _init_lock:
+            if _http_client is None:
+                _http_client = make_http_client()
+    return _http_client
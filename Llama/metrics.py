@@ -0,0 +1,332 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') == '1'
+# Shared by all workers of one server (gunicorn.conf.py sets it); unset for
+# a single process such as the dev server
+METRICS_DIR = os.getenv('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+class Histogram:
+    """Cumulative-bucket histogram with the Prometheus le semantics."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        # bisect_left: a value equal to a bound belongs to that bucket (le)
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Metrics:
+    """
+    Counters and histograms keyed by (name, labels), exported in the
+    Prometheus text format. Every update is a dict lookup and a few
+    additions under one lock, cheap enough to leave on in production.
+    `collectors` are callables returning extra (name, type, labels, value)
+    samples, read at scrape time.
+
+    Each process counts on its own. With `directory` set (METRICS_DIR), each
+    process that serves requests writes a snapshot to
+    `<directory>/metrics-<pid>.json` every METRICS_FLUSH_INTERVAL seconds,
+    and `render` merges all of them: counters and histograms are summed
+    over workers, including workers that have exited, so totals only go
+    up. Gauges are per-process state and are exported with a `pid` label,
+    for live processes only. Other workers' numbers can lag by up to one
+    flush interval. Without `directory`, a scrape sees only the process
+    that answers it.
+    """
+
+    def __init__(self, directory=METRICS_DIR, flush_interval=METRICS_FLUSH_INTERVAL):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+        self._writer_pid = None
+        self.collectors = []
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def inc(self, name, labels=(), value=1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=(), buckets=LATENCY_BUCKETS):
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def reset(self):
+        """Forget this process's numbers (a forked worker starts from zero)."""
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._writer_pid = None
+
+    def snapshot(self):
+        with self._lock:
+            counters = [[name, labels, value] for (name, labels), value in self._counters.items()]
+            histograms = [[name, labels, list(h.buckets), list(h.counts), h.sum]
+                          for (name, labels), h in self._histograms.items()]
+        collected = []
+        for collector in self.collectors:
+            try:
+                collected.extend([name, kind, labels, value] for name, kind, labels, value in collector())
+            except Exception:
+                # A broken collector must not take /metrics down
+                continue
+        return {'pid': os.getpid(), 'counters': counters, 'histograms': histograms, 'collected': collected}
+
+    def write_snapshot(self):
+        path = os.path.join(self.directory, f"metrics-{os.getpid()}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def read_snapshots(self):
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def start_writer(self):
+        """Start this process's snapshot writer, once per process."""
+        if not self.directory or self._writer_pid == os.getpid():
+            return
+        with self._lock:
+            if self._writer_pid == os.getpid():
+                return
+            self._writer_pid = os.getpid()
+        os.makedirs(self.directory, exist_ok=True)
+        threading.Thread(target=self._write_loop, name='metrics-writer', daemon=True).start()
+        atexit.register(self._write_quietly)
+
+    def _write_loop(self):
+        pid = os.getpid()
+        while self._writer_pid == pid:
+            self._write_quietly()
+            time.sleep(self.flush_interval)
+
+    def _write_quietly(self):
+        try:
+            self.write_snapshot()
+        except OSError:
+            pass
+
+    def render(self):
+        if not self.directory:
+            return render_snapshots([self.snapshot()], self._help, gauge_pids=False)
+        # This worker's numbers are current; the others' are as of their last flush
+        self.start_writer()
+        self.write_snapshot()
+        return render_snapshots(self.read_snapshots(), self._help, gauge_pids=True)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def render_snapshots(snapshots, help_texts, gauge_pids):
+    counters = {}
+    histograms = {}
+    gauges = {}
+    for snapshot in snapshots:
+        alive = not gauge_pids or snapshot['pid'] == os.getpid() or _pid_alive(snapshot['pid'])
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, buckets, counts, total in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            if key not in histograms:
+                histograms[key] = (buckets, [0] * len(counts), [0.0])
+            merged = histograms[key]
+            for i, count in enumerate(counts):
+                merged[1][i] += count
+            merged[2][0] += total
+        for name, kind, labels, value in snapshot['collected']:
+            labels = tuple(map(tuple, labels))
+            if kind == 'counter':
+                counters[(name, labels)] = counters.get((name, labels), 0) + value
+            elif alive:
+                if gauge_pids:
+                    labels += (('pid', str(snapshot['pid'])),)
+                gauges[(name, kind, labels)] = value
+
+    # (name, type) -> [(labels, [sample lines])], one entry per series
+    families = {}
+    for (name, labels), value in counters.items():
+        families.setdefault((name, 'counter'), []).append((labels, [(name, labels, value)]))
+    for (name, labels), (buckets, counts, total) in histograms.items():
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*buckets, '+Inf'), counts):
+            cumulative += count
+            lines.append((f"{name}_bucket", labels + (('le', format_value(bound)),), cumulative))
+        lines.append((f"{name}_sum", labels, total[0]))
+        lines.append((f"{name}_count", labels, cumulative))
+        families.setdefault((name, 'histogram'), []).append((labels, lines))
+    for (name, kind, labels), value in gauges.items():
+        families.setdefault((name, kind), []).append((labels, [(name, labels, value)]))
+
+    out = []
+    for (name, kind), series in sorted(families.items()):
+        if name in help_texts:
+            out.append(f"# HELP {name} {help_texts[name]}")
+        out.append(f"# TYPE {name} {kind}")
+        for _, lines in sorted(series, key=lambda s: s[0]):
+            out.extend(f"{sample}{format_labels(labels)} {format_value(value)}" for sample, labels, value in lines)
+    return "\n".join(out) + "\n"
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+def format_value(value):
+    return value if isinstance(value, str) else str(value)
+
+
+def _blueprint():
+    if has_request_context():
+        return request.blueprint or 'none'
+    return 'none'
+
+
+@contextmanager
+def stage(name):
+    """
+    Time a named stage of a route:
+
+        with stage('predict'):
+            prediction = model.predict(features)
+
+    Recorded as stage_duration_seconds{blueprint, stage}. The routes use
+    model_load, feature_prep, predict, llm, parse and serialize.
+    """
+    if not METRICS_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        get_metrics().observe('stage_duration_seconds', time.perf_counter() - start,
+                              (('blueprint', _blueprint()), ('stage', name)))
+
+
+def _before_request():
+    g.metrics_start = time.perf_counter()
+
+
+def _after_request(response):
+    start = g.pop('metrics_start', None)
+    if start is None:
+        return response
+    metrics = get_metrics()
+    metrics.start_writer()
+    blueprint = (('blueprint', request.blueprint or 'none'),)
+    metrics.inc('http_requests_total', blueprint + (('method', request.method), ('status', str(response.status_code))))
+    # For streamed responses this is the time to the first byte
+    metrics.observe('http_request_duration_seconds', time.perf_counter() - start, blueprint)
+    if request.content_length:
+        metrics.observe('http_request_size_bytes', request.content_length, blueprint, SIZE_BUCKETS)
+    if not response.is_streamed and response.content_length is not None:
+        metrics.observe('http_response_size_bytes', response.content_length, blueprint, SIZE_BUCKETS)
+    return response
+
+
+def init_metrics(app):
+    """Record request count, latency and payload sizes per blueprint for `app`."""
+    if METRICS_ENABLED:
+        app.before_request(_before_request)
+        app.after_request(_after_request)
+
+
+def _subsystem_samples():
+    from jobs import get_job_manager
+    from llm_cache import get_llm_cache
+    from llm_gateway import get_gateway
+
+    gateway = get_gateway().stats()
+    yield 'llm_gateway_in_flight', 'gauge', (), gateway['in_flight']
+    yield 'llm_gateway_circuit_open', 'gauge', (), int(gateway['circuit'] != 'closed')
+    for caller, stats in gateway['blueprints'].items():
+        for field in ('calls', 'errors', 'retries', 'rejected', 'prompt_tokens', 'completion_tokens'):
+            yield f'llm_gateway_{field}_total', 'counter', (('blueprint', caller),), stats[field]
+
+    jobs = get_job_manager().stats()
+    yield 'jobs_busy', 'gauge', (), jobs['busy']
+    yield 'jobs_queued', 'gauge', (), jobs['queued']
+
+    cache = get_llm_cache().stats()
+    yield 'llm_cache_entries', 'gauge', (), cache['entries']
+    for namespace, counts in cache['namespaces'].items():
+        for field in ('hits', 'misses'):
+            yield f'llm_cache_{field}_total', 'counter', (('namespace', namespace),), counts[field]
+
+
+# Internal cache
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                metrics = Metrics()
+                metrics.describe('http_requests_total', "Requests by blueprint, method and status")
+                metrics.describe('http_request_duration_seconds', "Request latency by blueprint")
+                metrics.describe('http_request_size_bytes', "Request body size by blueprint")
+                metrics.describe('http_response_size_bytes', "Response body size by blueprint")
+                metrics.describe('stage_duration_seconds', "Time spent in named route stages")
+                metrics.collectors.append(_subsystem_samples)
+                _metrics = metrics
+    return _metrics
+
+
+def _reset_after_fork():
+    # Numbers recorded in a preloading master (e.g. during warmup) would
+    # otherwise be counted once per worker
+    if _metrics is not None:
+        _metrics.reset()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,192 @@
+import hashlib
+import os
+import sys
+import threading
+import time
+import types
+
+import numpy as np
+
+# Seconds between file checks per model; 0 disables hot reload
+MODEL_RELOAD_INTERVAL = float(os.getenv('MODEL_RELOAD_INTERVAL', '2'))
+
+_OPAQUE_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+
+def file_digest(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def estimate_size(obj):
+    """
+    Approximate bytes held by `obj`: numpy buffers plus Python object sizes,
+    following __getstate__ so extension types that keep their data outside
+    __dict__ (e.g. sklearn's Tree) are counted too.
+    """
+    total = 0
+    seen = set()
+    # __getstate__ results are temporaries; keep them alive so their ids aren't reused
+    states = []
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, _OPAQUE_TYPES):
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item, 0)
+        if isinstance(item, np.ndarray):
+            if isinstance(item.base, np.ndarray):
+                stack.append(item.base)
+            elif item.base is not None or not item.flags.owndata:
+                # Buffer owned by a non-numpy object, e.g. a Tree's node array
+                total += item.nbytes
+            if item.dtype == object:
+                stack.extend(item.ravel())
+        elif isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif not isinstance(item, (str, bytes, int, float, bool, type(None))):
+            try:
+                states.append(item.__getstate__())
+            except Exception:
+                continue
+            stack.append(states[-1])
+    return total
+
+
+def file_mtimes(paths):
+    return tuple(os.path.getmtime(path) for path in paths)
+
+
+class _Entry:
+    def __init__(self, name, paths, loader):
+        self.name = name
+        self.paths = tuple(paths)
+        self.loader = loader
+        self.lock = threading.Lock()
+        # (value, version) swapped as one reference so readers never see a mix
+        self.current = None
+        self.checked_at = 0.0
+        self.failed_mtimes = None
+        self.last_error = None
+        self.reloads = 0
+
+
+class ModelRegistry:
+    """
+    Load-once model cache with a lock per model. Each model is built by
+    `loader(*paths)`. Every `reload_interval` seconds a `get` compares the
+    files' mtimes and, if they changed, loads the new version in the calling
+    thread while other threads keep being served the old one, then swaps it
+    in. Requests already holding the old object finish with it. A version
+    that fails to load is skipped until its files change again. A loader can
+    set `load_warning` on the value (e.g. a stale export it did not serve);
+    it is reported with the version.
+    """
+
+    def __init__(self, reload_interval=MODEL_RELOAD_INTERVAL):
+        self.reload_interval = reload_interval
+        self._entries = {}
+
+    def register(self, name, paths, loader):
+        self._entries[name] = _Entry(name, paths, loader)
+
+    def get(self, name):
+        entry = self._entries[name]
+        current = entry.current
+        if current is None:
+            with entry.lock:
+                if entry.current is None:
+                    # First load: there is nothing to fall back on, so errors propagate
+                    self._load(entry, raise_errors=True)
+                return entry.current[0]
+
+        if self.reload_interval > 0 and time.monotonic() - entry.checked_at >= self.reload_interval:
+            # One thread checks and reloads; the others keep using the current version
+            if entry.lock.acquire(blocking=False):
+                try:
+                    entry.checked_at = time.monotonic()
+                    self._reload_if_changed(entry)
+                finally:
+                    entry.lock.release()
+                return entry.current[0]
+        return current[0]
+
+    def reload(self, name):
+        """Load `name` from disk now, whether or not its files changed."""
+        entry = self._entries[name]
+        with entry.lock:
+            self._load(entry, raise_errors=True)
+        return entry.current[1]
+
+    def _reload_if_changed(self, entry):
+        try:
+            mtimes = file_mtimes(entry.paths)
+        except OSError as e:
+            entry.last_error = f"{type(e).__name__}: {e}"
+            return
+        if mtimes != entry.current[1]['mtimes'] and mtimes != entry.failed_mtimes:
+            self._load(entry, raise_errors=False)
+
+    def _load(self, entry, raise_errors):
+        mtimes = None
+        try:
+            # Fingerprint before loading so the version describes what was read
+            mtimes = file_mtimes(entry.paths)
+            digest = file_digest(entry.paths)
+            value, duration, footprint = self._measure(entry)
+        except Exception as e:
+            entry.failed_mtimes = mtimes
+            entry.last_error = f"{type(e).__name__}: {e}"
+            if raise_errors:
+                raise
+            return
+
+        version = {
+            'sha256': digest,
+            'mtimes': mtimes,
+            'loaded_at': time.time(),
+            'load_seconds': duration,
+            'memory_bytes': footprint,
+        }
+        warning = getattr(value, 'load_warning', None)
+        if warning:
+            version['warning'] = warning
+        if entry.current is not None:
+            entry.reloads += 1
+        entry.current = (value, version)
+        entry.failed_mtimes = None
+        entry.last_error = None
+
+    @staticmethod
+    def _measure(entry):
+        """Returns (value, load seconds, estimated bytes held by the value)."""
+        start = time.perf_counter()
+        value = entry.loader(*entry.paths)
+        duration = time.perf_counter() - start
+        return value, duration, estimate_size(value)
+
+    def stats(self):
+        models = {}
+        for name, entry in self._entries.items():
+            current = entry.current
+            version = dict(current[1]) if current is not None else None
+            if version is not None:
+                version['mtimes'] = [
+                    time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(mtime)) for mtime in version['mtimes']
+                ]
+            models[name] = {
+                'loaded': current is not None,
+                'files': list(entry.paths),
+                'version': version,
+                'reloads': entry.reloads,
+                'last_error': entry.last_error,
+            }
+        return {'reload_interval': self.reload_interval, 'models': models}
@@ -1,93 +1,155 @@
+import os
+import threading
 import joblib
 from groq import Groq
 from langchain_groq import ChatGroq
 from constant import GROQ_API_KEY
+from compiled_forest import CompiledForest
+from preprocessing import FusedAffineScaler
+from model_registry import ModelRegistry, file_digest
+from single_flight import SingleFlightClient
+from llm_gateway import GatewayClient, GatewayChatModel, get_gateway, get_http_client
 import pickle
 # from openai import OpenAI
 
 # Internal cache
-_fertilizer_model = None
-_yield_model = None
-_ohe_model = None
-_crop_model = None
-_crop_scaler_standard = None
-_crop_scaler_minmax = None
 _client = None
 _llm = None
-_crop_yield_model_indonesia = None
-_indonesia_max_data = None
-_indonesia_min_data = None
 _deepseek_client= None
+_client_lock = threading.Lock()
+
+CROP_YIELD_INDONESIA_FILES = ('Models/yield_model_indonesia.sav', 'Models/indonesia_max.data', 'Models/indonesia_min.data')
+
+# Inference engine per random-forest model: 'sklearn', 'compiled' (see compiled_forest.py)
+# or 'mmap' (compiled buffers memory-mapped from the export_models.py output)
+MODEL_ENGINES = {
+    'fertilizer': os.getenv('FERTILIZER_MODEL_ENGINE', 'sklearn'),
+    'crop': os.getenv('CROP_MODEL_ENGINE', 'sklearn'),
+}
+
+# Random-forest pickle and its memory-mappable export
+FOREST_FILES = {
+    'fertilizer': ('Models/rf_model_fertrecom.pkl', 'Models/rf_model_fertrecom.forest.joblib'),
+    'crop': ('Models/model_croprecom.pkl', 'Models/model_croprecom.forest.joblib'),
+}
+
+
+def _with_engine(model, name):
+    if MODEL_ENGINES.get(name) == 'compiled':
+        return CompiledForest(model)
+    return model
+
+
+def _load_forest_export(pickle_path, export_path):
+    """
+    The memory-mapped export, if it was made from the current pickle. A stale
+    export (pickle replaced without re-running export_models.py) is not
+    served: the pickle is compiled in-process instead and /models reports it.
+    """
+    forest = CompiledForest.load(export_path)
+    pickle_sha256 = file_digest([pickle_path])
+    source_sha256 = getattr(forest, 'source_sha256', None)
+    if source_sha256 == pickle_sha256:
+        return forest
+    forest = CompiledForest(joblib.load(pickle_path))
+    forest.load_warning = (
+        f"{export_path} was exported from another pickle (source_sha256 {str(source_sha256)[:12]}, "
+        f"{pickle_path} {pickle_sha256[:12]}); serving {pickle_path} compiled in-process, "
+        f"re-run export_models.py"
+    )
+    return forest
+
+
+def _register_forest(registry, name):
+    pickle_path, export_path = FOREST_FILES[name]
+    if MODEL_ENGINES.get(name) == 'mmap':
+        # Watches both files: a replaced pickle is noticed even before it is re-exported
+        registry.register(name, [pickle_path, export_path], _load_forest_export)
+    else:
+        registry.register(name, [pickle_path], lambda path: _with_engine(joblib.load(path), name))
+
+
+def _load_pickles(*paths):
+    loaded = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            loaded.append(pickle.load(f))
+    return tuple(loaded)
+
+
+# Models are loaded once, versioned and hot-reloaded when their files change (see model_registry.py)
+_registry = ModelRegistry()
+_register_forest(_registry, 'fertilizer')
+_registry.register('yield', ["Models/RF_Model_yieldrecom.pkl"], joblib.load)
+_registry.register('yield_ohe', ["Models/OHE_Encoder_yieldrecom.pkl"], joblib.load)
+_register_forest(_registry, 'crop')
+_registry.register('crop_scaler_standard', ["Models/standscaler_croprecom.pkl"], joblib.load)
+_registry.register('crop_scaler_minmax', ["Models/minmaxscaler_croprecom.pkl"], joblib.load)
+# MinMaxScaler + StandardScaler fused into one affine transform (see preprocessing.py)
+_registry.register('crop_preprocessor', ["Models/minmaxscaler_croprecom.pkl", "Models/standscaler_croprecom.pkl"],
+                   lambda minmax, standard: FusedAffineScaler(joblib.load(minmax), joblib.load(standard)))
+# Model and its normalization bounds are reloaded together
+_registry.register('crop_yield_indonesia', CROP_YIELD_INDONESIA_FILES, _load_pickles)
+
+
+def get_model_registry():
+    return _registry
+
 
 def get_fertilizer_model():
-    global _fertilizer_model
-    if _fertilizer_model is None:
-        _fertilizer_model = joblib.load("Models/rf_model_fertrecom.pkl")
-    return _fertilizer_model
+    return _registry.get('fertilizer')
 
 
 def get_yield_model():
-    global _yield_model
-    if _yield_model is None:
-        _yield_model = joblib.load("Models/RF_Model_yieldrecom.pkl")
-    return _yield_model
+    return _registry.get('yield')
 
 
 def get_ohe_model():
-    global _ohe_model
-    if _ohe_model is None:
-        _ohe_model = joblib.load("Models/OHE_Encoder_yieldrecom.pkl")
-    return _ohe_model
+    return _registry.get('yield_ohe')
 
 
 def get_crop_model():
-    global _crop_model
-    if _crop_model is None:
-        _crop_model = joblib.load("Models/model_croprecom.pkl")
-    return _crop_model
+    return _registry.get('crop')
 
 
 def get_crop_scaler_standard():
-    global _crop_scaler_standard
-    if _crop_scaler_standard is None:
-        _crop_scaler_standard = joblib.load("Models/standscaler_croprecom.pkl")
-    return _crop_scaler_standard
+    return _registry.get('crop_scaler_standard')
 
 
 def get_crop_scaler_minmax():
-    global _crop_scaler_minmax
-    if _crop_scaler_minmax is None:
-        _crop_scaler_minmax = joblib.load("Models/minmaxscaler_croprecom.pkl")
-    return _crop_scaler_minmax
+    return _registry.get('crop_scaler_minmax')
+
+
+def get_crop_preprocessor():
+    return _registry.get('crop_preprocessor')
 
 
 def get_llm():
     global _llm
     if _llm is None:
-        _llm = ChatGroq(
-            model="llama3-70b-8192",
-            temperature=0.7,
-        )
+        with _client_lock:
+            if _llm is None:
+                # Retries, timeouts and concurrency are handled by the gateway (see llm_gateway.py)
+                _llm = GatewayChatModel(ChatGroq(
+                    model="llama3-70b-8192",
+                    temperature=0.7,
+                    http_client=get_http_client(),
+                    max_retries=0,
+                ), get_gateway())
     return _llm
 
 def get_client():
     global _client
     if _client is None:
-        _client = Groq(api_key=GROQ_API_KEY)
+        with _client_lock:
+            if _client is None:
+                # Identical in-flight completions share one upstream call
+                _client = SingleFlightClient(GatewayClient(
+                    Groq(api_key=GROQ_API_KEY, http_client=get_http_client(), max_retries=0),
+                    get_gateway()
+                ))
     return _client
 
 def get_crop_yield_model_indonesia():
-    global _crop_yield_model_indonesia
-    global _indonesia_max_data
-    global _indonesia_min_data
-    
-    if _crop_yield_model_indonesia is None:
-        _crop_yield_model_indonesia = pickle.load(open('Models/yield_model_indonesia.sav', 'rb'))
-    
-    if _indonesia_max_data is None:
-        _indonesia_max_data = pickle.load(open('Models/indonesia_max.data', 'rb'))
-    
-    if _indonesia_min_data is None:
-        _indonesia_min_data = pickle.load(open('Models/indonesia_min.data', 'rb'))
-        
-    return _crop_yield_model_indonesia, _indonesia_max_data, _indonesia_min_data
\ No newline at end of file
+    # (model, max_data, min_data)
+    return _registry.get('crop_yield_indonesia')
\ No newline at end of file
@@ -0,0 +1,40 @@
+import numpy as np
+
+
+class FusedAffineScaler:
+    """
+    A MinMaxScaler followed by a StandardScaler, folded into one per-feature
+    affine map x * a + b computed once from the fitted scalers.
+    """
+
+    def __init__(self, minmax, standard):
+        scale = np.asarray(minmax.scale_, dtype=np.float64)
+        offset = np.asarray(minmax.min_, dtype=np.float64)
+
+        std = standard.scale_ if standard.scale_ is not None else np.ones_like(scale)
+        mean = standard.mean_ if getattr(standard, 'with_mean', True) and standard.mean_ is not None else np.zeros_like(scale)
+
+        self.n_features_in_ = minmax.n_features_in_
+        self.a = scale / std
+        self.b = (offset - mean) / std
+
+        # MinMaxScaler(clip=True) clamps to feature_range before standardising;
+        # the same bounds after the (increasing) standardisation step
+        self.bounds = None
+        if getattr(minmax, 'clip', False):
+            low, high = minmax.feature_range
+            self.bounds = ((low - mean) / std, (high - mean) / std)
+
+    def transform(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        single = X.ndim == 1
+        if single:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, but the scaler expects {self.n_features_in_}")
+
+        out = np.multiply(X, self.a)
+        out += self.b
+        if self.bounds is not None:
+            np.clip(out, self.bounds[0], self.bounds[1], out=out)
+        return out[0] if single else out
@@ -0,0 +1,128 @@
+import os
+import numpy as np
+import pandas as pd
+
+# 'compact' sends the descriptor below to the LLM, 'full' the raw price list
+PRICE_PROMPT_MODE = os.getenv('PRICE_PROMPT_MODE', 'compact')
+PRICE_PROMPT_MODES = ('compact', 'full')
+
+CHANGE_POINT_MIN_SEGMENT = 5
+CHANGE_POINT_THRESHOLD = 3.0
+CHANGE_POINT_MAX = 3
+
+
+def _best_split(prices, min_segment):
+    """Index and score of the strongest mean shift in `prices` (CUSUM-style)."""
+    n = len(prices)
+    if n < 2 * min_segment:
+        return None, 0.0
+    cumsum = np.cumsum(prices)
+    k = np.arange(min_segment, n - min_segment + 1)
+    left_mean = cumsum[k - 1] / k
+    right_mean = (cumsum[-1] - cumsum[k - 1]) / (n - k)
+    std = prices.std()
+    if std == 0:
+        return None, 0.0
+    scores = np.abs(right_mean - left_mean) / std * np.sqrt(k * (n - k) / n)
+    best = int(np.argmax(scores))
+    return int(k[best]), float(scores[best])
+
+
+def detect_change_points(prices, min_segment=CHANGE_POINT_MIN_SEGMENT,
+                         threshold=CHANGE_POINT_THRESHOLD, max_points=CHANGE_POINT_MAX):
+    """Binary segmentation on mean shifts; returns sorted split indices."""
+    points = []
+    segments = [(0, len(prices))]
+    while segments and len(points) < max_points:
+        candidates = []
+        for start, end in segments:
+            split, score = _best_split(prices[start:end], min_segment)
+            if split is not None and score >= threshold:
+                candidates.append((score, start + split, start, end))
+        if not candidates:
+            break
+        score, split, start, end = max(candidates)
+        points.append(split)
+        segments.remove((start, end))
+        segments.extend([(start, split), (split, end)])
+    return sorted(points)
+
+
+def describe_price_series(dates, prices):
+    """
+    Compact descriptor of a price window: start/end, min/max with dates,
+    linear slope, daily volatility, weekly means and mean-shift change points.
+    Returns None for an empty window.
+    """
+    dates = pd.DatetimeIndex(dates)
+    prices = np.asarray(prices, dtype=np.float64)
+    if len(prices) == 0:
+        return None
+
+    days = ((dates - dates[0]) / pd.Timedelta(days=1)).to_numpy(dtype=np.float64)
+    slope = float(np.polyfit(days, prices, 1)[0]) if len(prices) > 1 and days[-1] > 0 else 0.0
+    returns = np.diff(prices) / prices[:-1] if len(prices) > 1 else np.zeros(0)
+
+    weeks = (days // 7).astype(np.int64)
+    week_counts = np.bincount(weeks)
+    week_sums = np.bincount(weeks, weights=prices)
+    has_data = week_counts > 0
+    weekly_means = week_sums[has_data] / week_counts[has_data]
+
+    i_min, i_max = int(np.argmin(prices)), int(np.argmax(prices))
+    change_points = [
+        {
+            "date": dates[i].strftime("%Y-%m-%d"),
+            "mean_before": float(prices[:i].mean()),
+            "mean_after": float(prices[i:].mean()),
+        }
+        for i in detect_change_points(prices)
+    ]
+
+    return {
+        "points": len(prices),
+        "start": {"date": dates[0].strftime("%Y-%m-%d"), "price": float(prices[0])},
+        "end": {"date": dates[-1].strftime("%Y-%m-%d"), "price": float(prices[-1])},
+        "change_pct": float((prices[-1] - prices[0]) / prices[0] * 100) if prices[0] else 0.0,
+        "min": {"date": dates[i_min].strftime("%Y-%m-%d"), "price": float(prices[i_min])},
+        "max": {"date": dates[i_max].strftime("%Y-%m-%d"), "price": float(prices[i_max])},
+        "slope_per_day": slope,
+        "slope_pct_per_day": slope / prices.mean() * 100 if prices.mean() else 0.0,
+        "volatility_pct": float(returns.std() * 100) if len(returns) else 0.0,
+        "cv_pct": float(prices.std() / prices.mean() * 100) if prices.mean() else 0.0,
+        "weekly_means": weekly_means.tolist(),
+        "change_points": change_points,
+    }
+
+
+def format_price_descriptor(descriptor):
+    """Prompt text for a descriptor from describe_price_series."""
+    if descriptor is None:
+        return "Tidak ada data harga pada periode ini."
+
+    start, end, low, high = descriptor["start"], descriptor["end"], descriptor["min"], descriptor["max"]
+    lines = [
+        f"Awal {start['date']}: {start['price']:,.0f}; Akhir {end['date']}: {end['price']:,.0f} ({descriptor['change_pct']:+.1f}%)",
+        f"Terendah {low['price']:,.0f} ({low['date']}); Tertinggi {high['price']:,.0f} ({high['date']})",
+        f"Kemiringan tren: {descriptor['slope_per_day']:+,.1f}/hari ({descriptor['slope_pct_per_day']:+.2f}%/hari)",
+        f"Volatilitas harian: {descriptor['volatility_pct']:.2f}%; koefisien variasi: {descriptor['cv_pct']:.2f}%",
+        "Rata-rata mingguan: " + ", ".join(f"{mean:,.0f}" for mean in descriptor["weekly_means"]),
+    ]
+    if descriptor["change_points"]:
+        lines.append("Titik perubahan: " + "; ".join(
+            f"{cp['date']} ({cp['mean_before']:,.0f} -> {cp['mean_after']:,.0f})" for cp in descriptor["change_points"]
+        ))
+    else:
+        lines.append("Titik perubahan: tidak ada")
+    return "\n      ".join(f"- {line}" for line in lines)
+
+
+def price_prompt_context(historical_prices, dates, prices, mode=PRICE_PROMPT_MODE):
+    """
+    Returns (history_text, trend_reference) to interpolate into the market
+    analysis prompts: the compact descriptor by default, or the raw list twice
+    as before when mode is 'full'.
+    """
+    if mode == 'full':
+        return historical_prices, historical_prices
+    return "\n      " + format_price_descriptor(describe_price_series(dates, prices)), "pada ringkasan historis di atas"
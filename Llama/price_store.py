@@ -0,0 +1,87 @@
+import os
+import threading
+import pandas as pd
+
+DATASET_DIR = os.path.join(os.path.dirname(__file__), 'dataset')
+NATIONAL_PRICES_CSV = os.path.join(DATASET_DIR, 'sp2kp_90days_1Agustus2025_national_history.csv')
+KOTKAB_PRICES_CSV = os.path.join(DATASET_DIR, 'historical_harga_kotkab_90days_4Agustus.csv')
+
+
+class PriceStore:
+    """
+    In-memory price history loaded once from a CSV, dates parsed once and rows
+    pre-sorted and grouped by key. The file is re-read when its mtime changes.
+    """
+
+    def __init__(self, path, date_col, group_cols):
+        self.path = path
+        self.date_col = date_col
+        self.group_cols = list(group_cols)
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._columns = []
+        self._groups = {}
+
+    def _load(self):
+        df = pd.read_csv(self.path)
+        df[self.date_col] = pd.to_datetime(df[self.date_col])
+        df = df.sort_values(self.date_col, kind='mergesort')
+
+        groups = {}
+        for key, group in df.groupby(self.group_cols, sort=False):
+            if len(self.group_cols) == 1 and isinstance(key, tuple):
+                key = key[0]
+            group = group.reset_index(drop=True)
+            groups[key] = (group, pd.DatetimeIndex(group[self.date_col]))
+        self._columns = list(df.columns)
+        self._groups = groups
+
+    def _refresh(self):
+        mtime = os.path.getmtime(self.path)
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._load()
+                    self._mtime = mtime
+
+    def keys(self):
+        self._refresh()
+        return list(self._groups)
+
+    def window(self, key, days=None):
+        """Rows for `key` within `days` of its latest date, sorted by date."""
+        self._refresh()
+        entry = self._groups.get(key)
+        if entry is None:
+            return pd.DataFrame(columns=self._columns)
+
+        group, dates = entry
+        if days is None:
+            return group
+        min_date = dates[-1] - pd.Timedelta(days=days)
+        start = dates.searchsorted(min_date, side='left')
+        return group.iloc[start:]
+
+
+# Internal cache
+_national_prices = None
+_kotkab_prices = None
+_init_lock = threading.Lock()
+
+
+def get_national_price_store():
+    global _national_prices
+    if _national_prices is None:
+        with _init_lock:
+            if _national_prices is None:
+                _national_prices = PriceStore(NATIONAL_PRICES_CSV, 'tanggal_data', ['variant_nama'])
+    return _national_prices
+
+
+def get_kotkab_price_store():
+    global _kotkab_prices
+    if _kotkab_prices is None:
+        with _init_lock:
+            if _kotkab_prices is None:
+                _kotkab_prices = PriceStore(KOTKAB_PRICES_CSV, 'date', ['variant_nama', 'nama_kab_kota'])
+    return _kotkab_prices
@@ -0,0 +1,337 @@
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from flask import g, request
+
+# Admin routes are disabled (404) unless a token is configured
+PROFILER_TOKEN = os.getenv('PROFILER_TOKEN', '')
+PROFILER_DIR = os.getenv('PROFILER_DIR', os.path.join(os.path.dirname(__file__), '.profiles'))
+PROFILER_INTERVAL = float(os.getenv('PROFILER_INTERVAL', '0.01'))
+# Upper bound on the sampler's share of wall time; the interval stretches to stay under it
+PROFILER_MAX_OVERHEAD = float(os.getenv('PROFILER_MAX_OVERHEAD', '0.02'))
+PROFILER_MAX_DURATION = float(os.getenv('PROFILER_MAX_DURATION', '600'))
+PROFILER_MAX_STACKS = int(os.getenv('PROFILER_MAX_STACKS', '5000'))
+PROFILER_MAX_DEPTH = int(os.getenv('PROFILER_MAX_DEPTH', '96'))
+
+CONTROL_FILE = 'control.json'
+# Seconds between a worker's checks of the control file, and between flushes of its stacks
+CONTROL_CHECK_INTERVAL = 1.0
+FLUSH_INTERVAL = 5.0
+
+_APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def check_token(token):
+    return bool(PROFILER_TOKEN) and hmac.compare_digest(token or '', PROFILER_TOKEN)
+
+
+_labels = {}
+
+
+def frame_label(code):
+    label = _labels.get(code)
+    if label is None:
+        path = code.co_filename
+        if path.startswith(_APP_ROOT):
+            path = os.path.relpath(path, _APP_ROOT)
+        else:
+            path = '/'.join(path.split(os.sep)[-2:])
+        label = _labels[code] = f"{code.co_name} ({path}:{code.co_firstlineno})"
+    return label
+
+
+def collapse(frame, max_depth=PROFILER_MAX_DEPTH):
+    """Stack of `frame` as 'root;...;leaf', the collapsed-stack format flamegraph tools read."""
+    labels = []
+    while frame is not None and len(labels) < max_depth:
+        labels.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for a fraction of requests, per endpoint.
+
+    Sessions are controlled through PROFILER_DIR, shared by every worker on
+    the host: `start` and `stop` write control.json. Each worker reads it at
+    most once a second, when a request begins and from its sampler loop, so
+    a stop also reaches workers that get no more requests. While a session
+    is on, a request is picked with probability `fraction` and its thread
+    registered; a daemon thread then reads the registered threads' stacks
+    from sys._current_frames() every `interval` seconds and counts them per
+    endpoint. Each worker flushes its counts to <session>-<pid>.collapsed
+    every few seconds and when its sampler stops, and `collapsed` merges the
+    files of a session: all stacks are in within about a second of `stop`.
+
+    Overhead: unpicked requests pay one random() call. A sample of one
+    thread with a ~40-frame Flask/pandas stack takes ~0.15 ms holding the
+    GIL, so the default 10 ms interval costs ~1.5% per profiled thread; the
+    sampler stretches its interval to keep its share of wall time under
+    PROFILER_MAX_OVERHEAD whatever the number of threads. At most PROFILER_MAX_STACKS distinct stacks are kept per
+    endpoint; further new stacks are counted under '[truncated]'.
+
+    Threads are identified by thread id, so this profiles sync and gthread
+    workers; gevent workers run every request on one thread and are not
+    supported.
+    """
+
+    def __init__(self, directory=PROFILER_DIR, interval=PROFILER_INTERVAL, max_overhead=PROFILER_MAX_OVERHEAD):
+        self.directory = directory
+        self.default_interval = interval
+        self.max_overhead = max_overhead
+        self._lock = threading.Lock()
+        self._session = None
+        self._control_checked_at = 0.0
+        self._control_version = None
+        self._threads = {}
+        self._counts = {}
+        self._sampler = None
+        self._wake = threading.Event()
+        self._samples = 0
+        self._sampling_seconds = 0.0
+        self._flushed_at = 0.0
+
+    # Control (any worker)
+
+    def start(self, fraction=1.0, duration=60.0, interval=None):
+        fraction = min(max(float(fraction), 0.0), 1.0)
+        duration = min(max(float(duration), 0.0), PROFILER_MAX_DURATION)
+        interval = max(float(interval or self.default_interval), 0.001)
+        now = time.time()
+        session = {
+            'id': f"{time.strftime('%Y%m%dT%H%M%S', time.localtime(now))}-{uuid.uuid4().hex[:6]}",
+            'fraction': fraction,
+            'interval': interval,
+            'started_at': now,
+            'until': now + duration,
+        }
+        self._write_control(session)
+        return session
+
+    def stop(self):
+        session = self._read_control()
+        if session is not None:
+            session['until'] = min(session['until'], time.time())
+            self._write_control(session)
+        return session
+
+    def _write_control(self, session):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, CONTROL_FILE)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(session, f)
+        os.replace(tmp_path, path)
+        # Apply it in this worker right away, waking the sampler if it is asleep
+        self._control_checked_at = 0.0
+        self._wake.set()
+
+    def _read_control(self):
+        try:
+            with open(os.path.join(self.directory, CONTROL_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    # Request hooks
+
+    def begin_request(self, endpoint):
+        session = self._current_session()
+        if session is None or random.random() >= session['fraction']:
+            return False
+        self._threads[threading.get_ident()] = endpoint
+        self._ensure_sampler()
+        return True
+
+    def end_request(self):
+        self._threads.pop(threading.get_ident(), None)
+
+    def _current_session(self):
+        self._check_control()
+        session = self._session
+        if session is None or time.time() >= session['until']:
+            return None
+        return session
+
+    def _check_control(self):
+        now = time.time()
+        if now - self._control_checked_at >= CONTROL_CHECK_INTERVAL:
+            self._control_checked_at = now
+            self._refresh_session()
+
+    def _refresh_session(self):
+        path = os.path.join(self.directory, CONTROL_FILE)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self._session = None
+            return
+        # os.replace gives every write a new inode, whatever the mtime resolution
+        version = (stat.st_ino, stat.st_mtime_ns)
+        if version == self._control_version:
+            return
+        session = self._read_control()
+        previous = self._session
+        if session is not None and previous is not None and session['id'] != previous['id']:
+            # Keep what the previous session collected before starting over
+            self._flush(previous)
+        with self._lock:
+            self._control_version = version
+            if session is not None and (previous is None or session['id'] != previous['id']):
+                self._counts = {}
+                self._samples = 0
+                self._sampling_seconds = 0.0
+            self._session = session
+
+    # Sampling (per worker)
+
+    def _ensure_sampler(self):
+        if self._sampler is not None and self._sampler.is_alive():
+            return
+        with self._lock:
+            if self._sampler is None or not self._sampler.is_alive():
+                self._sampler = threading.Thread(target=self._run, name='profiler-sampler', daemon=True)
+                self._sampler.start()
+
+    def _run(self):
+        me = threading.get_ident()
+        session = None
+        while True:
+            # Re-read control.json here too, so a stop reaches workers without requests
+            self._check_control()
+            if self._session is None or time.time() >= self._session['until']:
+                break
+            session = self._session
+            started = time.perf_counter()
+            self._sample(me)
+            cost = time.perf_counter() - started
+            self._sampling_seconds += cost
+            if time.time() - self._flushed_at >= FLUSH_INTERVAL:
+                self._flush(session)
+            # Sleep long enough that cost / (cost + sleep) stays under max_overhead
+            self._wake.wait(max(session['interval'], cost * (1 / self.max_overhead - 1)))
+            self._wake.clear()
+        self._threads.clear()
+        if session is not None:
+            self._flush(session)
+
+    def _sample(self, me):
+        threads = list(self._threads.items())
+        if not threads:
+            return
+        frames = sys._current_frames()
+        with self._lock:
+            for ident, endpoint in threads:
+                frame = frames.get(ident)
+                if frame is None or ident == me:
+                    continue
+                stack = collapse(frame)
+                counts = self._counts.setdefault(endpoint, Counter())
+                if stack not in counts and len(counts) >= PROFILER_MAX_STACKS:
+                    stack = '[truncated]'
+                counts[stack] += 1
+            self._samples += 1
+
+    def _flush(self, session):
+        with self._lock:
+            lines = [
+                f"{endpoint};{stack} {count}"
+                for endpoint, counts in self._counts.items()
+                for stack, count in counts.items()
+            ]
+            self._flushed_at = time.time()
+        if not lines:
+            return
+        path = os.path.join(self.directory, f"{session['id']}-{os.getpid()}.collapsed")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, path)
+
+    # Results (any worker)
+
+    def collapsed(self, session_id=None, endpoint=None):
+        """
+        Merged collapsed stacks of a session (the latest by default) from every
+        worker, one 'endpoint;frame;...;frame count' line per stack.
+        """
+        if session_id is None:
+            session = self._read_control()
+            if session is None:
+                return ''
+            session_id = session['id']
+        totals = Counter()
+        prefix = f"{session_id}-"
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return ''
+        for name in names:
+            if not (name.startswith(prefix) and name.endswith('.collapsed')):
+                continue
+            with open(os.path.join(self.directory, name)) as f:
+                for line in f:
+                    stack, _, count = line.rstrip('\n').rpartition(' ')
+                    if endpoint is None or stack.split(';', 1)[0] == endpoint:
+                        totals[stack] += int(count)
+        return ''.join(f"{stack} {count}\n" for stack, count in totals.most_common())
+
+    def stats(self):
+        session = self._read_control()
+        with self._lock:
+            endpoints = {endpoint: sum(counts.values()) for endpoint, counts in self._counts.items()}
+            samples, sampling_seconds = self._samples, self._sampling_seconds
+        return {
+            'session': session,
+            'active': session is not None and time.time() < session['until'],
+            # Stats of the worker that answered; stacks are merged across workers
+            'worker': {
+                'pid': os.getpid(),
+                'profiled_threads': len(self._threads),
+                'samples': samples,
+                'sampling_seconds': sampling_seconds,
+                'stack_samples': endpoints,
+            },
+        }
+
+
+# Internal cache
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler():
+    global _profiler
+    if _profiler is None:
+        with _profiler_lock:
+            if _profiler is None:
+                _profiler = SamplingProfiler()
+    return _profiler
+
+
+def _before_request():
+    endpoint = request.endpoint or 'none'
+    if endpoint.startswith('profiler_bp.'):
+        return
+    if get_profiler().begin_request(endpoint):
+        g.profiled = True
+
+
+def _teardown_request(exc):
+    if g.pop('profiled', False):
+        get_profiler().end_request()
+
+
+def init_profiler(app):
+    """Let admin-started profiling sessions sample `app`'s requests (needs PROFILER_TOKEN)."""
+    if PROFILER_TOKEN:
+        app.before_request(_before_request)
+        app.teardown_request(_teardown_request)
@@ -13,8 +13,19 @@ from blueprints.crop_rec import crop_rec_bp
 from blueprints.crop_yield import crop_yield_bp
 from blueprints.market_price_new import market_prices_new_bp
 from blueprints.market_price_region_new import market_prices_region_new_bp
+from blueprints.llm_cache_stats import llm_cache_stats_bp
+from blueprints.jobs import jobs_bp
+from blueprints.llm_gateway_stats import llm_gateway_stats_bp
+from blueprints.model_registry import model_registry_bp
+from blueprints.metrics import metrics_bp
+from blueprints.profiler import profiler_bp
+from metrics import init_metrics
+from profiler import init_profiler
 
 def load_routes(app: Flask):
+    init_metrics(app)
+    init_profiler(app)
+
     app.register_blueprint(chat_bp)
     app.register_blueprint(classify_plant_disease_bp)
     app.register_blueprint(market_prices_bp)
@@ -29,4 +40,10 @@ def load_routes(app: Flask):
     app.register_blueprint(crop_yield_bp)
 
     app.register_blueprint(market_prices_new_bp)
-    app.register_blueprint(market_prices_region_new_bp)
\ No newline at end of file
+    app.register_blueprint(market_prices_region_new_bp)
+    app.register_blueprint(llm_cache_stats_bp)
+    app.register_blueprint(jobs_bp)
+    app.register_blueprint(llm_gateway_stats_bp)
+    app.register_blueprint(model_registry_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(profiler_bp)
\ No newline at end of file
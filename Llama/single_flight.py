@@ -0,0 +1,94 @@
+import hashlib
+import json
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the
+    function, the others block until it finishes and share its result (or
+    exception). Nothing is kept once the call completes.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'executions': 0, 'shared': 0}
+
+    def do(self, key, fn):
+        with self._lock:
+            self.stats['calls'] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats['executions'] += 1
+            else:
+                self.stats['shared'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+def fingerprint(payload):
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class _Completions:
+    def __init__(self, completions, flight):
+        self._completions = completions
+        self._flight = flight
+
+    def create(self, **kwargs):
+        if kwargs.get('stream'):
+            return self._completions.create(**kwargs)
+        return self._flight.do(fingerprint(kwargs), lambda: self._completions.create(**kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._completions, name)
+
+
+class _Chat:
+    def __init__(self, chat, flight):
+        self._chat = chat
+        self.completions = _Completions(chat.completions, flight)
+
+    def __getattr__(self, name):
+        return getattr(self._chat, name)
+
+
+class SingleFlightClient:
+    """
+    Wraps a Groq client so identical concurrent chat.completions.create calls
+    (same model, messages and sampling parameters) share one upstream request.
+    """
+
+    def __init__(self, client, flight=None):
+        self._client = client
+        self.flight = flight or SingleFlight()
+        self.chat = _Chat(client.chat, self.flight)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
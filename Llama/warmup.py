@@ -0,0 +1,60 @@
+import time
+
+import numpy as np
+
+from models import get_crop_model, get_crop_preprocessor, get_fertilizer_model
+from price_store import get_kotkab_price_store, get_national_price_store
+
+# One plausible input per model, in the feature order the routes build
+FERT_WARMUP_SAMPLE = [[30, 60, 40, 2, 6, 20, 5, 10]]  # see FERT_FEATURE_FIELDS
+CROP_WARMUP_SAMPLE = [[90, 42, 43, 20.9, 82.0, 6.5, 202.9]]  # N, P, K, temperature, humidity, ph, rainfall
+
+
+def warm_fertilizer():
+    from blueprints.fert_predict import predict_fertilizer_batch
+    get_fertilizer_model()
+    predict_fertilizer_batch(np.asarray(FERT_WARMUP_SAMPLE, dtype=np.float32))
+
+
+def warm_crop():
+    get_crop_model().predict(get_crop_preprocessor().transform(np.asarray(CROP_WARMUP_SAMPLE, dtype=np.float64)))
+
+
+def warm_crop_yield():
+    from blueprints.crop_yield import get_yield_table
+    get_yield_table()
+
+
+def warm_national_prices():
+    get_national_price_store().keys()
+
+
+def warm_kotkab_prices():
+    get_kotkab_price_store().keys()
+
+
+WARMUP_STEPS = {
+    'fertilizer': warm_fertilizer,
+    'crop': warm_crop,
+    'crop_yield': warm_crop_yield,
+    'national_prices': warm_national_prices,
+    'kotkab_prices': warm_kotkab_prices,
+}
+
+
+def warm_models():
+    """
+    Load every model and dataset the routes use and run one inference through
+    each, so the first request doesn't pay for unpickling. A failing step is
+    reported rather than raised: the route it serves fails on its own anyway.
+    Returns {step: {'seconds': ...} or {'error': ...}}.
+    """
+    results = {}
+    for name, step in WARMUP_STEPS.items():
+        start = time.perf_counter()
+        try:
+            step()
+            results[name] = {'seconds': time.perf_counter() - start}
+        except Exception as e:
+            results[name] = {'error': f"{type(e).__name__}: {e}"}
+    return results
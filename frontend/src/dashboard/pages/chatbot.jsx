@@ -69,6 +69,10 @@ const ChatbotUI = () => {
 
   // useEffect(scrollToBottom, [messages, isLoading]);
   const prevMessagesCount = useRef(messages.length);
+  // Id sesi chat: backend menyimpan ringkasan riwayat lama per percakapan
+  const conversationIdRef = useRef(
+    window.crypto?.randomUUID?.() ?? `${Date.now()}-${Math.random().toString(36).slice(2)}`
+  );
   useEffect(() => {
     if (messages.length > prevMessagesCount.current) { scrollToBottom(); }
     prevMessagesCount.current = messages.length;
@@ -184,6 +188,7 @@ const ChatbotUI = () => {
         query: userQuery,
         language: language,
         history: conversationHistory, // Mengirim riwayat
+        conversation_id: conversationIdRef.current,
       });
 
       const botMessage = {
@@ -0,0 +1,103 @@
+"""
+Choropleth build time with per-feature colouring in a style_function
+(branca LinearColormap called for every polygon, what the pages did) versus
+colours precomputed with choropleth.fill_colors and read from a property.
+
+Polygons are a synthetic grid of squares with lognormal values (10% NaN),
+so the polygon count can go well past the ~500 kabupaten. Reported per
+polygon count:
+  - colour: computing the colours alone (the precomputed schemes only)
+  - build: folium map with tiles, GeoJson layer, tooltip and legend,
+    rendered to HTML (what RenderCache.get_or_render does on a miss)
+
+Run from the streamlit-map directory:
+    python -m benchmarks.bench_choropleth [repeats]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+MAP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+POLYGON_COUNTS = [500, 2000, 10000]
+COLORS = ["#ffffcc", "#18ce3d", "#03640E"]
+
+
+def grid_polygons(count, seed=0):
+    import geopandas as gpd
+    from shapely.geometry import box
+
+    # Roughly Indonesia's bounding box, 40 x 20 degrees
+    side = int(np.ceil(np.sqrt(count)))
+    width, height = 40 / side, 20 / side
+    cells = [box(95 + width * (i % side), -11 + height * (i // side),
+                 95 + width * (i % side + 1), -11 + height * (i // side + 1)) for i in range(count)]
+    values = np.random.default_rng(seed).lognormal(5, 2, count)
+    values[::10] = np.nan
+    return gpd.GeoDataFrame({"name": [f"cell {i}" for i in range(count)], "value": values},
+                            geometry=cells, crs="EPSG:4326")
+
+
+def build_map(gdf, scheme):
+    import folium
+    from branca.colormap import LinearColormap
+    from folium.features import GeoJsonTooltip
+
+    from choropleth import MISSING_COLOR, fill_colors, style_from_property
+
+    m = folium.Map(location=[-2.5, 118], zoom_start=5, tiles=None)
+    folium.TileLayer("OpenStreetMap", name="Basic Map").add_to(m)
+    if scheme == "per-feature":
+        valid = gdf["value"].dropna()
+        color_scale = LinearColormap(colors=COLORS, vmin=valid.min(), vmax=valid.max())
+        style_function = lambda feature: {
+            "fillColor": color_scale(feature["properties"]["value"]) if feature["properties"]["value"] is not None else MISSING_COLOR,
+            "color": "black",
+            "weight": 0.5,
+            "fillOpacity": 0.7,
+        }
+    else:
+        fill_color, color_scale = fill_colors(gdf["value"], COLORS, scheme=scheme)
+        gdf = gdf.assign(fill_color=fill_color)
+        style_function = style_from_property
+    folium.GeoJson(
+        gdf,
+        style_function=style_function,
+        tooltip=GeoJsonTooltip(fields=["name", "value"]),
+    ).add_to(m)
+    color_scale.add_to(m)
+    return m.get_root().render()
+
+
+def best_of(repeats, function, *args):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    sys.path.insert(0, MAP_DIR)
+    os.chdir(MAP_DIR)
+    from choropleth import SCHEME_LABELS, fill_colors
+
+    schemes = ["per-feature", *SCHEME_LABELS]
+    print(f"{'polygons':>8} {'scheme':<12} {'colour':>9} {'build':>9}")
+    for count in POLYGON_COUNTS:
+        gdf = grid_polygons(count)
+        for scheme in schemes:
+            if scheme == "per-feature":
+                colour_text = f"{'-':>9}"
+            else:
+                colour = best_of(repeats, fill_colors, gdf["value"], COLORS, scheme)
+                colour_text = f"{colour * 1000:7.1f}ms"
+            build = best_of(repeats, build_map, gdf, scheme)
+            print(f"{count:>8} {scheme:<12} {colour_text} {build * 1000:7.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+First-page load time and per-session memory of the kabupaten geometry,
+before (GeoJSON parsed by each page, cached with st.cache_data) and after
+geometry_store.py (GeoParquet, one shared frame per level per process).
+
+Reported:
+  - load: seconds and RSS growth to get the GeoDataFrame in a fresh
+    process, i.e. what the first page view of a new server pays
+  - per access: st.cache_data hands every rerun of every session an
+    unpickled copy; the pickle round trip and the copy's size are what each
+    access costs. The store returns the shared frame (no copy).
+  - to folium: size of the GeoJSON the choropleth pages send to the browser
+    at each simplification level
+
+Linux only (reads /proc/self/statm). Run from the streamlit-map directory:
+    python -m benchmarks.bench_geometry [repeats]
+"""
+import json
+import os
+import pickle
+import subprocess
+import sys
+import time
+
+MAP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = r"""
+import json, os, sys, time
+import geopandas as gpd, pyarrow.parquet  # import cost is not part of the load
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+source = sys.argv[1]
+before = rss_mb()
+start = time.perf_counter()
+if source == 'geojson':
+    gdf = gpd.read_file('data/kabupaten.geojson')
+else:
+    from geometry_store import read_kabupaten
+    gdf = read_kabupaten(source)
+seconds = time.perf_counter() - start
+print(json.dumps({'seconds': seconds, 'rss_mb': rss_mb() - before, 'features': len(gdf)}))
+"""
+
+
+def load_in_fresh_process(source):
+    out = subprocess.run([sys.executable, '-c', WORKER, source], cwd=MAP_DIR, check=True,
+                         capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def cache_data_access(gdf, repeats):
+    """Mean seconds and bytes of one st.cache_data hit (pickle round trip)."""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        payload = pickle.dumps(gdf, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.loads(payload)
+    return (time.perf_counter() - start) / repeats, len(payload)
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    sys.path.insert(0, MAP_DIR)
+    os.chdir(MAP_DIR)
+    import geopandas as gpd
+    from geometry_store import SIMPLIFY_TOLERANCES, build_store, read_kabupaten
+
+    start = time.perf_counter()
+    build_store()
+    print(f"store build: {time.perf_counter() - start:.2f}s (once, or at image build time)\n")
+
+    sources = ['geojson', *SIMPLIFY_TOLERANCES]
+    print(f"{'source':<9} {'load':>8} {'RSS +':>8} {'per access':>11} {'copy':>9} {'to folium':>10}")
+    for source in sources:
+        loads = [load_in_fresh_process(source) for _ in range(repeats)]
+        seconds = min(r['seconds'] for r in loads)
+        rss = min(r['rss_mb'] for r in loads)
+        gdf = gpd.read_file('data/kabupaten.geojson') if source == 'geojson' else read_kabupaten(source)
+        if source == 'geojson':
+            access, copy_bytes = cache_data_access(gdf, repeats)
+            access_text, copy_text = f"{access * 1000:9.1f}ms", f"{copy_bytes / 2 ** 20:7.1f}MB"
+        else:
+            access_text, copy_text = f"{'shared':>11}", f"{'-':>9}"
+        geojson_mb = len(gdf.to_json()) / 2 ** 20
+        print(f"{source:<9} {seconds * 1000:6.0f}ms {rss:6.1f}MB {access_text} {copy_text} {geojson_mb:8.1f}MB")
+
+
+if __name__ == '__main__':
+    main()
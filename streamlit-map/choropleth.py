@@ -0,0 +1,144 @@
+"""
+Vectorized fill colours for the choropleth pages.
+
+folium calls a GeoJson layer's style_function once per polygon while
+serializing, and colouring inside it goes through branca's pure-Python
+interpolation per feature. Here every polygon's colour is computed at
+once with NumPy and stored as a `fill_color` column; the layer's
+style_function only reads that property (see `style_from_property`).
+
+Schemes:
+  linear    continuous gradient from vmin to vmax (what branca's
+            LinearColormap does, same bytes)
+  quantile  CLASS_COUNT classes with equal numbers of polygons
+  jenks     CLASS_COUNT classes by Fisher-Jenks natural breaks
+
+The pages default to MAP_COLOR_SCHEME and offer the others in the sidebar.
+"""
+import os
+
+import numpy as np
+from branca.colormap import LinearColormap, StepColormap
+
+SCHEME_LABELS = {
+    "linear": "Linear",
+    "quantile": "Kuantil",
+    "jenks": "Jenks (natural breaks)",
+}
+DEFAULT_SCHEME = os.getenv("MAP_COLOR_SCHEME", "linear")
+CLASS_COUNT = 5
+MISSING_COLOR = "#d3d3d3"
+# Jenks is O(k n^2); larger inputs are reduced to this many quantiles first
+JENKS_MAX_VALUES = 1000
+
+
+def hex_to_rgb(colors):
+    return np.array([[int(c.lstrip("#")[i:i + 2], 16) / 255 for i in (0, 2, 4)] for c in colors])
+
+
+_HEX_BYTES = np.array([f"{i:02x}" for i in range(256)])
+
+
+def rgb_to_hex(rgb):
+    # Same rounding as branca (int(u * 255.9999))
+    channels = (np.asarray(rgb) * 255.9999).astype(np.uint8)
+    hex_channels = _HEX_BYTES[channels]
+    joined = np.char.add(np.char.add(np.char.add("#", hex_channels[:, 0]), hex_channels[:, 1]), hex_channels[:, 2])
+    return joined.astype(object)
+
+
+def gradient(colors, positions):
+    """Colours at `positions` in [0, 1] along evenly spaced `colors`."""
+    stops = np.linspace(0.0, 1.0, len(colors))
+    rgb = hex_to_rgb(colors)
+    positions = np.clip(positions, 0.0, 1.0)
+    return np.column_stack([np.interp(positions, stops, rgb[:, channel]) for channel in range(3)])
+
+
+def jenks_breaks(values, k):
+    """Fisher-Jenks natural breaks: k + 1 bounds minimizing within-class variance."""
+    values = np.sort(values)
+    if len(values) > JENKS_MAX_VALUES:
+        values = np.quantile(values, np.linspace(0, 1, JENKS_MAX_VALUES))
+    n = len(values)
+    k = min(k, len(np.unique(values)))
+    if k < 2:
+        return np.array([values[0], values[-1]])
+
+    s1 = np.concatenate([[0.0], np.cumsum(values)])
+    s2 = np.concatenate([[0.0], np.cumsum(values ** 2)])
+    # cost[i, j]: sum of squared deviations of values[i:j + 1] (inf for i > j)
+    starts, ends = np.arange(n)[:, None], np.arange(n)[None, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        totals = s1[ends + 1] - s1[starts]
+        cost = (s2[ends + 1] - s2[starts]) - totals ** 2 / (ends + 1 - starts)
+    cost[starts > ends] = np.inf
+
+    # best[c, j]: lowest cost of splitting values[:j + 1] into c + 1 classes,
+    # the last of them starting at start_of_last[c, j]
+    best = np.empty((k, n))
+    start_of_last = np.zeros((k, n), dtype=np.int64)
+    best[0] = cost[0]
+    for c in range(1, k):
+        # Last class starts at i >= c, after c classes covering values[:i]
+        total = best[c - 1, :-1, None] + cost[1:]
+        total[:c - 1] = np.inf
+        start_of_last[c] = np.argmin(total, axis=0) + 1
+        best[c] = total[start_of_last[c] - 1, np.arange(n)]
+
+    breaks = [values[-1]]
+    j = n - 1
+    for c in range(k - 1, 0, -1):
+        start = start_of_last[c, j]
+        breaks.append(values[start - 1])
+        j = start - 1
+    breaks.append(values[0])
+    return np.array(breaks[::-1])
+
+
+def class_breaks(values, scheme, k=CLASS_COUNT):
+    if scheme == "quantile":
+        return np.unique(np.quantile(values, np.linspace(0, 1, k + 1)))
+    if scheme == "jenks":
+        return np.unique(jenks_breaks(values, k))
+    raise ValueError(f"Unknown scheme {scheme!r}; expected one of {', '.join(SCHEME_LABELS)}")
+
+
+def fill_colors(values, colors, scheme="linear", k=CLASS_COUNT, caption=""):
+    """
+    Fill colour per value (MISSING_COLOR for NaN) and the matching legend.
+    Returns (array of '#rrggbb', branca colormap).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    result = np.full(len(values), MISSING_COLOR, dtype=object)
+    if valid.any():
+        vmin, vmax = values[valid].min(), values[valid].max()
+    else:
+        vmin, vmax = 0.0, 1.0
+
+    if scheme == "linear" or not valid.any() or vmin == vmax:
+        span = (vmax - vmin) or 1.0
+        result[valid] = rgb_to_hex(gradient(colors, (values[valid] - vmin) / span))
+        legend = LinearColormap(colors=colors, vmin=vmin, vmax=vmax, caption=caption)
+        return result, legend
+
+    breaks = class_breaks(values[valid], scheme, k)
+    classes = len(breaks) - 1
+    # One colour per class, sampled evenly along the gradient
+    class_colors = rgb_to_hex(gradient(colors, np.linspace(0, 1, classes)))
+    # Class i holds breaks[i] < value <= breaks[i + 1]; the minimum goes to class 0
+    index = np.clip(np.searchsorted(breaks, values[valid], side="left") - 1, 0, classes - 1)
+    result[valid] = class_colors[index]
+    legend = StepColormap(colors=list(class_colors), index=list(breaks), vmin=vmin, vmax=vmax, caption=caption)
+    return result, legend
+
+
+def style_from_property(feature):
+    """GeoJson style_function reading the precomputed `fill_color` property."""
+    return {
+        "fillColor": feature["properties"]["fill_color"],
+        "color": "black",
+        "weight": 0.5,
+        "fillOpacity": 0.7,
+    }
@@ -0,0 +1,140 @@
+"""
+BDSP harvest data (luas panen, produksi, produktivitas) as one typed,
+long-format table with a precomputed map slice per (commodity, year).
+
+The three wide CSVs (one column per year) are melted into
+
+    Provinsi, Kabupaten, commodity   category
+    year                             int16
+    luas_panen, produksi, produktivitas   float32
+    feature_id                       Int32 (see crosswalk.py)
+
+and written to data/crop_cube.parquet, rebuilt when a CSV or the crosswalk
+changes. On load, the values are summed per (commodity, year, feature_id)
+once, so a map slice is a dict lookup instead of a string filter and a
+groupby per render. Rows sharing a name in the export (a kabupaten and the
+kota of the same name lose their prefix) are summed, as the map did before.
+
+    python crop_cube.py   # rebuild and print the memory comparison
+"""
+import os
+import threading
+
+import pandas as pd
+
+from crosswalk import BDSP_FILES, CROSSWALK_PATH, SOURCE_FILES, get_crosswalk
+from geometry_store import files_version
+
+CUBE_PATH = os.getenv("CROP_CUBE", "data/crop_cube.parquet")
+METRICS = list(BDSP_FILES)
+
+
+def melt_bdsp(path, metric):
+    wide = pd.read_csv(path)
+    years = [column for column in wide.columns if column.isdigit()]
+    long = wide.melt(id_vars=["Provinsi", "Kabupaten", "Komoditas"], value_vars=years,
+                     var_name="year", value_name=metric)
+    long["year"] = long["year"].astype("int16")
+    long[metric] = long[metric].astype("float32")
+    keys = ["Provinsi", "Kabupaten", "Komoditas", "year"]
+    return long.groupby(keys, sort=False, as_index=False)[metric].sum()
+
+
+def build_cube(crosswalk):
+    keys = ["Provinsi", "Kabupaten", "Komoditas", "year"]
+    table = None
+    for metric, path in BDSP_FILES.items():
+        long = melt_bdsp(path, metric)
+        table = long if table is None else table.merge(long, on=keys, how="outer")
+    table = table.rename(columns={"Komoditas": "commodity"})
+    table = table.merge(crosswalk[["Provinsi", "Kabupaten", "feature_id"]], on=["Provinsi", "Kabupaten"], how="left")
+    for column in ("Provinsi", "Kabupaten", "commodity"):
+        table[column] = table[column].astype("category")
+    table["feature_id"] = table["feature_id"].astype("Int32")
+    return table.sort_values(["commodity", "year", "feature_id"], ignore_index=True)
+
+
+class CropCube:
+    """
+    The long table plus `slice(commodity, year)`: a DataFrame indexed by
+    feature_id with one column per metric. Slices are shared; don't modify
+    them.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        matched = table.dropna(subset=["feature_id"])
+        sums = matched.groupby(["commodity", "year", "feature_id"], observed=True)[METRICS].sum(min_count=1)
+        self._slices = {
+            (commodity, int(year)): frame.droplevel(["commodity", "year"])
+            for (commodity, year), frame in sums.groupby(level=["commodity", "year"], observed=True)
+        }
+        self.commodities = sorted(table["commodity"].cat.categories)
+        self.years = sorted(int(year) for year in table["year"].unique())
+
+    def slice(self, commodity, year):
+        return self._slices.get((commodity, int(year)))
+
+    def commodities_with_data(self, year, metric):
+        return sorted(
+            commodity for (commodity, slice_year), frame in self._slices.items()
+            if slice_year == int(year) and frame[metric].notna().any()
+        )
+
+    def memory_bytes(self):
+        slices = sum(frame.memory_usage(deep=True).sum() for frame in self._slices.values())
+        return int(self.table.memory_usage(deep=True).sum() + slices)
+
+
+def write_cube(cube_path=CUBE_PATH):
+    table = build_cube(get_crosswalk())
+    tmp_path = f"{cube_path}.{os.getpid()}.tmp"
+    table.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, cube_path)
+    return table
+
+
+def _cube_is_stale(cube_path):
+    if not os.path.exists(cube_path):
+        return True
+    built_at = os.path.getmtime(cube_path)
+    return any(os.path.getmtime(path) > built_at for path in [CROSSWALK_PATH, *BDSP_FILES.values()])
+
+
+def read_cube(cube_path=CUBE_PATH):
+    # Brings the crosswalk up to date first, so its mtime is current
+    get_crosswalk()
+    if _cube_is_stale(cube_path):
+        return CropCube(write_cube(cube_path))
+    return CropCube(pd.read_parquet(cube_path))
+
+
+# Internal cache
+_cube = None
+_cube_lock = threading.Lock()
+
+
+def get_crop_cube():
+    """The CropCube, shared per process and reloaded when a source file changes."""
+    global _cube
+    version = files_version(SOURCE_FILES)
+    if _cube is None or _cube[0] != version:
+        with _cube_lock:
+            if _cube is None or _cube[0] != version:
+                _cube = (version, read_cube())
+    return _cube[1]
+
+
+def raw_memory_bytes():
+    """Deep memory of the three wide DataFrames the page used to keep."""
+    return int(sum(pd.read_csv(path).memory_usage(deep=True).sum() for path in BDSP_FILES.values()))
+
+
+if __name__ == "__main__":
+    table = write_cube()
+    cube = CropCube(table)
+    print(f"{len(table):,} rows -> {CUBE_PATH} ({os.path.getsize(CUBE_PATH) / 2 ** 10:.0f} KB)")
+    print(f"raw DataFrames {raw_memory_bytes() / 2 ** 20:6.2f} MB")
+    print(f"cube + slices  {cube.memory_bytes() / 2 ** 20:6.2f} MB ({len(cube._slices)} slices)")
+    unmatched = table.loc[table["feature_id"].isna(), ["Provinsi", "Kabupaten"]].drop_duplicates()
+    print(f"{len(unmatched)} (Provinsi, Kabupaten) pairs without a feature (see crosswalk report)")
@@ -0,0 +1,198 @@
+"""
+Crosswalk from the BDSP (Provinsi, Kabupaten) pairs to kabupaten feature
+ids of the geometry store (geometry_store.py).
+
+The BDSP exports carry unreliable names: the Provinsi column is often just
+the first word of the kabupaten ("Sukabumi" for Kota Sukabumi), spellings
+differ from the GeoJSON ("Musi Banyuasin" / "MUSI BANYU ASIN") and some
+regions were renamed. Resolving that on every map render is wasteful, so
+the pairs are matched once, in order of confidence:
+
+  exact         province and kabupaten keys both match
+  name          the kabupaten key matches exactly one feature
+  name_no_kota  same, ignoring a KOTA prefix on both sides
+  fuzzy         closest remaining feature name (difflib ratio >= FUZZY_CUTOFF),
+                within the province when the province is known
+
+The result is written to data/kabupaten_crosswalk.csv with the method and
+score per pair, plus a plain-text match-quality report, and rebuilt when
+the BDSP files or the geometry store change. Renders then join on the
+integer feature_id. To rebuild by hand and print the report:
+
+    python crosswalk.py
+"""
+import difflib
+import os
+import threading
+
+import pandas as pd
+
+from geometry_store import GEOJSON_PATH, STORE_PATH, files_version, get_kabupaten, kabupaten_key, normalize_name
+
+BDSP_FILES = {
+    "luas_panen": "data/bdsp_luaspanen_tanamanpangan_kabupaten_2020_2025.csv",
+    "produksi": "data/bdsp_produksi_tanamanpangan_kabupaten_2020_2025.csv",
+    "produktivitas": "data/bdsp_produktivitas_tanamanpangan_kabupaten_2020_2025.csv",
+}
+# Raw inputs the crosswalk (and everything built on it) derives from
+SOURCE_FILES = [GEOJSON_PATH, *BDSP_FILES.values()]
+CROSSWALK_PATH = os.getenv("KABUPATEN_CROSSWALK", "data/kabupaten_crosswalk.csv")
+REPORT_PATH = os.getenv("KABUPATEN_CROSSWALK_REPORT", "data/kabupaten_crosswalk_report.txt")
+FUZZY_CUTOFF = 0.85
+
+# Kabupaten names in the dataset -> names in the GeoJSON
+SPECIAL_CASES = {
+    'MUSI BANYUASIN': 'MUSI BANYU ASIN',
+    'MAHAKAM ULU': 'MAHAKAM HULU',
+    'FAKFAK': 'FAK-FAK',
+    'TOBA': 'TOBA SAMOSIR',
+    'LUBUKLINGGAU': 'LUBUK LINGGAU',
+    'PADANGSIDIMPUAN': 'PADANG SIDIMPUAN',
+    'PAREPARE': 'PARE-PARE',
+    'MAMUJU UTARA/PASANGKAYU': 'MAMUJU UTARA',
+}
+# Provinsi values in the dataset that are really a kabupaten name
+PROVINCE_FIXES = {
+    'SUKABUMI': 'JAWA BARAT',
+}
+
+
+def without_kota(keys):
+    return keys.str.replace(r"^KOTA\s+", "", regex=True)
+
+
+def read_bdsp_pairs(paths=None):
+    """Distinct (Provinsi, Kabupaten) pairs over all BDSP files."""
+    frames = [pd.read_csv(path, usecols=["Provinsi", "Kabupaten"]) for path in (paths or BDSP_FILES.values())]
+    return pd.concat(frames).drop_duplicates().reset_index(drop=True)
+
+
+def build_crosswalk(pairs, features):
+    """
+    Match `pairs` (Provinsi, Kabupaten) to `features` (feature_id,
+    PROVINSI_KEY, KABUPATEN_KEY). Returns one row per pair with feature_id
+    (<NA> if unmatched), method and score.
+    """
+    crosswalk = pairs[["Provinsi", "Kabupaten"]].copy()
+    province = normalize_name(crosswalk["Provinsi"]).replace(PROVINCE_FIXES)
+    kabupaten = kabupaten_key(crosswalk["Kabupaten"]).replace(SPECIAL_CASES)
+    crosswalk["feature_id"] = pd.array([pd.NA] * len(crosswalk), dtype="Int32")
+    crosswalk["method"] = "unmatched"
+    crosswalk["score"] = 0.0
+
+    def resolve(mask, keys, feature_keys, method):
+        # Only keys naming exactly one feature are unambiguous
+        counts = feature_keys.value_counts()
+        unique = feature_keys[feature_keys.map(counts) == 1]
+        lookup = pd.Series(features.loc[unique.index, "feature_id"].values, index=unique.values)
+        found = keys[mask].map(lookup).dropna()
+        crosswalk.loc[found.index, "feature_id"] = found.astype("int32")
+        crosswalk.loc[found.index, "method"] = method
+        crosswalk.loc[found.index, "score"] = 1.0
+
+    def unmatched():
+        return crosswalk["feature_id"].isna()
+
+    resolve(unmatched(), province + "|" + kabupaten,
+            features["PROVINSI_KEY"] + "|" + features["KABUPATEN_KEY"], "exact")
+    resolve(unmatched(), kabupaten, features["KABUPATEN_KEY"], "name")
+    resolve(unmatched(), without_kota(kabupaten), without_kota(features["KABUPATEN_KEY"]), "name_no_kota")
+
+    known_provinces = set(features["PROVINSI_KEY"])
+    for index in crosswalk.index[unmatched()]:
+        candidates = features
+        if province[index] in known_provinces:
+            candidates = features[features["PROVINSI_KEY"] == province[index]]
+        names = dict(zip(candidates["KABUPATEN_KEY"], candidates["feature_id"]))
+        best = difflib.get_close_matches(kabupaten[index], list(names), n=1, cutoff=FUZZY_CUTOFF)
+        if best:
+            crosswalk.loc[index, "feature_id"] = names[best[0]]
+            crosswalk.loc[index, "method"] = "fuzzy"
+            crosswalk.loc[index, "score"] = round(
+                difflib.SequenceMatcher(None, kabupaten[index], best[0]).ratio(), 3
+            )
+    return crosswalk
+
+
+def match_report(crosswalk, features):
+    names = features.set_index("feature_id")
+    lines = ["Kabupaten crosswalk: BDSP (Provinsi, Kabupaten) -> GeoJSON feature", ""]
+    counts = crosswalk["method"].value_counts()
+    for method in ("exact", "name", "name_no_kota", "fuzzy", "unmatched"):
+        lines.append(f"{method:<13} {counts.get(method, 0):>5}")
+    lines.append(f"{'total':<13} {len(crosswalk):>5}")
+
+    fuzzy = crosswalk[crosswalk["method"] == "fuzzy"].sort_values("score")
+    lines += ["", f"Fuzzy matches ({len(fuzzy)}), lowest score first:"]
+    for row in fuzzy.itertuples():
+        feature = names.loc[row.feature_id]
+        lines.append(f"  {row.score:.3f}  {row.Provinsi} / {row.Kabupaten} -> {feature['prov_name']} / {feature['name']}")
+
+    missing = crosswalk[crosswalk["method"] == "unmatched"]
+    lines += ["", f"Unmatched BDSP pairs ({len(missing)}):"]
+    lines += [f"  {row.Provinsi} / {row.Kabupaten}" for row in missing.itertuples()]
+
+    shared = crosswalk.dropna(subset=["feature_id"]).groupby("feature_id").size()
+    shared = shared[shared > 1]
+    lines += ["", f"Features matched by several BDSP pairs ({len(shared)}), values are summed:"]
+    for feature_id in shared.index:
+        pairs = crosswalk[crosswalk["feature_id"] == feature_id]
+        lines.append(f"  {names.loc[feature_id, 'name']}: " + ", ".join(
+            f"{p.Provinsi} / {p.Kabupaten}" for p in pairs.itertuples()))
+
+    without_data = features[~features["feature_id"].isin(crosswalk["feature_id"].dropna())]
+    lines += ["", f"Features without BDSP data ({len(without_data)}):"]
+    lines += [f"  {row.prov_name} / {row.name}" for row in without_data.itertuples()]
+    return "\n".join(lines) + "\n"
+
+
+def write_crosswalk(crosswalk_path=CROSSWALK_PATH, report_path=REPORT_PATH):
+    features = pd.DataFrame(get_kabupaten().drop(columns="geometry"))
+    crosswalk = build_crosswalk(read_bdsp_pairs(), features)
+    report = match_report(crosswalk, features)
+    for path, write in ((crosswalk_path, lambda f: crosswalk.to_csv(f, index=False)),
+                        (report_path, lambda f: f.write(report))):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", newline="") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    return crosswalk, report
+
+
+def _crosswalk_is_stale(crosswalk_path):
+    if not os.path.exists(crosswalk_path):
+        return True
+    built_at = os.path.getmtime(crosswalk_path)
+    sources = [STORE_PATH, *BDSP_FILES.values()]
+    return any(os.path.exists(path) and os.path.getmtime(path) > built_at for path in sources)
+
+
+def read_crosswalk(crosswalk_path=CROSSWALK_PATH):
+    # Brings the geometry store up to date first, so its mtime is current
+    get_kabupaten()
+    if _crosswalk_is_stale(crosswalk_path):
+        return write_crosswalk(crosswalk_path)[0]
+    return pd.read_csv(crosswalk_path, dtype={"feature_id": "Int32"})
+
+
+# Internal cache
+_crosswalk = None
+_crosswalk_lock = threading.Lock()
+
+
+def get_crosswalk():
+    """
+    Crosswalk DataFrame (Provinsi, Kabupaten, feature_id, method, score),
+    shared per process and reloaded when a source file changes.
+    """
+    global _crosswalk
+    version = files_version(SOURCE_FILES)
+    if _crosswalk is None or _crosswalk[0] != version:
+        with _crosswalk_lock:
+            if _crosswalk is None or _crosswalk[0] != version:
+                _crosswalk = (version, read_crosswalk())
+    return _crosswalk[1]
+
+
+if __name__ == "__main__":
+    print(write_crosswalk()[1], end="")
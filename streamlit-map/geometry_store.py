@@ -0,0 +1,146 @@
+"""
+Kabupaten geometry shared by every map page.
+
+data/kabupaten.geojson is converted once into a GeoParquet file (WKB
+geometry, columnar) holding the original attributes, normalized name keys
+and one geometry column per simplification level. Pages read only the
+columns they need and the result is kept once per process, so reruns and
+sessions share the same GeoDataFrame instead of each parsing the GeoJSON
+(or, with st.cache_data, unpickling a copy of it on every access).
+
+The store is rebuilt automatically when the GeoJSON is newer; to build it
+ahead of time (e.g. in the image):
+
+    python geometry_store.py
+"""
+import os
+import sys
+import threading
+
+import geopandas as gpd
+import pyarrow.parquet as pq
+import shapely
+from shapely.errors import GEOSException
+
+GEOJSON_PATH = os.getenv("KABUPATEN_GEOJSON", "data/kabupaten.geojson")
+STORE_PATH = os.getenv("KABUPATEN_STORE", "data/kabupaten.parquet")
+
+# Simplification tolerance per level, in degrees (0.001 deg ~ 110 m)
+SIMPLIFY_TOLERANCES = {
+    "full": 0.0,
+    "high": 0.001,
+    "medium": 0.005,
+    "low": 0.02,
+}
+# Level used by the choropleth pages; "medium" is indistinguishable from
+# "full" up to ~zoom 9 and a fraction of the size
+MAP_DETAIL = os.getenv("MAP_DETAIL", "medium")
+
+def normalize_name(names):
+    """Upper-case, trim and collapse whitespace in a Series of names."""
+    return names.fillna("").str.upper().str.strip().str.replace(r"\s+", " ", regex=True)
+
+
+def kabupaten_key(names):
+    """Normalized kabupaten name without the KABUPATEN / KAB. prefix (KOTA is kept)."""
+    return normalize_name(names).str.replace(r"^(KABUPATEN|KAB\.)\s+", "", regex=True)
+
+
+def files_version(paths):
+    """Modification times of `paths` (None if missing); changes whenever one of the files does."""
+    return tuple(os.path.getmtime(path) if os.path.exists(path) else None for path in paths)
+
+
+def geometry_column(level):
+    return "geometry" if level == "full" else f"geometry_{level}"
+
+
+def simplify(geometry, tolerance):
+    """
+    Simplify a polygon coverage. With GEOS >= 3.12 (shapely >= 2.1) shared
+    borders are simplified once, so neighbours stay gap- and overlap-free;
+    otherwise each polygon is simplified on its own, keeping it valid.
+    """
+    if hasattr(shapely, "coverage_simplify"):
+        try:
+            return gpd.GeoSeries(
+                shapely.coverage_simplify(geometry.values, tolerance),
+                index=geometry.index, crs=geometry.crs
+            )
+        except GEOSException:
+            # Not a clean coverage (overlapping source polygons)
+            pass
+    return geometry.simplify(tolerance, preserve_topology=True)
+
+
+def build_store(geojson_path=GEOJSON_PATH, store_path=STORE_PATH):
+    gdf = gpd.read_file(geojson_path)
+    if gdf.crs is None:
+        gdf = gdf.set_crs(epsg=4326)
+    gdf = gdf.reset_index(drop=True)
+    gdf.insert(0, "feature_id", gdf.index.astype("int32"))
+    gdf["PROVINSI_KEY"] = normalize_name(gdf["prov_name"])
+    gdf["KABUPATEN_KEY"] = kabupaten_key(gdf["name"])
+    gdf["geometry"] = gdf.geometry.make_valid()
+    for level, tolerance in SIMPLIFY_TOLERANCES.items():
+        if tolerance:
+            gdf[geometry_column(level)] = simplify(gdf.geometry, tolerance)
+
+    # Write next to the target and rename, so a reader never sees half a file
+    tmp_path = f"{store_path}.{os.getpid()}.tmp"
+    gdf.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, store_path)
+    return gdf
+
+
+def _store_is_stale(geojson_path, store_path):
+    if not os.path.exists(store_path):
+        return True
+    return os.path.exists(geojson_path) and os.path.getmtime(geojson_path) > os.path.getmtime(store_path)
+
+
+def read_kabupaten(level=MAP_DETAIL, geojson_path=GEOJSON_PATH, store_path=STORE_PATH):
+    """Read one simplification level from the store, (re)building it first if needed."""
+    if level not in SIMPLIFY_TOLERANCES:
+        raise ValueError(f"Unknown level {level!r}; expected one of {', '.join(SIMPLIFY_TOLERANCES)}")
+    if _store_is_stale(geojson_path, store_path):
+        build_store(geojson_path, store_path)
+
+    column = geometry_column(level)
+    other_geometries = {geometry_column(name) for name in SIMPLIFY_TOLERANCES} - {column}
+    columns = [name for name in pq.read_schema(store_path).names if name not in other_geometries]
+    gdf = gpd.read_parquet(store_path, columns=columns)
+    if column != "geometry":
+        gdf = gdf.set_geometry(column).rename_geometry("geometry")
+    return gdf
+
+
+# Internal cache, one (source version, GeoDataFrame) per level per process
+_levels = {}
+_levels_lock = threading.Lock()
+
+
+def get_kabupaten(level=MAP_DETAIL):
+    """
+    Kabupaten polygons at `level` with the GeoJSON attributes plus
+    feature_id, PROVINSI_KEY and KABUPATEN_KEY. The frame is shared by all
+    sessions: copy it before adding or changing columns. Reloaded when the
+    GeoJSON changes.
+    """
+    version = files_version([GEOJSON_PATH])
+    cached = _levels.get(level)
+    if cached is None or cached[0] != version:
+        with _levels_lock:
+            cached = _levels.get(level)
+            if cached is None or cached[0] != version:
+                cached = _levels[level] = (version, read_kabupaten(level))
+    return cached[1]
+
+
+if __name__ == "__main__":
+    geojson_path = sys.argv[1] if len(sys.argv) > 1 else GEOJSON_PATH
+    store = build_store(geojson_path, STORE_PATH)
+    print(f"{len(store)} features -> {STORE_PATH} ({os.path.getsize(STORE_PATH) / 2 ** 20:.1f} MB)")
+    for level in SIMPLIFY_TOLERANCES:
+        vertices = shapely.get_num_coordinates(store[geometry_column(level)].values).sum()
+        print(f"  {level:<7} {vertices:>10,} vertices")
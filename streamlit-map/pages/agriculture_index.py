@@ -4,8 +4,11 @@ import geopandas as gpd
 import folium
 from folium.features import GeoJsonTooltip
 from folium import plugins
-from streamlit_folium import st_folium
-from branca.colormap import LinearColormap
+from geometry_store import GEOJSON_PATH, files_version, get_kabupaten
+from render_cache import render_cache_panel, show_map
+from choropleth import DEFAULT_SCHEME, SCHEME_LABELS, fill_colors, style_from_property
+
+AGRI_INDEX_PATH = "data/indonesia_agricultural_index_by_province_data.csv"
 
 # Set page config for full-screen layout
 st.set_page_config(
@@ -86,36 +89,33 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 @st.cache_data
-def load_agricultural_data():
-    """Load agricultural index data"""
+def load_agricultural_data(data_version=None):
+    """Load agricultural index data (`data_version` re-reads the file when it changes)"""
     try:
-        df = pd.read_csv("data/indonesia_agricultural_index_by_province_data.csv")
+        df = pd.read_csv(AGRI_INDEX_PATH)
         return df
     except FileNotFoundError:
         st.error("Agricultural index data file not found!")
         return pd.DataFrame()
 
-@st.cache_data
 def load_geojson_data():
-    """Load GeoJSON data for provinces"""
+    """Load kabupaten polygons (shared by all sessions, see geometry_store.py)"""
     try:
-        gdf = gpd.read_file("data/kabupaten.geojson")
-        return gdf
+        return get_kabupaten()
     except FileNotFoundError:
         st.error("GeoJSON file not found!")
         return gpd.GeoDataFrame()
 
-def create_agricultural_index_map(agri_df, geojson_gdf, selected_index):
+def create_agricultural_index_map(agri_df, geojson_gdf, selected_index, color_scheme="linear"):
     """Create agricultural index choropleth map"""
     if agri_df.empty or geojson_gdf.empty:
         return None
     
-    # Standardize names for merge
-    geojson_gdf['PROVINSI'] = geojson_gdf['prov_name'].str.upper()
-    agri_df['Province'] = agri_df['Province'].str.upper()
+    # Standardize names for merge (geojson_gdf is shared: don't modify it)
+    agri_df = agri_df.assign(Province=agri_df['Province'].str.upper())
     
     # Merge for coloring
-    merged_gdf = geojson_gdf.merge(agri_df, left_on='PROVINSI', right_on='Province', how='left')
+    merged_gdf = geojson_gdf.merge(agri_df, left_on='PROVINSI_KEY', right_on='Province', how='left')
     
     # Create map
     m = folium.Map(location=[-2.5, 118], zoom_start=5, tiles=None)
@@ -129,31 +129,20 @@ def create_agricultural_index_map(agri_df, geojson_gdf, selected_index):
         control=True
     ).add_to(m)
     
-    # Create color scale
-    valid_values = merged_gdf[selected_index].dropna()
-    if not valid_values.empty:
-        vmin = valid_values.min()
-        vmax = valid_values.max()
-    else:
-        vmin, vmax = 0, 1
-    
-    color_scale = LinearColormap(
-        colors=["#d73027", "#fee08b", "#1a9850"],  # red → yellow → green
-        vmin=vmin,
-        vmax=vmax,
+    # Fill colours for every polygon at once (see choropleth.py)
+    fill_color, color_scale = fill_colors(
+        merged_gdf[selected_index],
+        ["#d73027", "#fee08b", "#1a9850"],  # red → yellow → green
+        scheme=color_scheme,
         caption="Nilai Persentase Index (%)"
     )
+    merged_gdf["fill_color"] = fill_color
     
     # Add GeoJSON layer
     folium.GeoJson(
         merged_gdf,
         name=f"Nilai Persentase Index",
-        style_function=lambda feature: {
-            "fillColor": color_scale(feature["properties"][selected_index]) if feature["properties"][selected_index] is not None else "#d3d3d3",
-            "color": "black",
-            "weight": 0.5,
-            "fillOpacity": 0.7,
-        },
+        style_function=style_from_property,
         highlight_function=lambda feature: {
             "fillColor": "#ffff99",
             "color": "blue",
@@ -181,7 +170,7 @@ def main():
     'Rangka Mengurangi Risiko Lingkungan <br />Menurut Provinsi dan Jenis Langkah yang Dilakukan</div>', unsafe_allow_html=True)
     
     # Load data
-    agri_df = load_agricultural_data()
+    agri_df = load_agricultural_data(files_version([AGRI_INDEX_PATH]))
     geojson_gdf = load_geojson_data()
     
     if agri_df.empty:
@@ -210,13 +199,19 @@ def main():
         selected_index = index_options[selected_label]
     
     st.markdown('</div>', unsafe_allow_html=True)
+    
+    color_scheme = st.sidebar.selectbox(
+        "🎨 Klasifikasi Warna:",
+        list(SCHEME_LABELS),
+        index=list(SCHEME_LABELS).index(DEFAULT_SCHEME),
+        format_func=SCHEME_LABELS.get,
+        key="scheme_selector"
+    )
 
     with st.spinner('Proses Analisis Data...'):
         try:
-            # Create and display map
-            agricultural_map = create_agricultural_index_map(agri_df, geojson_gdf, selected_index)
-            
-            if agricultural_map:
+            # Map is built below only on a render cache miss
+            if not agri_df.empty and not geojson_gdf.empty:
                 # Show statistics in a compact format
                 if not agri_df.empty:
                     st.markdown('<div class="stats-container">', unsafe_allow_html=True)
@@ -249,14 +244,15 @@ def main():
                 
                 st.markdown('<div class="map-container">', unsafe_allow_html=True)
                 with st.spinner('Loading Map...'):
-                    map_data = st_folium(
-                        agricultural_map, 
-                        width="100%", 
-                        height=600, 
-                        key="agricultural_index_map",
-                        returned_objects=["last_object_clicked"]
+                    # Rendered HTML is shared across reruns and sessions (see render_cache.py)
+                    map_hit, map_seconds = show_map(
+                        ("agriculture_index", selected_index, None, None, color_scheme),
+                        lambda: create_agricultural_index_map(agri_df, geojson_gdf, selected_index, color_scheme),
+                        [GEOJSON_PATH, AGRI_INDEX_PATH],
+                        height=600
                     )
                 st.markdown('</div>', unsafe_allow_html=True)
+                render_cache_panel(map_hit, map_seconds)
                 
             else:
                 st.error("Unable to create map. Please check data files.")
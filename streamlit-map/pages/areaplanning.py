@@ -7,6 +7,7 @@ from streamlit_folium import st_folium
 import json
 from datetime import datetime
 import textwrap
+from geometry_store import get_kabupaten
 
 # Set page config for full-screen layout
 st.set_page_config(
@@ -113,11 +114,15 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 @st.cache_data
+def load_simontadi_data():
+    return pd.read_csv("data/data_simotandi.csv")
+
 def load_geospatial_data():
-    """Load kabupaten GeoJSON and SIMONTADI data"""
+    """Load kabupaten polygons and SIMONTADI data"""
     try:
-        kabupaten_gdf = gpd.read_file("data/kabupaten.geojson")
-        df_simontadi = pd.read_csv("data/data_simotandi.csv")
+        # Full detail: drawn areas are matched to a kabupaten by point-in-polygon
+        kabupaten_gdf = get_kabupaten("full")
+        df_simontadi = load_simontadi_data()
         return kabupaten_gdf, df_simontadi
     except FileNotFoundError as e:
         st.error(f"Data file not found: {e}")
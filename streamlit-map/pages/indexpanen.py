@@ -1,11 +1,14 @@
 import streamlit as st
-import pandas as pd
 import geopandas as gpd
 import folium
 from folium.features import GeoJsonTooltip
 from folium import plugins
-from streamlit_folium import st_folium
 import plotly.express as px
+from geometry_store import get_kabupaten
+from crop_cube import get_crop_cube
+from crosswalk import SOURCE_FILES
+from render_cache import render_cache_panel, show_map
+from choropleth import DEFAULT_SCHEME, SCHEME_LABELS, fill_colors, style_from_property
 # import matplotlib.pyplot as plt
 
 # Set page config for full-screen layout
@@ -99,159 +102,37 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data
 def load_crop_data():
-    """Load crop production data"""
+    """Load crop production data (shared by all sessions, see crop_cube.py)"""
     try:
-        df_luaspanen = pd.read_csv("data/bdsp_luaspanen_tanamanpangan_kabupaten_2020_2025.csv")
-        df_produksi = pd.read_csv("data/bdsp_produksi_tanamanpangan_kabupaten_2020_2025.csv")
-        df_produktivitas = pd.read_csv("data/bdsp_produktivitas_tanamanpangan_kabupaten_2020_2025.csv")
-        return df_luaspanen, df_produksi, df_produktivitas
+        return get_crop_cube()
     except FileNotFoundError as e:
         st.error(f"Data file not found: {e}")
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+        return None
 
-@st.cache_resource
 def load_geojson_data():
-    """Load kabupaten GeoJSON data"""
+    """Load kabupaten polygons (shared by all sessions, see geometry_store.py)"""
     try:
-        gdf = gpd.read_file("data/kabupaten.geojson")
-        return gdf
+        return get_kabupaten()
     except FileNotFoundError:
         st.error("GeoJSON file not found!")
         return gpd.GeoDataFrame()
-def create_crop_production_map(selected_df, selected_year, selected_crop, selected_metric_label, geojson_gdf):
-    """Create crop production choropleth map with improved matching logic"""
-    if selected_df.empty or geojson_gdf.empty:
-        return None
-    
-    # Filter dan agrgasi data
-    df_filtered = selected_df[
-        selected_df["Komoditas"] == selected_crop
-    ][["Provinsi", "Kabupaten", str(selected_year)]].copy()
-    
-    if df_filtered.empty:
+def merge_crop_values(crop_cube, selected_metric, selected_year, selected_crop, geojson_gdf):
+    """Kabupaten polygons with the selected metric as `value`"""
+    if geojson_gdf.empty:
         return None
     
-    # Remove rows with null/zero values in the year column
-    # df_filtered = df_filtered.dropna(subset=[str(selected_year)])
-    # df_filtered = df_filtered[df_filtered[str(selected_year)] > 0]
-    
-    if df_filtered.empty:
+    # Values per GeoJSON feature, aggregated at load time (see crop_cube.py)
+    crop_slice = crop_cube.slice(selected_crop, selected_year)
+    if crop_slice is None:
         return None
     
-    # Aggregate by kabupaten
-    df_agg = df_filtered.groupby(
-        ["Provinsi", "Kabupaten"], as_index=False
-    )[str(selected_year)].sum()
-    df_agg.rename(columns={str(selected_year): "value"}, inplace=True)
-    
-    # match geojson dengan dataset
-    geojson_work = geojson_gdf.copy()
-
-    geojson_work['PROVINSI_CLEAN'] = (geojson_work['prov_name']
-                                     .str.upper()
-                                     .str.strip()
-                                     .str.replace(r'\s+', ' ', regex=True))
-    
-    # Clean geojson nama kabupaten tetap gunakan KOTA
-    geojson_work['KABUPATEN_CLEAN'] = (geojson_work['name']
-                                      .str.upper()
-                                      .str.strip()
-                                      .str.replace("KABUPATEN ", "", regex=False)
-                                      .str.replace("KAB. ", "", regex=False)
-                                      .str.replace(r'\s+', ' ', regex=True))
-    
-    # clean dataset
-    df_agg['PROVINSI_CLEAN'] = (df_agg['Provinsi']
-                               .str.upper()
-                               .str.strip()
-                               .str.replace(r'\s+', ' ', regex=True))
-    
-    # handling bug Kota Sukabumi dan Kabupaten Sukabumi
-    # dalam dataset
-    df_agg.loc[df_agg['PROVINSI_CLEAN'] == 'SUKABUMI', 'PROVINSI_CLEAN'] = 'JAWA BARAT'
-    df_agg['KABUPATEN_RAW'] = (df_agg['Kabupaten']
-                              .str.upper()
-                              .str.strip()
-                              .str.replace(r'\s+', ' ', regex=True))
-    df_agg['KABUPATEN_CLEAN'] = (df_agg['KABUPATEN_RAW']
-                                .str.replace("KABUPATEN ", "", regex=False)
-                                .str.replace("KAB. ", "", regex=False))
-    
-    # dalam geojson
-    geojson_work['KABUPATEN_CLEAN'] = (geojson_work['name']
-                                      .str.upper()
-                                      .str.strip()
-                                      .str.replace("KABUPATEN ", "", regex=False)
-                                      .str.replace("KAB. ", "", regex=False)
-                                      .str.replace(r'\s+', ' ', regex=True))
-    
-    # Special cases mapping - nama di dataset -> nama di geojson
-    special_cases_mapping = {
-        'MUSI BANYUASIN': 'MUSI BANYU ASIN',
-        'MAHAKAM ULU': 'MAHAKAM HULU',
-        'FAKFAK': 'FAK-FAK',
-        'BATAM': 'BATAM',
-        'SIAK': 'SIAK',
-        'DUMAI': 'DUMAI',
-        'DONGGALA': 'DONGGALA',
-        'POSO': 'POSO',
-        'TOBA': 'TOBA SAMOSIR',
-        'LUBUKLINGGAU': 'LUBUK LINGGAU',
-        'PADANGSIDIMPUAN': 'PADANG SIDIMPUAN',
-        "PAREPARE" : "PARE-PARE",
-        'MAMUJU UTARA/PASANGKAYU': 'MAMUJU UTARA'
-    }
-    
-    # Apply special case mappings to dataset
-    df_agg['KABUPATEN_CLEAN'] = df_agg['KABUPATEN_CLEAN'].replace(special_cases_mapping)
-    
-    # Exact match on both province and kabupaten
-    merged_gdf = geojson_work.merge(
-        df_agg[['PROVINSI_CLEAN', 'KABUPATEN_CLEAN', 'value']],
-        left_on=['PROVINSI_CLEAN', 'KABUPATEN_CLEAN'],
-        right_on=['PROVINSI_CLEAN', 'KABUPATEN_CLEAN'],
-        how='left'
-    )
-    
-    exact_matches = merged_gdf['value'].notna().sum()
-    
-    # kabupaten-only match - fallback jika tidak ada match
-    if exact_matches < len(df_agg) * 0.5:  
-        unmatched_geo = merged_gdf[merged_gdf['value'].isna()].copy()
-        
-        # For kabupaten-only matching, hapus prefix KOTA
-        unmatched_geo['KABUPATEN_NO_KOTA'] = unmatched_geo['KABUPATEN_CLEAN'].str.replace("KOTA ", "", regex=False)
-        df_agg_no_kota = df_agg.copy()
-        df_agg_no_kota['KABUPATEN_NO_KOTA'] = df_agg_no_kota['KABUPATEN_CLEAN'].str.replace("KOTA ", "", regex=False)
-        
-        # fallback matching
-        kabupaten_agg = df_agg_no_kota.copy()
-        
-        # untuk kasus Sukabumi:No agregasi Kota Sukabumi & Kab.Sukabumi
-        sukabumi_variants = kabupaten_agg[kabupaten_agg['KABUPATEN_NO_KOTA'] == 'SUKABUMI']
-        multiple_sukabumi = len(sukabumi_variants['PROVINSI_CLEAN'].unique()) > 1 or \
-                               len(kabupaten_agg[kabupaten_agg['KABUPATEN_NO_KOTA'] == 'SUKABUMI']) > 1
-        
-        if multiple_sukabumi:
-            non_sukabumi_data = kabupaten_agg[kabupaten_agg['KABUPATEN_NO_KOTA'] != 'SUKABUMI']
-            kabupaten_only_data = non_sukabumi_data.groupby('KABUPATEN_NO_KOTA')['value'].sum().reset_index()
-        else:
-            kabupaten_only_data = kabupaten_agg.groupby('KABUPATEN_NO_KOTA')['value'].sum().reset_index()
-        
-        kabupaten_only_merge = unmatched_geo.merge(
-            kabupaten_only_data,
-            left_on='KABUPATEN_NO_KOTA',
-            right_on='KABUPATEN_NO_KOTA',
-            how='left',
-            suffixes=('', '_kabupaten_match')
-        )
-        
-        # Update dataframe dengan kabupaten-only matches
-        mask = merged_gdf['value'].isna()
-        merged_gdf.loc[mask, 'value'] = kabupaten_only_merge['value_kabupaten_match'].values
+    merged_gdf = geojson_gdf.rename(columns={"PROVINSI_KEY": "PROVINSI_CLEAN", "KABUPATEN_KEY": "KABUPATEN_CLEAN"})
+    merged_gdf["value"] = merged_gdf["feature_id"].map(crop_slice[selected_metric]).astype("float64")
+    return merged_gdf
 
+def create_crop_production_map(merged_gdf, selected_year, selected_crop, selected_metric_label, color_scheme="linear"):
+    """Create crop production choropleth map"""
     m = folium.Map(location=[-2.5, 118], zoom_start=5, tiles=None)
 
     folium.TileLayer("OpenStreetMap", name="🗺 Basic Map").add_to(m)
@@ -262,32 +143,19 @@ def create_crop_production_map(selected_df, selected_year, selected_crop, select
         control=True
     ).add_to(m)
     
-    # color scale
-    valid_values = merged_gdf["value"].dropna()
-    if not valid_values.empty:
-        vmin = valid_values.min()
-        vmax = valid_values.max()
-        if vmin > vmax:
-            vmin, vmax = vmax, vmin
-    else:
-        vmin, vmax = 0, 1
-    
-    color_scale = folium.LinearColormap(
-        colors=["#ffffcc", "#18ce3d", "#03640E"],
-        vmin=vmin,
-        vmax=vmax,
+    # Fill colours for every polygon at once (see choropleth.py)
+    fill_color, color_scale = fill_colors(
+        merged_gdf["value"],
+        ["#ffffcc", "#18ce3d", "#03640E"],
+        scheme=color_scheme,
         caption=f"{selected_metric_label} - {selected_crop} ({selected_year})"
     )
+    merged_gdf = merged_gdf.assign(fill_color=fill_color)
     
     folium.GeoJson(
         merged_gdf,
         name=f"{selected_metric_label}",
-        style_function=lambda feature: {
-            "fillColor": color_scale(feature["properties"]["value"]) if feature["properties"]["value"] is not None else "#d3d3d3",
-            "color": "black",
-            "weight": 0.5,
-            "fillOpacity": 0.7,
-        },
+        style_function=style_from_property,
         highlight_function=lambda feature: {
             "fillColor": "#ffff99",
             "color": "blue",
@@ -311,7 +179,7 @@ def create_crop_production_map(selected_df, selected_year, selected_crop, select
     plugins.Fullscreen().add_to(m)
     folium.LayerControl(position="topleft", collapsed=False).add_to(m)
     
-    return m, merged_gdf
+    return m
 
 def get_summary_stats(df, year_col):
     """Get summary statistics for the data"""
@@ -340,10 +208,10 @@ def main():
     ' <br/ >menurut Provinsi/Kabupaten</div>', unsafe_allow_html=True)
     
     # Load data
-    df_luaspanen, df_produksi, df_produktivitas = load_crop_data()
+    crop_cube = load_crop_data()
     geojson_gdf = load_geojson_data()
     
-    if df_luaspanen.empty:
+    if crop_cube is None:
         st.error("Unable to load crop data. Please check file paths.")
         return
     
@@ -354,18 +222,19 @@ def main():
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        # Year selection
-        available_years = [2020, 2021, 2022, 2023, 2024, 2025]
+        # Year selection: the years present in the BDSP files
+        available_years = crop_cube.years
         selected_year = st.selectbox(
             "🗓️ Tahun:",
             available_years,
-            index=2,  # Default to 2023
+            # Default to 2022, or the latest year if the files don't have it
+            index=available_years.index(2022) if 2022 in available_years else len(available_years) - 1,
             key="year_selector"
         )
     
     with col2:
         # Crop selection
-        crop_list = sorted(df_luaspanen["Komoditas"].unique())
+        crop_list = crop_cube.commodities
         selected_crop = st.selectbox(
             "🌾 Komoditas:",
             crop_list,
@@ -376,9 +245,9 @@ def main():
     with col3:
         # Metric selection
         metric_options = {
-            "Luas Panen (Ha)": df_luaspanen,
-            "Produksi (Ton)": df_produksi,
-            "Produktivitas (Kuintal/Ha)": df_produktivitas
+            "Luas Panen (Ha)": "luas_panen",
+            "Produksi (Ton)": "produksi",
+            "Produktivitas (Kuintal/Ha)": "produktivitas"
         }
         selected_metric_label = st.selectbox(
             "📊 Jenis Data:",
@@ -386,17 +255,25 @@ def main():
             index=1,
             key="metric_selector"
         )
-        selected_df = metric_options[selected_metric_label]
+        selected_metric = metric_options[selected_metric_label]
     
     st.markdown('</div>', unsafe_allow_html=True)
     
+    color_scheme = st.sidebar.selectbox(
+        "🎨 Klasifikasi Warna:",
+        list(SCHEME_LABELS),
+        index=list(SCHEME_LABELS).index(DEFAULT_SCHEME),
+        format_func=SCHEME_LABELS.get,
+        key="scheme_selector"
+    )
+    
     # Create and display map
     with st.spinner('Proses Analisis Data...'):
         try:
-            crop_map, merged_data = create_crop_production_map(
-                selected_df, selected_year, selected_crop, selected_metric_label, geojson_gdf
+            merged_data = merge_crop_values(
+                crop_cube, selected_metric, selected_year, selected_crop, geojson_gdf
             )
-            if crop_map:
+            if merged_data is not None:
                 # Show statistics
                 col1, col2, col3, col4, col5 = st.columns(5)
                 
@@ -472,15 +349,17 @@ def main():
                 
                 with st.spinner('Loading Map...'):
                     st.markdown('<div class="map-container">', unsafe_allow_html=True)
-                    # MODIFIED: Don't capture return data to prevent reloads
-                    st_folium(
-                        crop_map,
-                        width="100%",
-                        height=600,
-                        key="crop_production_map",
-                        use_container_width=True
+                    # Rendered HTML is shared across reruns and sessions (see render_cache.py)
+                    map_hit, map_seconds = show_map(
+                        ("indexpanen", selected_metric, selected_crop, selected_year, color_scheme),
+                        lambda: create_crop_production_map(
+                            merged_data, selected_year, selected_crop, selected_metric_label, color_scheme
+                        ),
+                        SOURCE_FILES,
+                        height=600
                     )
                     st.markdown('</div>', unsafe_allow_html=True)
+                render_cache_panel(map_hit, map_seconds)
                 
                 # Content section with statistics and information
                 st.markdown('<div class="content-section">', unsafe_allow_html=True)
@@ -693,9 +572,8 @@ def main():
                 st.warning(f"No data available for {selected_crop} in {selected_year}. Please try a different combination.")
                 
                 # Tampilkan komoditas yang tersedia dari tahun pilihan
-                available_data = selected_df[selected_df[str(selected_year)].notna()]
-                if not available_data.empty:
-                    available_crops = sorted(available_data["Komoditas"].unique())
+                available_crops = crop_cube.commodities_with_data(selected_year, selected_metric)
+                if available_crops:
                     st.info(f"**Available crops for {selected_year}:** {', '.join(available_crops[:10])}{'...' if len(available_crops) > 10 else ''}")
         
         except Exception as e:
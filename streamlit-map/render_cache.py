@@ -0,0 +1,134 @@
+"""
+Cross-session cache of rendered folium maps.
+
+Building a choropleth (tile layers, colormap, ~500 GeoJson polygons with
+tooltips) and serializing it to HTML dominates a page rerun, and a rerun
+happens on every widget change. The finished HTML is kept per
+(page, metric, commodity, year, colour scheme) in one process-wide LRU
+bounded by RENDER_CACHE_MAX_BYTES, so every session showing the same map
+reuses it.
+Keys include the modification times of the data files the map is built
+from, so editing a file makes the old renders unreachable; they are
+dropped on the next miss for the same parameters or aged out by the LRU.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+from geometry_store import files_version
+
+RENDER_CACHE_MAX_BYTES = int(os.getenv("RENDER_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+class RenderCache:
+    def __init__(self, max_bytes=RENDER_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {}
+        self.evictions = 0
+
+    def get_or_render(self, params, build, sources):
+        """
+        HTML of the map for `params` (a tuple starting with the page name),
+        built with `build()` -> folium.Map on a miss. Returns (html, hit,
+        seconds).
+        """
+        start = time.perf_counter()
+        version = files_version(sources)
+        key = (params, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None:
+            seconds = time.perf_counter() - start
+            self._record(params[0], True, seconds)
+            return entry[0], True, seconds
+
+        html = build().get_root().render()
+        size = len(html.encode("utf-8"))
+        with self._lock:
+            # Renders of these parameters from older data versions
+            for stale in [k for k in self._entries if k[0] == params and k != key]:
+                self._discard(stale)
+            if key not in self._entries and size <= self.max_bytes:
+                self._entries[key] = (html, size)
+                self._bytes += size
+                while self._bytes > self.max_bytes:
+                    self._discard(next(iter(self._entries)))
+                    self.evictions += 1
+        seconds = time.perf_counter() - start
+        self._record(params[0], False, seconds)
+        return html, False, seconds
+
+    def _discard(self, key):
+        _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _record(self, page, hit, seconds):
+        with self._lock:
+            stats = self._stats.setdefault(page, {
+                "hits": 0, "misses": 0, "hit_seconds": 0.0, "miss_seconds": 0.0
+            })
+            if hit:
+                stats["hits"] += 1
+                stats["hit_seconds"] += seconds
+            else:
+                stats["misses"] += 1
+                stats["miss_seconds"] += seconds
+
+    def stats(self):
+        with self._lock:
+            pages = {page: dict(stats) for page, stats in self._stats.items()}
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "pages": pages,
+            }
+
+
+# Internal cache
+_render_cache = None
+_render_cache_lock = threading.Lock()
+
+
+def get_render_cache():
+    global _render_cache
+    if _render_cache is None:
+        with _render_cache_lock:
+            if _render_cache is None:
+                _render_cache = RenderCache()
+    return _render_cache
+
+
+def show_map(params, build, sources, height=600):
+    """Render (or reuse) the map for `params` and display it; returns (hit, seconds)."""
+    html, hit, seconds = get_render_cache().get_or_render(params, build, sources)
+    components.html(html, height=height)
+    return hit, seconds
+
+
+def render_cache_panel(hit, seconds):
+    """Sidebar panel with this rerun's map timing and the cache counters."""
+    stats = get_render_cache().stats()
+    with st.sidebar.expander("⏱️ Render cache", expanded=False):
+        st.markdown(f"**Peta ini:** {'hit' if hit else 'miss'} dalam {seconds * 1000:.1f} ms")
+        st.markdown(
+            f"**Cache:** {stats['entries']} peta, {stats['bytes'] / 2 ** 20:.1f} / "
+            f"{stats['max_bytes'] / 2 ** 20:.0f} MB, {stats['evictions']} evictions"
+        )
+        for page, counts in sorted(stats["pages"].items()):
+            mean_hit = counts["hit_seconds"] / counts["hits"] * 1000 if counts["hits"] else 0.0
+            mean_miss = counts["miss_seconds"] / counts["misses"] * 1000 if counts["misses"] else 0.0
+            st.markdown(
+                f"`{page}`: {counts['hits']} hit ({mean_hit:.1f} ms), "
+                f"{counts['misses']} miss ({mean_miss:.0f} ms)"
+            )